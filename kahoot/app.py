@@ -2,6 +2,10 @@
 import asyncio
 import json
 import logging
+import os
+import secrets
+import tempfile
+from io import BytesIO
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Set
 
@@ -11,6 +15,10 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from bankcache import BankCache
+from fanout import Outbox
+from gameclock import Timer, TimingWheel
+
 logger = logging.getLogger("quiz")
 logging.basicConfig(level=logging.INFO)
 
@@ -20,135 +28,285 @@ app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# Per-connection send queue size & slow-consumer policy (drop | coalesce | disconnect)
+SEND_QUEUE_MAX = int(os.getenv("SEND_QUEUE_MAX", "64"))
+SLOW_CONSUMER_POLICY = os.getenv("SLOW_CONSUMER_POLICY", "coalesce")
+# Rooms: every room has its own questions, timers and sockets
+MAX_ROOMS = int(os.getenv("MAX_ROOMS", "500"))
+DEFAULT_ROOM = "MAIN"
+# Parsed question banks, keyed by workbook content hash ("" disables the disk copy)
+BANK_CACHE_SIZE = int(os.getenv("BANK_CACHE_SIZE", "32"))
+BANK_CACHE_DIR = os.getenv("BANK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "kahoot-bank-cache"))
+# pandas read_excel engine: openpyxl (default) or calamine (faster, optional dependency)
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "openpyxl")
+# Soru süreleri ve reveal beklemesi tek bir timing wheel üzerinde (oda başına tek zamanlayıcı)
+CLOCK_TICK_SEC = float(os.getenv("CLOCK_TICK_SEC", "0.05"))
+REVEAL_PAUSE_SEC = 2.0
+
 # ---------------------- Game State ----------------------
 class Player:
-    def __init__(self, name: str, ws: WebSocket):
+    def __init__(self, name: str, out: Outbox):
         self.name = name
-        self.ws = ws
+        self.out = out
         self.score = 0
         self.answered_for_q: Dict[int, bool] = {}
 
 class QuizState:
-    def __init__(self):
+    def __init__(self, code: str = DEFAULT_ROOM):
+        self.code = code
         self.players: Dict[str, Player] = {}
-        self.admins: Set[WebSocket] = set()
+        self.admins: Set[Outbox] = set()
         self.questions: List[dict] = []
         self.current_q_index: int = -1
         self.accepting: bool = False
         self.q_started_at: Optional[datetime] = None
         self.q_duration_sec: int = 10
         self.round_active: bool = False
+        self.timer: Optional[Timer] = None      # current deadline / reveal pause on CLOCK
+        self.tasks: Set[asyncio.Task] = set()
+        self.closed: bool = False
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def set_timer(self, delay: float, coro_fn):
+        """Replace the room's pending timer; `coro_fn()` runs as a room task when due."""
+        self.cancel_timer()
+        self.timer = CLOCK.schedule(delay, lambda: self.spawn(coro_fn()))
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def close(self):
+        self.closed = True
+        self.accepting = False
+        self.round_active = False
+        self.cancel_timer()
+        for task in list(self.tasks):
+            task.cancel()
+        self.players.clear()
+        self.admins.clear()
 
     def reset(self):
+        self.cancel_timer()
         self.players.clear()
         self.admins.clear()
-        self.questions.clear()
+        self.questions = []  # may be a shared cached bank; never clear in place
         self.current_q_index = -1
         self.accepting = False
         self.q_started_at = None
         self.round_active = False
 
-STATE = QuizState()
+class RoomRegistry:
+    CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+    def __init__(self, max_rooms: int):
+        self.rooms: Dict[str, QuizState] = {}
+        self.max_rooms = max_rooms
+
+    def _new_code(self, length: int = 5) -> str:
+        while True:
+            code = "".join(secrets.choice(self.CODE_ALPHABET) for _ in range(length))
+            if code not in self.rooms:
+                return code
+
+    def create(self, code: Optional[str] = None) -> QuizState:
+        if len(self.rooms) >= self.max_rooms:
+            raise ValueError("Room limit reached")
+        code = code or self._new_code()
+        if code in self.rooms:
+            raise ValueError(f"Room already exists: {code}")
+        room = QuizState(code)
+        self.rooms[code] = room
+        return room
+
+    def get(self, code: Optional[str]) -> Optional[QuizState]:
+        # empty code => default room, created on demand
+        code = (code or "").strip().upper() or DEFAULT_ROOM
+        room = self.rooms.get(code)
+        if room is None and code == DEFAULT_ROOM:
+            room = self.create(DEFAULT_ROOM)
+        return room
+
+    def close(self, code: str) -> Optional[QuizState]:
+        room = self.rooms.pop(code.strip().upper(), None)
+        if room is not None:
+            room.close()
+        return room
+
+ROOMS = RoomRegistry(MAX_ROOMS)
+CLOCK = TimingWheel(tick=CLOCK_TICK_SEC)
 
 # ---------------------- Helpers ----------------------
-async def broadcast(payload: dict):
+async def broadcast(room: QuizState, payload: dict):
+    # Encoded once, queued per connection; never waits on a socket
     text = json.dumps(payload)
-    dead: List[str] = []
-    for pid, p in list(STATE.players.items()):
-        try:
-            await p.ws.send_text(text)
-        except Exception as e:
-            logger.warning("broadcast to player failed: %s", e)
-            dead.append(pid)
+    kind = payload.get("type")
+    dead = [pid for pid, p in room.players.items() if not p.out.send(text, kind)]
     for pid in dead:
-        STATE.players.pop(pid, None)
+        room.players.pop(pid, None)
 
-    dead_admins: List[WebSocket] = []
-    for a in list(STATE.admins):
-        try:
-            await a.send_text(text)
-        except Exception as e:
-            logger.warning("broadcast to admin failed: %s", e)
-            dead_admins.append(a)
+    dead_admins = [a for a in room.admins if not a.send(text, kind)]
     for a in dead_admins:
-        if a in STATE.admins:
-            STATE.admins.remove(a)
+        room.admins.discard(a)
+
+
+def send_to(out: Outbox, payload: dict):
+    out.send(json.dumps(payload), payload.get("type"))
 
 
 def utc_now():
     return datetime.now(timezone.utc)
 
 
+REQUIRED_COLUMNS = ["question", "option1", "option2", "option3", "option4", "correct_index"]
+# Bump when the parsing rules change: cached banks from older rules are not read
+PARSER_VERSION = 2
+OPTION_COLUMNS = REQUIRED_COLUMNS[1:5]
+
+
+def _read_sheet(data: bytes) -> pd.DataFrame:
+    # only the columns we use; EXCEL_ENGINE=calamine needs python-calamine installed
+    kwargs = {"usecols": lambda c: c in REQUIRED_COLUMNS}
+    if EXCEL_ENGINE != "openpyxl":
+        try:
+            return pd.read_excel(BytesIO(data), engine=EXCEL_ENGINE, **kwargs)
+        except ImportError as e:
+            logger.warning("excel engine %r unavailable, using openpyxl: %s", EXCEL_ENGINE, e)
+    return pd.read_excel(BytesIO(data), engine="openpyxl", **kwargs)
+
+
+def _text_column(col: pd.Series) -> pd.Series:
+    return col.astype(object).where(col.notna(), "").astype(str).str.strip()
+
+
+def _frame_to_questions(df: pd.DataFrame) -> List[dict]:
+    """Column-at-a-time conversion: strip text, coerce correct_index, drop rows
+    with an empty question or option. No per-row pandas access."""
+    if not set(REQUIRED_COLUMNS).issubset(df.columns):
+        raise ValueError(f"Excel must contain columns: {sorted(REQUIRED_COLUMNS)}")
+
+    question = _text_column(df["question"])
+    options = [_text_column(df[c]) for c in OPTION_COLUMNS]
+    correct = pd.to_numeric(df["correct_index"], errors="coerce").fillna(0).astype("int64").clip(0, 3)
+
+    valid = question != ""
+    for col in options:
+        valid &= col != ""
+    if not valid.all():
+        logger.info("skipped %d incomplete rows", int((~valid).sum()))
+
+    columns = [question[valid].tolist()] + [col[valid].tolist() for col in options]
+    return [
+        {"question": q, "options": [a, b, c, d], "correct": k}
+        for q, a, b, c, d, k in zip(*columns, correct[valid].tolist())
+    ]
+
+
+def _parse_workbook(data: bytes) -> List[dict]:
+    return _frame_to_questions(_read_sheet(data))
+
+
+BANKS = BankCache("kahoot", max_entries=BANK_CACHE_SIZE, directory=BANK_CACHE_DIR or None,
+                  version=PARSER_VERSION)
+
+
 def load_questions_from_excel(path: str) -> List[dict]:
-    df = pd.read_excel(path)
-    required = {"question", "option1", "option2", "option3", "option4", "correct_index"}
-    if not required.issubset(set(df.columns)):  # type: ignore
-        raise ValueError(f"Excel must contain columns: {sorted(required)}")
-
-    questions = []
-    for _, row in df.iterrows():
-        q = {
-            "question": str(row["question"]).strip(),
-            "options": [
-                str(row["option1"]).strip(),
-                str(row["option2"]).strip(),
-                str(row["option3"]).strip(),
-                str(row["option4"]).strip(),
-            ],
-            "correct": int(row["correct_index"]) if pd.notna(row["correct_index"]) else 0,
-        }
-        questions.append(q)
+    # same workbook bytes => cached parse, shared between rooms (read-only)
+    with open(path, "rb") as f:
+        data = f.read()
+    return BANKS.get_or_parse(data, _parse_workbook)
+
+
+def _read_keyed(path: str):
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, BankCache.key_for(data)
+
+
+def _read_or_parse(key: str, data: bytes):
+    """(questions, parsed): the disk copy if there is one, else a fresh parse."""
+    questions = BANKS.read(key)
+    if questions is not None:
+        return questions, False
+    return _parse_workbook(data), True
+
+
+async def load_questions(path: str) -> List[dict]:
+    """`load_questions_from_excel` for the event loop.
+
+    File reads, parsing and the disk copy run in threads; only the LRU is
+    touched on the loop, so BankCache never sees two threads at once.
+    """
+    data, key = await asyncio.to_thread(_read_keyed, path)
+    questions = BANKS.recall(key)
+    if questions is not None:
+        BANKS.hits += 1
+        return questions
+    BANKS.misses += 1
+    questions, parsed = await asyncio.to_thread(_read_or_parse, key, data)
+    BANKS.remember(key, questions)
+    if parsed:
+        await asyncio.to_thread(BANKS.write, key, questions)
     return questions
 
 
-async def start_question(index: int):
-    STATE.current_q_index = index
-    STATE.accepting = True
-    STATE.round_active = True
-    STATE.q_started_at = utc_now()
+async def start_question(room: QuizState, index: int):
+    room.current_q_index = index
+    room.accepting = True
+    room.round_active = True
+    room.q_started_at = utc_now()
 
-    q = STATE.questions[index]
-    expires_at = (STATE.q_started_at.timestamp() + STATE.q_duration_sec)
+    q = room.questions[index]
+    expires_at = (room.q_started_at.timestamp() + room.q_duration_sec)
 
-    await broadcast({
+    await broadcast(room, {
         "type": "question",
         "index": index,
         "question": q["question"],
         "options": q["options"],
         "expires_at": expires_at,
-        "q_total": len(STATE.questions),
+        "q_total": len(room.questions),
     })
-    asyncio.create_task(end_question_after_delay(STATE.q_duration_sec))
-
+    room.set_timer(room.q_duration_sec, lambda: end_current_question(room))
 
-async def end_question_after_delay(delay: int):
-    await asyncio.sleep(delay)
-    await end_current_question()
 
-
-async def end_current_question():
-    if not STATE.round_active:
+async def end_current_question(room: QuizState):
+    if not room.round_active:
         return
-    STATE.accepting = False
-    STATE.round_active = False
+    room.cancel_timer()  # `next` ile erken bitti: eski süre dolumu tetiklenmesin
+    room.accepting = False
+    room.round_active = False
 
-    q = STATE.questions[STATE.current_q_index]
-    await broadcast({
+    q = room.questions[room.current_q_index]
+    await broadcast(room, {
         "type": "reveal",
-        "index": STATE.current_q_index,
+        "index": room.current_q_index,
         "correct": q["correct"],
     })
-    await asyncio.sleep(2)
+    # Short pause before next question
+    room.set_timer(REVEAL_PAUSE_SEC, lambda: advance_question(room))
+
+
+async def advance_question(room: QuizState):
+    # Next or leaderboard
+    if room.closed:
+        return
 
-    if STATE.current_q_index + 1 < len(STATE.questions):
-        await start_question(STATE.current_q_index + 1)
+    if room.current_q_index + 1 < len(room.questions):
+        await start_question(room, room.current_q_index + 1)
     else:
         leaderboard = sorted(
-            [(p.name, p.score) for p in STATE.players.values()],
+            [(p.name, p.score) for p in room.players.values()],
             key=lambda x: x[1], reverse=True
         )
         top3 = leaderboard[:3]
-        await broadcast({
+        await broadcast(room, {
             "type": "leaderboard",
             "top3": top3,
             "all": leaderboard,
@@ -180,10 +338,49 @@ async def health():
     return JSONResponse({"ok": True})
 
 
+@app.get("/api/rooms")
+async def list_rooms():
+    return {
+        "ok": True,
+        "rooms": [
+            {"code": r.code, "players": len(r.players), "q_count": len(r.questions), "active": r.round_active}
+            for r in ROOMS.rooms.values()
+        ],
+    }
+
+
+@app.post("/api/rooms")
+async def create_room():
+    try:
+        room = ROOMS.create()
+    except ValueError as e:
+        return JSONResponse(status_code=429, content={"ok": False, "error": str(e)})
+    return {"ok": True, "code": room.code}
+
+
+@app.delete("/api/rooms/{code}")
+async def delete_room(code: str):
+    room = ROOMS.rooms.get(code.strip().upper())
+    if room is None:
+        return JSONResponse(status_code=404, content={"ok": False, "error": "Room not found"})
+    await broadcast(room, {"type": "room_closed", "room": room.code})
+    ROOMS.close(room.code)
+    return {"ok": True}
+
+
+def _leave(room: Optional[QuizState], pid: str, out: Outbox) -> bool:
+    if room is None or room.closed:
+        return False
+    room.admins.discard(out)
+    return room.players.pop(pid, None) is not None
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
     pid = hex(id(ws))
+    out = Outbox(ws, maxsize=SEND_QUEUE_MAX, policy=SLOW_CONSUMER_POLICY)
+    room: Optional[QuizState] = None
     try:
         while True:
             raw = await ws.receive_text()
@@ -194,84 +391,99 @@ async def websocket_endpoint(ws: WebSocket):
                 continue
 
             mtype = msg.get("type")
+            if room is not None and room.closed:
+                room = None
+
+            if mtype in ("join", "admin"):
+                target = ROOMS.get(msg.get("room"))
+                if target is None:
+                    send_to(out, {"type": "error", "message": "Oda bulunamadı."})
+                    continue
+                if target is not room and _leave(room, pid, out):
+                    await broadcast(room, {"type": "lobby", "players": [p.name for p in room.players.values()]})
+                room = target
+
+            if room is None:
+                continue
 
             if mtype == "join":
                 name = (msg.get("name") or f"Player-{pid[-4:]}").strip()[:24]
-                STATE.players[pid] = Player(name=name, ws=ws)
-                await broadcast({"type": "lobby", "players": [p.name for p in STATE.players.values()]})
-                await ws.send_text(json.dumps({"type": "joined", "name": name}))
+                room.players[pid] = Player(name=name, out=out)
+                await broadcast(room, {"type": "lobby", "players": [p.name for p in room.players.values()]})
+                send_to(out, {"type": "joined", "name": name, "room": room.code})
 
             elif mtype == "admin":
-                STATE.admins.add(ws)
-                await ws.send_text(json.dumps({
+                room.admins.add(out)
+                send_to(out, {
                     "type": "admin_ack",
-                    "players": [p.name for p in STATE.players.values()],
-                    "q_count": len(STATE.questions),
-                }))
+                    "room": room.code,
+                    "players": [p.name for p in room.players.values()],
+                    "q_count": len(room.questions),
+                })
 
             elif mtype == "load_questions":
                 path = msg.get("path", "questions.xlsx")
                 try:
-                    STATE.questions = load_questions_from_excel(path)
-                    await broadcast({"type": "questions_loaded", "count": len(STATE.questions)})
+                    room.questions = await load_questions(path)
+                    await broadcast(room, {"type": "questions_loaded", "count": len(room.questions)})
                 except Exception as e:
-                    await ws.send_text(json.dumps({"type": "error", "message": str(e)}))
+                    send_to(out, {"type": "error", "message": str(e)})
 
             elif mtype == "start_quiz":
-                if not STATE.questions:
-                    await ws.send_text(json.dumps({"type": "error", "message": "Önce Excel'den soruları yükleyin."}))
+                if not room.questions:
+                    send_to(out, {"type": "error", "message": "Önce Excel'den soruları yükleyin."})
                 else:
-                    for p in STATE.players.values():
+                    for p in room.players.values():
                         p.score = 0
                         p.answered_for_q.clear()
-                    await start_question(0)
+                    await start_question(room, 0)
 
             elif mtype == "answer":
-                if not STATE.accepting or STATE.current_q_index < 0:
+                if not room.accepting or room.current_q_index < 0:
                     continue
-                player = STATE.players.get(pid)
+                player = room.players.get(pid)
                 if not player:
                     continue
-                if player.answered_for_q.get(STATE.current_q_index):
+                if player.answered_for_q.get(room.current_q_index):
                     continue
 
                 try:
                     chosen = int(msg.get("choice", -1))
                 except (TypeError, ValueError):
                     chosen = -1
-                q = STATE.questions[STATE.current_q_index]
-                elapsed = (utc_now() - STATE.q_started_at).total_seconds() if STATE.q_started_at else 999
+                q = room.questions[room.current_q_index]
+                elapsed = (utc_now() - room.q_started_at).total_seconds() if room.q_started_at else 999
 
-                if chosen == q["correct"] and elapsed <= STATE.q_duration_sec:
+                if chosen == q["correct"] and elapsed <= room.q_duration_sec:
                     player.score += score_for_elapsed(elapsed)
 
-                player.answered_for_q[STATE.current_q_index] = True
+                player.answered_for_q[room.current_q_index] = True
 
-                await ws.send_text(json.dumps({
+                send_to(out, {
                     "type": "answer_ack",
                     "correct": chosen == q["correct"],
                     "score": player.score,
-                }))
+                    "index": room.current_q_index,
+                })
 
             elif mtype == "next":
-                await end_current_question()
+                await end_current_question(room)
 
             elif mtype == "reset":
-                for p in STATE.players.values():
+                room.cancel_timer()
+                for p in room.players.values():
                     p.score = 0
                     p.answered_for_q.clear()
-                STATE.current_q_index = -1
-                STATE.accepting = False
-                STATE.round_active = False
-                STATE.q_started_at = None
-                await broadcast({"type": "reset_done"})
+                room.current_q_index = -1
+                room.accepting = False
+                room.round_active = False
+                room.q_started_at = None
+                await broadcast(room, {"type": "reset_done"})
 
     except WebSocketDisconnect:
-        STATE.players.pop(pid, None)
-        try:
-            STATE.admins.remove(ws)
-        except KeyError:
-            pass
-        await broadcast({"type": "lobby", "players": [p.name for p in STATE.players.values()]})
+        if _leave(room, pid, out):
+            await broadcast(room, {"type": "lobby", "players": [p.name for p in room.players.values()]})
     except Exception as e:
         logger.exception("websocket error: %s", e)
+    finally:
+        out.close()
@@ -0,0 +1,110 @@
+# bankcache.py
+# Same API as quiz-demo/bankcache.py (each app deploys on its own); only the disk format differs.
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+logger = logging.getLogger("quiz")
+
+
+class BankCache:
+    """Parsed question banks keyed by the SHA-256 of the workbook bytes.
+
+    Hits are served from an in-memory LRU; misses fall back to a compact JSON
+    copy on disk before parsing the workbook again. Cached lists are shared
+    between rooms, so callers must treat them as read-only.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 32, directory: Optional[str] = None,
+                 version: int = 1):
+        self.namespace = namespace
+        self.version = version   # parser version: new parse rules never see old disk copies
+        self.max_entries = max(1, max_entries)
+        self.directory = directory
+        self._mem: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key_for(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _path(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{self.namespace}-v{self.version}-{key}.json")
+
+    def _remember(self, key: str, questions: List[dict]):
+        self._mem[key] = questions
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def recall(self, key: str) -> Optional[List[dict]]:
+        """In-memory lookup only; cheap enough for the event loop."""
+        questions = self._mem.get(key)
+        if questions is not None:
+            self._mem.move_to_end(key)
+        return questions
+
+    def read(self, key: str) -> Optional[List[dict]]:
+        """Disk copy only. Touches only files, so it is safe in a thread."""
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("bank cache entry unreadable (%s): %s", path, e)
+            return None
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        questions = self.recall(key)
+        if questions is None:
+            questions = self.read(key)
+            if questions is not None:
+                self._remember(key, questions)
+        return questions
+
+    def put(self, key: str, questions: List[dict]):
+        self._remember(key, questions)
+        self.write(key, questions)
+
+    def remember(self, key: str, questions: List[dict]):
+        """In-memory half of `put`; pair it with `write` off the event loop."""
+        self._remember(key, questions)
+
+    def write(self, key: str, questions: List[dict]):
+        """Disk half of `put`. Touches only files, so it is safe in a thread."""
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            # atomik yaz: yarım dosya asla okunmasın
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(questions, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("bank cache write failed (%s): %s", path, e)
+
+    def get_or_load(self, key: str, load: Callable[[], List[dict]]) -> List[dict]:
+        """Cached bank for `key`, else `load()` it and remember the result."""
+        questions = self.get(key)
+        if questions is not None:
+            self.hits += 1
+            return questions
+        self.misses += 1
+        questions = load()
+        self.put(key, questions)
+        return questions
+
+    def get_or_parse(self, data: bytes, parse: Callable[[bytes], List[dict]]) -> List[dict]:
+        return self.get_or_load(self.key_for(data), lambda: parse(data))
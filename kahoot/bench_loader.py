@@ -0,0 +1,71 @@
+# bench_loader.py
+"""Excel loader benchmark: old iterrows loop vs the columnar loader.
+
+    python bench_loader.py            # 100k rows
+    python bench_loader.py 20000      # smaller sheet
+
+Reading the workbook is timed separately; it is the same for both loaders
+and depends on EXCEL_ENGINE.
+"""
+import sys
+import time
+from io import BytesIO
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from app import _frame_to_questions, _read_sheet
+
+
+def iterrows_loader(df: pd.DataFrame) -> List[dict]:
+    # the loader as it was before the columnar rewrite
+    questions = []
+    for _, row in df.iterrows():
+        questions.append({
+            "question": str(row["question"]).strip(),
+            "options": [
+                str(row["option1"]).strip(),
+                str(row["option2"]).strip(),
+                str(row["option3"]).strip(),
+                str(row["option4"]).strip(),
+            ],
+            "correct": int(row["correct_index"]) if pd.notna(row["correct_index"]) else 0,
+        })
+    return questions
+
+
+def make_sheet(rows: int) -> bytes:
+    df = pd.DataFrame({
+        "question": [f"Question {i}?" for i in range(rows)],
+        "option1": [f"A{i}" for i in range(rows)],
+        "option2": [f"B{i}" for i in range(rows)],
+        "option3": [f"C{i}" for i in range(rows)],
+        "option4": [f"D{i}" for i in range(rows)],
+        "correct_index": np.arange(rows) % 4,
+    })
+    buf = BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t
+
+
+def main(rows: int):
+    data = make_sheet(rows)
+    df, t_read = timed(_read_sheet, data)
+    old, t_old = timed(iterrows_loader, df)
+    new, t_new = timed(_frame_to_questions, df)
+    assert old == new, "loaders disagree"
+    print(f"rows={rows}")
+    print(f"read_excel    {t_read:8.3f}s")
+    print(f"iterrows      {t_old:8.3f}s")
+    print(f"columnar      {t_new:8.3f}s  ({t_old / t_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
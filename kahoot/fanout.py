@@ -0,0 +1,85 @@
+# fanout.py
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from fastapi import WebSocket
+
+logger = logging.getLogger("quiz")
+
+# Yavaş istemci politikaları (kuyruk dolduğunda ne yapılacağı)
+POLICY_DROP = "drop"              # en eski (bayat) kareyi at
+POLICY_COALESCE = "coalesce"      # dolunca aynı tipte bekleyen kareyi at, sıra korunur
+POLICY_DISCONNECT = "disconnect"  # bağlantıyı kapat
+POLICIES = (POLICY_DROP, POLICY_COALESCE, POLICY_DISCONNECT)
+
+
+class Outbox:
+    """Bounded outbound queue for one socket, drained by its own writer task.
+
+    `send()` never awaits, so a slow client only ever delays itself.
+    """
+
+    def __init__(self, ws: WebSocket, maxsize: int = 64, policy: str = POLICY_DROP):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy: {policy!r}. Use one of {POLICIES}")
+        self.ws = ws
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.queue: Deque[Tuple[Optional[str], str]] = deque()  # (kind, text)
+        self.closed = False
+        self.dropped = 0
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    def send(self, text: str, kind: Optional[str] = None) -> bool:
+        """Queue a frame. Returns False if the connection is (now) closed."""
+        if self.closed:
+            return False
+
+        if len(self.queue) >= self.maxsize:
+            if self.policy == POLICY_DISCONNECT:
+                logger.warning("slow consumer disconnected (queue=%d)", len(self.queue))
+                self.close()
+                return False
+            # Kuyruk dolu: aynı tipteki bayat kareyi çıkar (yoksa en eskisini), yenisi sona
+            stale = 0
+            if self.policy == POLICY_COALESCE and kind is not None:
+                stale = next((i for i, (k, _) in enumerate(self.queue) if k == kind), 0)
+            del self.queue[stale]
+            self.dropped += 1
+
+        self.queue.append((kind, text))
+        self._ready.set()
+        return True
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self._task.cancel()
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await self.ws.close(code=1013)  # try again later
+        except Exception:
+            pass
+
+    async def _writer(self):
+        try:
+            while True:
+                while not self.queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                _, text = self.queue.popleft()
+                await self.ws.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("send to client failed: %s", e)
+        finally:
+            self.closed = True
+            self.queue.clear()
@@ -0,0 +1,113 @@
+# gameclock.py
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("quiz")
+
+
+class Timer:
+    """Handle returned by `TimingWheel.schedule`."""
+
+    __slots__ = ("callback", "due", "wheel")
+
+    def __init__(self, callback: Callable[[], None]):
+        self.callback = callback
+        self.due = 0                                  # absolute tick number
+        self.wheel: Optional["TimingWheel"] = None    # None once fired/cancelled
+
+    @property
+    def pending(self) -> bool:
+        return self.wheel is not None
+
+    def cancel(self):
+        if self.wheel is not None:
+            self.wheel.cancel(self)
+
+
+class TimingWheel:
+    """Hashed timing wheel on the monotonic clock.
+
+    Timers hash into `slots` buckets by due tick; schedule / cancel are O(1)
+    and one task wakes once per `tick` while any timer is pending, however
+    many there are. Timers never fire early: a deadline rounds up to the next
+    tick boundary. Callbacks run on the event loop and must not block; async
+    work should be handed to a task (e.g. `room.spawn`).
+    """
+
+    def __init__(self, tick: float = 0.05, slots: int = 512, clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self._origin = clock()
+        self._buckets: List[Dict[Timer, None]] = [{} for _ in range(max(1, slots))]
+        self._cursor = 0    # next tick to process
+        self._count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _now_tick(self) -> int:
+        return int((self.clock() - self._origin) / self.tick)
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Timer:
+        timer = Timer(callback)
+        self._insert(timer, delay)
+        return timer
+
+    def reschedule(self, timer: Timer, delay: float) -> Timer:
+        self.cancel(timer)
+        self._insert(timer, delay)
+        return timer
+
+    def cancel(self, timer: Timer):
+        if timer.wheel is not self:
+            return
+        self._buckets[timer.due % len(self._buckets)].pop(timer, None)
+        timer.wheel = None
+        self._count -= 1
+
+    def _insert(self, timer: Timer, delay: float):
+        now = self._now_tick()
+        if self._count == 0:
+            self._cursor = now  # boştayken geçen tick'leri tarama
+        # +1: şu anki tick'in başlangıcı geçmişte kaldı, erken ateşlenmesin
+        timer.due = now + max(0, math.ceil(delay / self.tick)) + 1
+        timer.wheel = self
+        self._buckets[timer.due % len(self._buckets)][timer] = None
+        self._count += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _fire(self, tick: int):
+        bucket = self._buckets[tick % len(self._buckets)]
+        due = [t for t in bucket if t.due <= tick]
+        for timer in due:
+            del bucket[timer]
+            timer.wheel = None
+            self._count -= 1
+            try:
+                timer.callback()
+            except Exception:
+                logger.exception("timer callback failed")
+
+    def advance(self):
+        """Fire everything due up to now."""
+        now = self._now_tick()
+        if now - self._cursor >= len(self._buckets):
+            # döngü bir tur kadar geciktiyse her kovayı bir kez tara
+            for i in range(len(self._buckets)):
+                self._fire(now - i)
+            self._cursor = now + 1
+        while self._cursor <= now:
+            self._fire(self._cursor)
+            self._cursor += 1
+
+    async def _run(self):
+        while self._count:
+            self.advance()
+            if not self._count:
+                break
+            await asyncio.sleep(max(0.0, self._origin + self._cursor * self.tick - self.clock()))
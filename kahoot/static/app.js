@@ -5,6 +5,8 @@
   const ws = new WebSocket(wsUrl);
 
   const byId = (id) => document.getElementById(id);
+  // Room code comes from the URL (?room=ABCDE); server falls back to the default room
+  const roomCode = (new URLSearchParams(location.search).get('room') || '').trim().toUpperCase();
 
   function safeParse(data) {
     try {
@@ -74,7 +76,7 @@
 
     joinBtn?.addEventListener('click', () => {
       const nm = nameInput.value.trim() || 'Misafir';
-      ws.send(JSON.stringify({ type: 'join', name: nm }));
+      ws.send(JSON.stringify({ type: 'join', name: nm, room: roomCode }));
     });
 
     ws.addEventListener('message', (event) => handleMessage(event, {
@@ -112,6 +114,13 @@
           </ol>
         `;
       },
+      room_closed: () => {
+        feedbackEl.textContent = 'Oda kapatıldı.';
+        optionsEl.innerHTML = '';
+      },
+      error: (data) => {
+        feedbackEl.textContent = data.message || '';
+      },
       reset_done: () => {
         feedbackEl.textContent = '';
         optionsEl.innerHTML = '';
@@ -133,9 +142,22 @@
     const resetBtn = byId('resetBtn');
     const excelPath = byId('excelPath');
     const loadInfo = byId('loadInfo');
+    const roomInfo = byId('roomInfo');
+    const newRoomBtn = byId('newRoomBtn');
 
     ws.addEventListener('open', () => {
-      ws.send(JSON.stringify({ type: 'admin' }));
+      ws.send(JSON.stringify({ type: 'admin', room: roomCode }));
+    });
+
+    newRoomBtn?.addEventListener('click', async () => {
+      try {
+        const res = await fetch('/api/rooms', { method: 'POST' });
+        const j = await res.json();
+        if (j.ok) location.search = `?room=${j.code}`;
+        else loadInfo.textContent = `Hata: ${j.error || 'Oda açılamadı'}`;
+      } catch (err) {
+        loadInfo.textContent = 'Ağ hatası: ' + err;
+      }
     });
 
     function renderLobby(list) {
@@ -160,6 +182,7 @@
 
     ws.addEventListener('message', (event) => handleMessage(event, {
       admin_ack: (data) => {
+        if (roomInfo) roomInfo.textContent = `Oda: ${data.room} — oyuncular ${location.origin}/?room=${data.room}`;
         renderLobby(data.players || []);
         qCount.textContent = `Soru sayısı: ${data.q_count || 0}`;
       },
@@ -173,6 +196,9 @@
       error: (data) => {
         loadInfo.textContent = `Hata: ${data.message}`;
       },
+      room_closed: () => {
+        loadInfo.textContent = 'Oda kapatıldı.';
+      },
     }));
   }
 })();
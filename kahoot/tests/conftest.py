@@ -0,0 +1,20 @@
+import atexit
+import os
+import shutil
+import tempfile
+import pytest
+
+# app reads this at import: keep even the import-time cache out of /tmp/kahoot-bank-cache
+_DATA = tempfile.mkdtemp(prefix="kahoot-tests-")
+atexit.register(shutil.rmtree, _DATA, ignore_errors=True)
+os.environ["BANK_CACHE_DIR"] = os.path.join(_DATA, "banks")
+
+@pytest.fixture(autouse=True)
+def isolated_bank_cache(tmp_path, monkeypatch):
+    """Fresh bank cache per test, under tmp_path."""
+    import app
+    from bankcache import BankCache
+
+    monkeypatch.setattr(app, "BANKS", BankCache("kahoot", max_entries=app.BANK_CACHE_SIZE,
+                                                directory=str(tmp_path / "banks"),
+                                                version=app.PARSER_VERSION))
@@ -0,0 +1,46 @@
+from bankcache import BankCache
+
+def _parse(calls):
+    def parse(data):
+        calls.append(data)
+        return [{"question": data.decode(), "options": ["a", "b", "c", "d"], "correct": 0}]
+    return parse
+
+def test_same_bytes_parsed_once_and_shared():
+    calls = []
+    cache = BankCache("t", directory=None)
+    first = cache.get_or_parse(b"bank", _parse(calls))
+    second = cache.get_or_parse(b"bank", _parse(calls))
+    assert first is second
+    assert calls == [b"bank"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_lru_eviction():
+    calls = []
+    cache = BankCache("t", max_entries=2, directory=None)
+    for data in [b"a", b"b", b"a", b"c", b"b"]:
+        cache.get_or_parse(data, _parse(calls))
+    assert calls == [b"a", b"b", b"c", b"b"]
+
+def test_disk_copy_survives_restart(tmp_path):
+    calls = []
+    BankCache("t", directory=str(tmp_path)).get_or_parse(b"bank", _parse(calls))
+    fresh = BankCache("t", directory=str(tmp_path))
+    rows = fresh.get_or_parse(b"bank", _parse(calls))
+    assert calls == [b"bank"]
+    assert rows[0]["question"] == "bank"
+    # yeni ayrıştırıcı sürümü eski disk kopyasını kullanmaz
+    BankCache("t", directory=str(tmp_path), version=2).get_or_parse(b"bank", _parse(calls))
+    assert calls == [b"bank", b"bank"]
+
+def test_parse_errors_are_not_cached():
+    cache = BankCache("t", directory=None)
+    def bad(data):
+        raise ValueError("boom")
+    for _ in range(2):
+        try:
+            cache.get_or_parse(b"x", bad)
+            assert False, "Should have raised"
+        except ValueError:
+            pass
+    assert cache.misses == 2
@@ -1,6 +1,9 @@
+import asyncio
 import pandas as pd
 import tempfile
+import app
 from app import load_questions_from_excel
+from bankcache import BankCache
 
 def _write_xlsx(df):
     tmp = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
@@ -25,3 +28,27 @@ def test_excel_missing_columns_raises():
         assert False, "Should have raised"
     except ValueError as e:
         assert "Excel must contain columns" in str(e)
+
+def test_excel_columns_are_cleaned_together():
+    df = pd.DataFrame([
+        {"question":"  Q1 ","option1":"A","option2":"B","option3":"C","option4":"D","correct_index":None},
+        {"question":"Q2","option1":1,"option2":2,"option3":3,"option4":4,"correct_index":7},
+        {"question":None,"option1":"A","option2":"B","option3":"C","option4":"D","correct_index":0},
+        {"question":"Q4","option1":"A","option2":None,"option3":"C","option4":"D","correct_index":0},
+    ])
+    rows = load_questions_from_excel(_write_xlsx(df))
+    assert [r["question"] for r in rows] == ["Q1", "Q2"]
+    assert rows[0]["correct"] == 0
+    assert rows[1]["options"] == ["1", "2", "3", "4"]
+    assert rows[1]["correct"] == 3
+
+def test_async_load_caches_in_memory_and_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "BANKS", BankCache("t", directory=str(tmp_path)))
+    path = _write_xlsx(pd.DataFrame([
+        {"question":"Q?","option1":"A","option2":"B","option3":"C","option4":"D","correct_index":2},
+    ]))
+    first = asyncio.run(app.load_questions(path))
+    assert first[0]["correct"] == 2
+    assert asyncio.run(app.load_questions(path)) is first
+    assert (app.BANKS.hits, app.BANKS.misses) == (1, 1)
+    assert len(list(tmp_path.glob("t-*.json"))) == 1
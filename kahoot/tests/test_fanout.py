@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from fanout import Outbox
+
+class FakeWS:
+    def __init__(self, block=False):
+        self.sent = []
+        self.closed_code = None
+        self.gate = asyncio.Event()
+        if not block:
+            self.gate.set()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_code = code
+
+@pytest.mark.asyncio
+async def test_frames_delivered_in_order():
+    ws = FakeWS()
+    out = Outbox(ws)
+    for i in range(5):
+        assert out.send(str(i))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert ws.sent == ["0", "1", "2", "3", "4"]
+    out.close()
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_block_fast_one():
+    slow, fast = FakeWS(block=True), FakeWS()
+    a, b = Outbox(slow), Outbox(fast)
+    a.send("q"); b.send("q")
+    await asyncio.sleep(0.01)
+    assert fast.sent == ["q"] and slow.sent == []
+    a.close(); b.close()
+
+@pytest.mark.asyncio
+async def test_drop_policy_discards_oldest():
+    ws = FakeWS(block=True)
+    out = Outbox(ws, maxsize=2, policy="drop")
+    await asyncio.sleep(0)
+    for t in ["a", "b", "c"]:
+        out.send(t)
+    assert [t for _, t in out.queue] == ["b", "c"]
+    assert out.dropped == 1
+    out.close()
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_replaces_same_kind():
+    ws = FakeWS(block=True)
+    out = Outbox(ws, maxsize=2, policy="coalesce")
+    await asyncio.sleep(0)
+    out.send("s1", "scores")
+    out.send("q1", "question")
+    out.send("s2", "scores")
+    assert [t for _, t in out.queue] == ["q1", "s2"]
+    out.close()
+
+@pytest.mark.asyncio
+async def test_coalesce_keeps_order_below_capacity():
+    ws = FakeWS(block=True)
+    out = Outbox(ws, maxsize=8, policy="coalesce")
+    await asyncio.sleep(0)
+    frames = [("question#1", "question"), ("reveal#1", "reveal"), ("prestage#2", "prestage"),
+              ("go#2", "go"), ("reveal#2", "reveal")]
+    for text, kind in frames:
+        out.send(text, kind)
+    assert [t for _, t in out.queue] == [t for t, _ in frames] and out.dropped == 0
+    out.close()
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_socket():
+    ws = FakeWS(block=True)
+    out = Outbox(ws, maxsize=1, policy="disconnect")
+    await asyncio.sleep(0)
+    assert out.send("a")
+    assert not out.send("b")
+    await asyncio.sleep(0)
+    assert out.closed and ws.closed_code == 1013
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        Outbox(FakeWS(), policy="nope")
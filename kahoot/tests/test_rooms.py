@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+import app
+from app import RoomRegistry, DEFAULT_ROOM
+
+def test_create_get_close():
+    reg = RoomRegistry(max_rooms=10)
+    room = reg.create()
+    assert reg.get(room.code.lower()) is room
+    assert reg.close(room.code) is room
+    assert room.closed
+    assert reg.get(room.code) is None
+
+def test_empty_code_uses_default_room():
+    reg = RoomRegistry(max_rooms=10)
+    assert reg.get(None).code == DEFAULT_ROOM
+    assert reg.get("") is reg.get(DEFAULT_ROOM)
+
+def test_rooms_are_isolated():
+    reg = RoomRegistry(max_rooms=10)
+    a, b = reg.create(), reg.create()
+    a.questions.append({"question": "Q"})
+    assert a.code != b.code
+    assert b.questions == []
+
+def test_room_limit():
+    reg = RoomRegistry(max_rooms=1)
+    reg.create()
+    with pytest.raises(ValueError):
+        reg.create()
+
+def test_next_cancels_the_old_deadline(monkeypatch):
+    monkeypatch.setattr(app, "REVEAL_PAUSE_SEC", 0.05)
+
+    async def run():
+        room = RoomRegistry(max_rooms=1).create()
+        room.questions = [{"question": f"Q{i}", "options": ["a", "b", "c", "d"], "correct": 0} for i in range(2)]
+        room.q_duration_sec = 1.0
+        await app.start_question(room, 0)
+        await app.end_current_question(room)        # admin `next`
+        assert room.timer is not None and not room.round_active
+        await asyncio.sleep(1.05)                   # 0. sorunun eski süresi geçti
+        assert room.current_q_index == 1 and room.round_active
+        room.close()
+        assert room.timer is None
+
+    asyncio.run(run())
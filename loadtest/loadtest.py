@@ -0,0 +1,413 @@
+# loadtest.py
+"""End-to-end load test for the /ws quiz protocol (quiz-demo and kahoot).
+
+Starts the app with uvicorn on localhost, connects N simulated players plus
+one admin, loads a generated question bank, runs the quiz and reports:
+
+  * question delivery skew: per question, how long after the first player
+    each player received the `question` frame (p50 / p99 / max, ms)
+  * answer -> answer_ack latency (ms)
+  * server CPU seconds / average CPU % / peak RSS (from /proc, Linux)
+  * bytes received by all players (`--wire bin2`: quiz-demo's binary frames)
+
+    python loadtest/loadtest.py --app quiz-demo --app kahoot --players 100,1000
+    python loadtest/loadtest.py --app quiz-demo --players 10000 --out run.json
+    python loadtest/loadtest.py --app quiz-demo --baseline run.json   # exit 1 on regression
+
+Results are one JSON object per (app, player count). Clients run in this
+process on one event loop, so at 10k players client-side delays show up in
+the numbers too; compare runs made on the same machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+import websockets
+from openpyxl import Workbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTION_SEC = 10 + 2  # both apps: 10 s question + 2 s reveal
+
+
+# ---------------------- helpers ----------------------
+def pct(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+
+
+def summary(values: List[float]) -> dict:
+    def r(v):
+        return None if v is None else round(v, 3)
+    return {
+        "n": len(values),
+        "p50": r(pct(values, 50)),
+        "p99": r(pct(values, 99)),
+        "max": r(max(values) if values else None),
+    }
+
+
+def make_bank(path: str, questions: int):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["question", "option1", "option2", "option3", "option4", "correct_index"])
+    for i in range(questions):
+        ws.append([f"Load question {i}?", "A", "B", "C", "D", i % 4])
+    wb.save(path)
+
+
+def answer_delay(spec: str) -> float:
+    """uniform:LO:HI | exp:MEAN | fixed:SEC (seconds)."""
+    kind, *args = spec.split(":")
+    a = [float(x) for x in args]
+    if kind == "uniform":
+        return random.uniform(a[0], a[1])
+    if kind == "exp":
+        return random.expovariate(1.0 / a[0])
+    if kind == "fixed":
+        return a[0]
+    raise ValueError(f"unknown answer delay: {spec!r}")
+
+
+def raise_fd_limit(need: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < need:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(need, soft)), hard))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ProcSampler:
+    """CPU time and RSS of a process, sampled from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.tick = os.sysconf("SC_CLK_TCK")
+        self.page = os.sysconf("SC_PAGE_SIZE")
+        self.rss_peak = 0
+        self.cpu_start = self.cpu()
+        self.t_start = time.monotonic()
+
+    def cpu(self) -> float:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self.tick
+        except (OSError, IndexError):
+            return 0.0
+
+    def sample(self):
+        try:
+            with open(f"/proc/{self.pid}/statm") as f:
+                self.rss_peak = max(self.rss_peak, int(f.read().split()[1]) * self.page)
+        except OSError:
+            pass
+
+    async def run(self, interval: float = 0.5):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    def report(self) -> dict:
+        cpu = self.cpu() - self.cpu_start
+        wall = time.monotonic() - self.t_start
+        return {
+            "cpu_sec": round(cpu, 3),
+            "cpu_pct": round(100 * cpu / wall, 1) if wall else None,
+            "rss_peak_mb": round(self.rss_peak / 2 ** 20, 1),
+        }
+
+
+# ---------------------- server ----------------------
+def start_server(app_dir: str, port: int, players: int, data_dir: str) -> subprocess.Popen:
+    # oda sınırı ortamdan gelse bile bu koşuya yetsin; sonuçlar / oyun günlüğü koşuyla birlikte silinir
+    env = dict(os.environ, MAX_PLAYERS_PER_ROOM=str(players), DATA_DIR=data_dir)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=app_dir,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not become healthy")
+
+
+# ---------------------- clients ----------------------
+def decode_binary(raw: bytes) -> dict:
+    """The server frames a bot needs, from quiz-demo's wire.py layouts."""
+    code = raw[0] & ~0x40   # 0x40: oda sıralı yayın, düzen aynı
+    if code == 0x01:
+        correct, score, streak, rank, index = struct.unpack_from("<BiHII", raw, 5)
+        return {"type": "answer_ack", "correct": bool(correct), "score": score, "streak": streak, "index": index}
+    if code == 0x03:
+        index, expires_at = struct.unpack_from("<Id", raw, 5)
+        return {"type": "go", "index": index, "expires_at": expires_at}
+    if code == 0x04:
+        ping_id, ts = struct.unpack_from("<Id", raw, 5)
+        return {"type": "ping", "id": ping_id, "ts": ts}
+    return {"type": f"bin:{code}"}
+
+
+class Player:
+    def __init__(self, n: int, url: str, delay_spec: str, correct_rate: float, wire: str = "json"):
+        self.name = f"bot{n}"
+        self.url = url
+        self.wire = wire
+        self.binary = False   # sunucu onayladıysa answer / pong ikili gider
+        self.rx_bytes = 0
+        self.delay_spec = delay_spec
+        self.correct_rate = correct_rate
+        self.question_at: Dict[int, float] = {}
+        self.answer_sent: Dict[int, float] = {}   # question index -> send time, until acked
+        self.answers = 0
+        self.ack_ms: List[float] = []
+        self.done = asyncio.Event()
+        self.joined = asyncio.Event()   # joined ya da ret (error) geldi
+        self.refused: Optional[str] = None
+        self.ws = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, max_size=None, ping_interval=None, open_timeout=60)
+        await self.ws.send(json.dumps({"type": "join", "name": self.name, "wire": self.wire}))
+
+    async def _answer(self, index: int):
+        await asyncio.sleep(answer_delay(self.delay_spec))
+        correct = index % 4
+        choice = correct if random.random() < self.correct_rate else (correct + 1) % 4
+        self.answer_sent[index] = time.monotonic()
+        self.answers += 1
+        try:
+            if self.binary:
+                await self.ws.send(bytes((0x81, choice)))
+            else:
+                await self.ws.send(json.dumps({"type": "answer", "choice": choice}))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def run(self):
+        try:
+            async for raw in self.ws:
+                self.rx_bytes += len(raw)
+                msg = decode_binary(raw) if isinstance(raw, bytes) else json.loads(raw)
+                t = msg.get("type")
+                if t == "ping":
+                    if self.binary:
+                        await self.ws.send(b"\x82" + struct.pack("<Id", msg["id"], time.time() * 1000))
+                    else:
+                        await self.ws.send(json.dumps({"type": "pong", "id": msg["id"], "ct": time.time() * 1000}))
+                elif t == "joined":
+                    self.binary = msg.get("wire") == "bin2"
+                    self.joined.set()
+                elif t == "error" and not self.joined.is_set():
+                    self.refused = msg.get("message") or "error"
+                    self.joined.set()
+                    break
+                elif t in ("question", "go"):   # go: metni önceden gelmiş soru başladı
+                    self.question_at[msg["index"]] = time.monotonic()
+                    asyncio.create_task(self._answer(msg["index"]))
+                elif t == "answer_ack":
+                    # ack soruyu geri yollar: sırayla değil, indeksle eşle (geç / düşen ack kaymasın)
+                    sent = self.answer_sent.pop(msg.get("index"), None)
+                    if sent is not None:
+                        self.ack_ms.append((time.monotonic() - sent) * 1000)
+                elif t == "leaderboard":
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.joined.set()
+            self.done.set()
+
+
+async def admin_session(url: str, bank: str):
+    ws = await websockets.connect(url, max_size=None, ping_interval=None)
+    await ws.send(json.dumps({"type": "admin"}))
+    await ws.send(json.dumps({"type": "load_questions", "path": bank}))
+    async for raw in ws:
+        msg = json.loads(raw)
+        if msg.get("type") == "ping":
+            await ws.send(json.dumps({"type": "pong", "id": msg["id"], "ct": time.time() * 1000}))
+        elif msg.get("type") == "questions_loaded":
+            return ws
+        elif msg.get("type") == "error":
+            raise RuntimeError(msg.get("message"))
+    raise RuntimeError("admin connection closed")
+
+
+async def drain(ws):
+    # admin de kuyruğunu boşaltmalı, yoksa sunucu onu yavaş istemci sayar
+    try:
+        async for raw in ws:
+            msg = json.loads(raw)
+            if msg.get("type") == "ping":
+                await ws.send(json.dumps({"type": "pong", "id": msg["id"], "ct": time.time() * 1000}))
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def run_once(app: str, players: int, questions: int, delay_spec: str,
+                   correct_rate: float, connect_batch: int, wire: str = "json") -> dict:
+    app_dir = os.path.join(ROOT, app)
+    raise_fd_limit(players + 256)
+    port = free_port()
+    url = f"ws://127.0.0.1:{port}/ws"
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = os.path.join(tmp, "bank.xlsx")
+        make_bank(bank, questions)
+        proc = start_server(app_dir, port, players, tmp)
+        sampler = ProcSampler(proc.pid)
+        sampling = asyncio.create_task(sampler.run())
+        errors = 0
+        try:
+            admin = await admin_session(url, bank)
+            admin_drain = asyncio.create_task(drain(admin))
+
+            bots = [Player(i, url, delay_spec, correct_rate, wire) for i in range(players)]
+            t0 = time.monotonic()
+            for i in range(0, players, connect_batch):
+                results = await asyncio.gather(*(b.connect() for b in bots[i:i + connect_batch]),
+                                               return_exceptions=True)
+                errors += sum(isinstance(r, Exception) for r in results)
+            connected = [b for b in bots if b.ws is not None]
+            connect_sec = time.monotonic() - t0
+            readers = [asyncio.create_task(b.run()) for b in connected]
+            await asyncio.wait_for(asyncio.gather(*(b.joined.wait() for b in connected)), timeout=60)
+            refused = [b.refused for b in connected if b.refused]
+            if refused:
+                # sessizce eksik soru / hata saymak yerine koşuyu durdur
+                raise RuntimeError(f"server refused {len(refused)}/{len(connected)} joins: {refused[0]}")
+
+            await admin.send(json.dumps({"type": "start_quiz"}))
+            try:
+                await asyncio.wait_for(asyncio.gather(*(b.done.wait() for b in connected)),
+                                       timeout=questions * QUESTION_SEC + 30)
+            except asyncio.TimeoutError:
+                errors += sum(not b.done.is_set() for b in connected)
+
+            skew: List[float] = []
+            for q in range(questions):
+                times = [b.question_at[q] for b in connected if q in b.question_at]
+                if times:
+                    first = min(times)
+                    skew.extend((t - first) * 1000 for t in times)
+            acks = [ms for b in connected for ms in b.ack_ms]
+            missing_questions = sum(questions - len(b.question_at) for b in connected)
+
+            for r in readers:
+                r.cancel()
+            admin_drain.cancel()
+            await asyncio.gather(*(b.ws.close() for b in connected), return_exceptions=True)
+            await admin.close()
+        finally:
+            sampling.cancel()
+            server = sampler.report()
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    return {
+        "app": app,
+        "players": players,
+        "wire": wire,
+        "connected": len(connected),
+        "connect_sec": round(connect_sec, 3),
+        "questions": questions,
+        "missing_question_frames": missing_questions,
+        "delivery_skew_ms": summary(skew),
+        "ack_latency_ms": summary(acks),
+        "answers_sent": sum(b.answers for b in connected),
+        "acks": len(acks),
+        "errors": errors,
+        "client_rx_bytes": sum(b.rx_bytes for b in connected),
+        "server": server,
+    }
+
+
+# ---------------------- regression check ----------------------
+def regressions(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    base = {(r["app"], r["players"]): r for r in baseline}
+    found = []
+    for r in results:
+        b = base.get((r["app"], r["players"]))
+        if b is None:
+            continue
+        for metric in ("delivery_skew_ms", "ack_latency_ms"):
+            now, was = r[metric]["p99"], b[metric]["p99"]
+            if now is not None and was and now > was * (1 + tolerance):
+                found.append(f"{r['app']}@{r['players']}: {metric} p99 {was:.1f} -> {now:.1f}")
+        now, was = r["server"]["cpu_sec"], b["server"]["cpu_sec"]
+        if was and now > was * (1 + tolerance):
+            found.append(f"{r['app']}@{r['players']}: server cpu_sec {was} -> {now}")
+    return found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--app", action="append", choices=["quiz-demo", "kahoot"],
+                    help="app directory to test (repeatable; default quiz-demo)")
+    ap.add_argument("--players", default="100,1000", help="comma-separated player counts")
+    ap.add_argument("--questions", type=int, default=3)
+    ap.add_argument("--answer-delay", default="uniform:0.5:8", help="uniform:LO:HI | exp:MEAN | fixed:SEC")
+    ap.add_argument("--correct-rate", type=float, default=0.6)
+    ap.add_argument("--connect-batch", type=int, default=200, help="concurrent handshakes")
+    ap.add_argument("--wire", choices=["json", "bin2"], default="json",
+                    help="frame encoding the bots ask for at join (kahoot ignores it)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write results JSON here (default stdout)")
+    ap.add_argument("--baseline", help="earlier results JSON; exit 1 if p99s / CPU regress")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed regression ratio")
+    args = ap.parse_args(argv)
+
+    random.seed(args.seed)
+    results = []
+    for app in args.app or ["quiz-demo"]:
+        for n in (int(x) for x in args.players.split(",")):
+            print(f"# {app}: {n} players", file=sys.stderr)
+            results.append(asyncio.run(run_once(
+                app, n, args.questions, args.answer_delay, args.correct_rate, args.connect_batch, args.wire)))
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
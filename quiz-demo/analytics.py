@@ -0,0 +1,95 @@
+# analytics.py
+import csv
+import io
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+# Cevap süresi kovaları (sn, üst sınır); son kova: daha uzun
+ELAPSED_BOUNDS = np.arange(1.0, 11.0)
+
+CSV_COLUMNS = ("game", "question", "player_id", "name", "choice", "correct", "points", "elapsed_ms")
+
+# Tablo programları bu karakterlerle başlayan hücreyi formül sayar (CSV injection)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def csv_text(value: str) -> str:
+    """A user-supplied cell, with a leading `'` when a spreadsheet would run it as a formula."""
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+class QuestionStats:
+    """Live answer distribution of one question: fixed counter arrays.
+
+    `add()` takes a scored batch; cost is per batch (two bincounts), not
+    per player, and the arrays never grow.
+    """
+
+    def __init__(self, index: int, options: int):
+        self.index = index
+        self.options = options
+        self.choices = np.zeros(options + 1, dtype=np.int64)   # son: geçersiz seçim
+        self.elapsed = np.zeros(len(ELAPSED_BOUNDS) + 1, dtype=np.int64)
+        self.correct = 0
+        self.answered = 0
+
+    def add(self, choices: np.ndarray, correct: np.ndarray, elapsed: np.ndarray):
+        valid = np.where((choices >= 0) & (choices < self.options), choices, self.options)
+        self.choices += np.bincount(valid, minlength=len(self.choices))
+        self.elapsed += np.bincount(np.searchsorted(ELAPSED_BOUNDS, elapsed, side="left"),
+                                    minlength=len(self.elapsed))
+        self.correct += int(correct.sum())
+        self.answered += len(choices)
+
+    def frame(self) -> dict:
+        return {
+            "type": "answer_stats",
+            "index": self.index,
+            "answered": self.answered,
+            "correct": self.correct,
+            "choices": self.choices[:self.options].tolist(),
+            "invalid": int(self.choices[self.options]),
+            "elapsed": self.elapsed.tolist(),   # 1 sn'lik kovalar, son kova 10 sn+
+        }
+
+
+Chunk = Tuple[int, List[str], List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+class AnswerLog:
+    """Every scored answer of one game, kept as the batches it was scored in.
+
+    Appending stores references to the batch arrays; `iter_csv()` renders one
+    batch at a time, so an export never holds the whole file in memory.
+    """
+
+    def __init__(self, game: int):
+        self.game = game
+        self.chunks: List[Chunk] = []
+        self.rows = 0
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def append(self, q_index: int, pids: Sequence[str], names: Sequence[str], choices: np.ndarray,
+               correct: np.ndarray, points: np.ndarray, elapsed: np.ndarray):
+        if not len(pids):
+            return
+        self.chunks.append((q_index, list(pids), list(names), choices, correct, points, elapsed))
+        self.rows += len(pids)
+
+    def iter_csv(self) -> Iterator[str]:
+        chunks = list(self.chunks)  # akış sırasında eklenenler bu dışa aktarıma girmez
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(CSV_COLUMNS)
+        yield buf.getvalue()
+        for q_index, pids, names, choices, correct, points, elapsed in chunks:
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows(zip(
+                [self.game] * len(pids), [q_index] * len(pids), map(csv_text, pids), map(csv_text, names), choices.tolist(),
+                correct.astype(np.int8).tolist(), points.tolist(), np.rint(elapsed * 1000).astype(np.int64).tolist(),
+            ))
+            yield buf.getvalue()
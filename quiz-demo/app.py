@@ -1,145 +1,987 @@
 # app.py
 import asyncio
+import hashlib
 import json
 import logging
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Set, Tuple
-from io import BytesIO
-
+import multiprocessing
+import os
+import queue
+import secrets
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, UploadFile, File
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from openpyxl import load_workbook
+
+from analytics import AnswerLog, QuestionStats
+from backplane import make_backplane
+from bankcache import BankCache
+from clocksync import ClockSync, wall_ms
+from fanout import Outbox
+from gamelog import GameLog, open_log
+from gameclock import Timer, TimingWheel
+from heartbeat import Heartbeats, run_sweeper
+from ingest import PARSER_VERSION, BankParseError, RowErrors, init_worker, parse_job, parse_workbook
+from leaderboard import Leaderboard
+from metrics import SIZE_BUCKETS, Histogram, Registry, counter, gauge, probe_loop_lag
+from players import PlayerTable
+from qbank import QuestionBank
+from ratelimit import RateLimiter
+from results import ResultsStore, open_store
+from sessions import ReplayRing, Session
+import wire
 
 logger = logging.getLogger("quiz")
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global GAMELOG, RESULTS
+    # depolar import'ta değil burada açılır; önceden verilmiş olanı (testler) sahibi kapatır
+    own_log = GAMELOG is None
+    if own_log:
+        # flock + ölü worker günlüklerini devralma: restore_games'ten önce
+        GAMELOG = await asyncio.to_thread(open_log, GAMELOG_DIR, WORKER_ID)
+    own_results = RESULTS is None
+    if own_results:
+        RESULTS = await asyncio.to_thread(open_store, RESULTS_DB, RESULTS_TICK_SEC)
+    await BACKPLANE.start()
+    await restore_games()
+    snapshots = asyncio.create_task(run_snapshots())
+    lag_probe = asyncio.create_task(probe_loop_lag(LOOP_LAG, LOOP_LAG_PROBE_SEC))
+    reaper = asyncio.create_task(run_sweeper(HEARTBEATS, reap_idle))
+    yield
+    lag_probe.cancel()
+    reaper.cancel()
+    snapshots.cancel()
+    LOADER.close()
+    if GAMELOG is not None:
+        GAMELOG.snapshot(game_snapshot())
+        await asyncio.to_thread(GAMELOG.flush)
+        if own_log:
+            await asyncio.to_thread(GAMELOG.close)   # kilit bırakılır
+            GAMELOG = None
+    if RESULTS is not None:
+        await asyncio.to_thread(RESULTS.flush)
+        if own_results:
+            await asyncio.to_thread(RESULTS.close)
+            RESULTS = None
+    await BACKPLANE.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Static & templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-
-# ---------------------- Game State ----------------------
-class Player:
-    def __init__(self, name: str, ws: WebSocket):
-        self.name = name
-        self.ws = ws
-        self.score: int = 0
-        self.answered_for_q: Dict[int, bool] = {}
-        self.streak: int = 0  # art arda doğru sayısı
+# Per-connection send queue size & slow-consumer policy (drop | coalesce | disconnect)
+SEND_QUEUE_MAX = int(os.getenv("SEND_QUEUE_MAX", "64"))
+SLOW_CONSUMER_POLICY = os.getenv("SLOW_CONSUMER_POLICY", "coalesce")
+# Live mini-leaderboard: at most one `scores` frame per tick
+SCORES_TICK_SEC = float(os.getenv("SCORES_TICK_SEC", "0.25"))
+# Answers are buffered and scored in batches: every tick or when the batch is full
+ANSWER_TICK_SEC = float(os.getenv("ANSWER_TICK_SEC", "0.02"))
+ANSWER_BATCH_MAX = int(os.getenv("ANSWER_BATCH_MAX", "1024"))
+# One timing wheel drives every question deadline and reveal pause in the process
+CLOCK_TICK_SEC = float(os.getenv("CLOCK_TICK_SEC", "0.05"))
+REVEAL_PAUSE_SEC = 2.0
+# Answer times are credited with the connection's measured RTT, capped here
+MAX_LATENCY_CREDIT_MS = float(os.getenv("MAX_LATENCY_CREDIT_MS", "500"))
+# Lobby deltas are batched: at most one player_joined / player_left frame per tick
+LOBBY_TICK_SEC = float(os.getenv("LOBBY_TICK_SEC", "0.1"))
+# Admin'e canlı cevap dağılımı (answer_stats) en fazla bu aralıkla
+STATS_TICK_SEC = float(os.getenv("STATS_TICK_SEC", "0.5"))
+# Kopan oyuncu bu kadar süre odada kalır; aynı oturum anahtarıyla dönerse kaçırdığı kareler tekrar gönderilir
+SESSION_GRACE_SEC = float(os.getenv("SESSION_GRACE_SEC", "30"))
+# Tekrar tamponları: oda yayınları odada bir kez (ROOM_REPLAY), oyuncuya özel kareler oturumda
+SESSION_REPLAY = int(os.getenv("SESSION_REPLAY", "16"))
+ROOM_REPLAY = int(os.getenv("ROOM_REPLAY", "256"))
+# Heartbeat: sessiz bağlantıya HEARTBEAT_SEC sonra ping, IDLE_TIMEOUT_SEC boyunca hiç kare gelmezse çıkar
+HEARTBEAT_SEC = float(os.getenv("HEARTBEAT_SEC", "15"))
+IDLE_TIMEOUT_SEC = float(os.getenv("IDLE_TIMEOUT_SEC", "45"))
+# Admission control: kare boyutu JSON çözülmeden önce, hız sınırları bağlantı başına token bucket
+MAX_FRAME_BYTES = int(os.getenv("MAX_FRAME_BYTES", "4096"))
+RATE_LIMITS = {                 # sınıf -> (saniyede, patlama)
+    "frame": (float(os.getenv("MSG_RATE_PER_SEC", "30")), 60),   # her kare, tipine bakmadan
+    "join": (0.5, 3),
+    "answer": (4.0, 8),
+    "admin": (2.0, 10),
+    "snapshot": (0.2, 3),       # lobby_sync / resync / question_sync: O(oda) kare üretir
+    "sync": (0.5, 3),           # saat senkronu turu (ping patlaması)
+    "resume": (0.5, 3),
+}
+SNAPSHOT_REQUESTS = frozenset({"lobby_sync", "resync", "question_sync"})
+ADMIN_COMMANDS = frozenset({"admin", "load_questions", "start_quiz", "next", "reset"})
+# Oda başına oyuncu sınırı (0 = sınırsız; bellek/bant genişliği için isteğe bağlı)
+MAX_PLAYERS_PER_ROOM = int(os.getenv("MAX_PLAYERS_PER_ROOM", "0"))
+# İstemci join/admin'de "wire": "bin2" isterse sıcak kareler (answer_ack, scores, go, ping) ikili gider
+BINARY_WIRE = os.getenv("BINARY_WIRE", "1") == "1"
+# Event-loop lag probe period (see /api/metrics)
+LOOP_LAG_PROBE_SEC = float(os.getenv("LOOP_LAG_PROBE_SEC", "0.5"))
+# Rooms: every room has its own questions, timers and sockets
+MAX_ROOMS = int(os.getenv("MAX_ROOMS", "500"))
+DEFAULT_ROOM = "MAIN"  # oda kodu göndermeyen istemciler buraya düşer
+# Backplane between workers: "local" (single worker) or "unix:/path/to/broker.sock"
+BACKPLANE_URL = os.getenv("BACKPLANE", "local")
+WORKER_ID = f"w{os.getpid():x}{secrets.token_hex(2)}"
+# Parsed question banks, keyed by workbook content hash ("" disables the disk copy)
+BANK_CACHE_SIZE = int(os.getenv("BANK_CACHE_SIZE", "32"))
+BANK_CACHE_DIR = os.getenv("BANK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "quiz-bank-cache"))
+# Kalıcı veriler (sonuçlar, oyun günlüğü); tmp temizliğinde kaybolmasın
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+# Finished games / answers in SQLite, written in batches off the loop ("" disables)
+RESULTS_DB = os.getenv("RESULTS_DB", os.path.join(DATA_DIR, "results.sqlite3"))
+RESULTS_TICK_SEC = float(os.getenv("RESULTS_TICK_SEC", "0.5"))
+RESULTS_PAGE_MAX = 200
+# In-progress games journaled for crash recovery ("" disables); one journal per worker
+# in GAMELOG_DIR/<worker id>/, a snapshot compacts it; dead workers' journals are adopted
+GAMELOG_DIR = os.getenv("GAMELOG_DIR", os.path.join(DATA_DIR, "gamelog"))
+GAMELOG_SNAPSHOT_SEC = float(os.getenv("GAMELOG_SNAPSHOT_SEC", "10"))
+# Uploads are spooled to disk in chunks and rejected past the cap
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK = 64 * 1024
+# Workbooks are parsed in a process pool; `questions_loading` frames report progress
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "1"))
+LOAD_PROGRESS_SEC = float(os.getenv("LOAD_PROGRESS_SEC", "0.25"))
+LOAD_PROGRESS_ROWS = 5000
+
+
+# ---------------------- Metrics ----------------------
+METRICS = Registry()
+BROADCAST_SECONDS = METRICS.histogram("quiz_broadcast_seconds", "Time spent in broadcast().")
+BROADCAST_BYTES = METRICS.histogram("quiz_broadcast_payload_bytes", "Encoded broadcast payload size.", SIZE_BUCKETS)
+ANSWERS = METRICS.counter("quiz_answers_total", "Answers accepted for scoring (rate() = answers/sec).")
+ACK_SECONDS = METRICS.histogram("quiz_answer_ack_seconds", "Answer received to answer_ack queued.")
+CLIENT_RTT = METRICS.histogram("quiz_client_rtt_seconds", "Clock-sync round trip per sample.")
+LOOP_LAG = METRICS.histogram("quiz_event_loop_lag_seconds", "How late the lag probe woke up.")
+THROTTLED = METRICS.labeled_counter("quiz_throttled_messages_total",
+                                    "Client frames refused by admission control.", "reason")
+REAPED = METRICS.counter("quiz_reaped_connections_total", "Sockets evicted after IDLE_TIMEOUT_SEC of silence.")
 
 
+# ---------------------- Game State ----------------------
 class QuizState:
-    def __init__(self):
-        self.players: Dict[str, Player] = {}   # key = connection id (hex)
-        self.admins: Set[WebSocket] = set()
-        self.questions: List[dict] = []
+    """One room: its own players, admins, question set, timers and ticker."""
+
+    def __init__(self, code: str = DEFAULT_ROOM):
+        self.code = code
+        self.players = PlayerTable()            # key = connection id; score/streak arrays
+        self.admins: Set["Sender"] = set()
+        self.questions: Sequence[dict] = []     # current game: the bank or a sample of it
+        self.bank: Optional[QuestionBank] = None  # last loaded bank (memory-mapped, shared)
+        self.bank_seq: int = 0                  # latest bank load wins
         self.current_q_index: int = -1
+        self.staged_index: int = -1             # next question already sent, waiting for `go`
         self.accepting: bool = False
-        self.q_started_at: Optional[datetime] = None
+        self.q_started_ns: int = 0             # time.monotonic_ns() at question start
         self.q_duration_sec: int = 10
         self.round_active: bool = False
+        self.timer: Optional[Timer] = None      # current deadline / reveal pause on CLOCK
+        self.ranking = Leaderboard()            # pid -> score, incrementally sorted
+        self.scores_ticker = ScoreTicker(self, SCORES_TICK_SEC)
+        self.lobby = LobbyTicker(self, LOBBY_TICK_SEC)
+        self.replay = ReplayRing(ROOM_REPLAY)   # broadcast rseq + frames for resuming sessions
+        self.game: int = 0                      # bumped by start_quiz
+        self.game_id: str = ""                  # results store key of the current game
+        self.journaled: bool = False            # game in progress is in GAMELOG
+        self.revealed_at: float = 0.0           # epoch seconds of the last reveal
+        self.results = AnswerLog(0)             # last game's answers, kept until the next start
+        self.stats: Dict[int, QuestionStats] = {}
+        self.stats_ticker = StatsTicker(self, STATS_TICK_SEC)
+        self.answers = AnswerBatch(self, ANSWER_TICK_SEC, ANSWER_BATCH_MAX)
+        self.tasks: Set[asyncio.Task] = set()  # timers etc., cancelled on close
+        self.closed: bool = False
+        # Sockets on other workers (see RoomLink) and their queued messages
+        self.remote: Dict[str, RemoteOutbox] = {}
+        self.inbox: Deque[dict] = deque()
+        self._inbox_task: Optional[asyncio.Task] = None
+
+    def receive_remote(self, event: dict):
+        """Backplane callback: keep per-room order, process on a room task."""
+        self.inbox.append(event)
+        if self._inbox_task is None or self._inbox_task.done():
+            self._inbox_task = self.spawn(process_remote(self))
+
+    def add_player(self, pid: str, name: str, out: "Sender"):
+        self.players.add(pid, name, out)
+        self.ranking.add(pid, 0)
+        journal(self, "join", pid=pid, name=name, token=out.token if isinstance(out, Session) else None)
+
+    def remove_player(self, pid: str):
+        self.players.remove(pid)
+        self.ranking.remove(pid)
+        journal(self, "leave", pid=pid)
+
+    def top_scores(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        ranked = self.ranking.ranking() if n is None else self.ranking.top(n)
+        return [(self.players.name(pid), score) for pid, score in ranked]
+
+    def player_names(self) -> List[str]:
+        return list(self.players.names)
+
+    def lobby_snapshot(self) -> dict:
+        """Full lobby; only for new connections and clients that saw a seq gap."""
+        return {"type": "lobby", "seq": self.lobby.seq, "players": self.player_names(),
+                "pids": list(self.players.pids)}
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def set_timer(self, delay: float, coro_fn):
+        """Replace the room's pending timer; `coro_fn()` runs as a room task when due."""
+        self.cancel_timer()
+        self.timer = CLOCK.schedule(delay, lambda: self.spawn(coro_fn()))
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def new_game(self):
+        self.game += 1
+        self.game_id = secrets.token_hex(8)
+        self.results = AnswerLog(self.game)
+        self.stats = {}
+        if RESULTS is not None:
+            RESULTS.game_started(self.game_id, self.code, self.questions)
 
     def soft_reset(self):
-        for p in self.players.values():
-            p.score = 0
-            p.answered_for_q.clear()
-            p.streak = 0
+        self.cancel_timer()
+        self.players.reset()
+        self.ranking.clear_scores()
+        self.answers.clear()
         self.current_q_index = -1
+        self.staged_index = -1
         self.accepting = False
         self.round_active = False
-        self.q_started_at = None
+        self.q_started_ns = 0
 
+    def close(self):
+        self.closed = True
+        self.accepting = False
+        self.round_active = False
+        self.cancel_timer()
+        for task in list(self.tasks):
+            task.cancel()
+        self.players = PlayerTable(capacity=1)
+        self.admins.clear()
+        self.remote.clear()
+        self.inbox.clear()
 
-STATE = QuizState()
 
+class RoomRegistry:
+    """Rooms owned by this worker. Ownership is claimed on the backplane first."""
 
-# ---------------------- Helpers ----------------------
-def utc_now():
-    return datetime.now(timezone.utc)
-
-
-def _parse_rows(rows: List[List[object]]) -> List[dict]:
-    if not rows:
-        raise ValueError("Excel boş görünüyor.")
-    headers = [str(h or "").strip().lower() for h in rows[0]]
-    required = ["question", "option1", "option2", "option3", "option4", "correct_index"]
-    missing = [c for c in required if c not in headers]
-    if missing:
-        raise ValueError(f"Excel başlıkları eksik. Gerekli: {required}")
-    idx = {h: headers.index(h) for h in required}
-
-    out: List[dict] = []
-    for r in rows[1:]:
-        if not r or all(v is None for v in r):
+    CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+    def __init__(self, max_rooms: int):
+        self.rooms: Dict[str, QuizState] = {}
+        self.max_rooms = max_rooms
+
+    def new_code(self, length: int = 5) -> str:
+        while True:
+            code = "".join(secrets.choice(self.CODE_ALPHABET) for _ in range(length))
+            if code not in self.rooms:
+                return code
+
+    def full(self) -> bool:
+        return len(self.rooms) >= self.max_rooms
+
+    async def open(self, code: Optional[str] = None) -> QuizState:
+        """Claim a room code on the backplane and start hosting it here."""
+        if self.full():
+            raise ValueError("Oda sınırına ulaşıldı.")
+        for _ in range(5):
+            candidate = code or self.new_code()
+            if candidate in self.rooms:
+                return self.rooms[candidate]
+            if await BACKPLANE.claim(candidate) == WORKER_ID:
+                return self.create(candidate)
+            if code:
+                break
+        raise ValueError(f"Oda başka bir sunucuda: {code}" if code else "Oda kodu üretilemedi.")
+
+    def create(self, code: str) -> QuizState:
+        room = QuizState(code)
+        self.rooms[code] = room
+        BACKPLANE.subscribe(room_inbox(code), room.receive_remote)
+        return room
+
+    def close(self, code: str) -> Optional[QuizState]:
+        room = self.rooms.pop(code.strip().upper(), None)
+        if room is not None:
+            room.close()
+            BACKPLANE.unsubscribe(room_inbox(room.code), room.receive_remote)
+            BACKPLANE.release(room.code)
+        return room
+
+
+ROOMS = RoomRegistry(MAX_ROOMS)
+CLOCK = TimingWheel(tick=CLOCK_TICK_SEC)
+BACKPLANE = make_backplane(BACKPLANE_URL, WORKER_ID)
+
+
+# ---------------------- Backplane ----------------------
+def room_channel(code: str) -> str:
+    return f"room:{code}"        # owner -> relays: broadcast frames
+
+
+def room_inbox(code: str) -> str:
+    return f"room:{code}:in"     # relays -> owner: client messages
+
+
+def worker_channel(worker: str) -> str:
+    return f"worker:{worker}"    # owner -> one relay: direct frames
+
+
+class RemoteOutbox:
+    """Stands in for a socket held by another worker (direct frames only)."""
+
+    binary = False  # the relaying worker re-encodes for binary sockets
+
+    def __init__(self, worker: str, pid: str):
+        self.worker = worker
+        self.pid = pid
+
+    def send(self, text: str, kind: Optional[str] = None) -> bool:
+        BACKPLANE.publish(worker_channel(self.worker), {"pid": self.pid, "text": text, "kind": kind})
+        return True
+
+
+Sender = Union[Outbox, RemoteOutbox, Session]
+
+
+class RoomLink:
+    """This worker's sockets in a room owned by another worker."""
+
+    def __init__(self, code: str, owner: str):
+        self.code = code
+        self.owner = owner
+        self.members: Dict[str, Union[Outbox, Session]] = {}
+        self.replay = ReplayRing(ROOM_REPLAY)   # owner's rseq, mirrored
+        self.closed = False
+        BACKPLANE.subscribe(room_channel(code), self.deliver)
+
+    def forward(self, event: dict):
+        BACKPLANE.publish(room_inbox(self.code), dict(event, worker=WORKER_ID))
+
+    def deliver(self, data: dict):
+        if data.get("owner_lost"):
+            text = json.dumps({"type": "room_closed", "room": self.code})
+            for out in self.members.values():
+                out.send(text, "room_closed")
+            self.close()
+            return
+        text, kind = data["text"], data.get("kind")
+        blob = frame_for_binary(text) if any(out.binary for out in self.members.values()) else None
+        if data.get("rseq"):
+            self.replay.keep(data["rseq"], text, blob)
+        dead = [pid for pid, out in self.members.items()
+                if not out.send(blob if blob is not None and out.binary else text, kind)]
+        for pid in dead:
+            self.leave(pid)
+
+    def leave(self, pid: str):
+        if self.members.pop(pid, None) is not None:
+            self.forward({"kind": "leave", "pid": pid})
+        if not self.members:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        BACKPLANE.unsubscribe(room_channel(self.code), self.deliver)
+        LINKS.pop(self.code, None)
+
+
+LINKS: Dict[str, RoomLink] = {}
+CONNS: Dict[str, Union[Outbox, Session]] = {}  # this worker's sockets (or player sessions), by pid
+HEARTBEATS = Heartbeats(HEARTBEAT_SEC, IDLE_TIMEOUT_SEC)  # keyed by Outbox
+
+
+def frame_for_binary(text: str) -> Optional[bytes]:
+    """Binary form of a frame serialised by the owning worker; once per frame per worker."""
+    return wire.from_json(text)
+
+
+def deliver_direct(data: dict):
+    out = CONNS.get(data["pid"])
+    if out is not None:
+        blob = frame_for_binary(data["text"]) if out.binary else None
+        out.send(blob if blob is not None else data["text"], data.get("kind"))
+
+
+BACKPLANE.subscribe(worker_channel(WORKER_ID), deliver_direct)
+
+
+def reap_idle():
+    """One heartbeat sweep: ping quiet sockets, evict the dead ones in one batch.
+
+    Evicted handlers clean up as on any drop (sessions are parked, others
+    leave), so their lobby changes land in the same LobbyTicker flush.
+    """
+    quiet, stale = HEARTBEATS.sweep()
+    if quiet:
+        # id 0: ClockSync bunu örnek saymaz, pong sadece canlılık işareti
+        ping = json.dumps({"type": "ping", "id": 0, "ts": wall_ms()})
+        for out in quiet:
+            out.send(ping, "ping")
+    if stale:
+        logger.info("reaping %d idle connections", len(stale))
+        HEARTBEATS.reap(stale)
+        REAPED.inc(len(stale))
+
+
+async def resolve_room(code: Optional[str]) -> Tuple[Optional[QuizState], Optional[RoomLink]]:
+    """Find a room: hosted here, or relayed to its owner. Empty code => default room."""
+    code = (code or "").strip().upper() or DEFAULT_ROOM
+    if code in ROOMS.rooms:
+        return ROOMS.rooms[code], None
+    if code in LINKS:
+        return None, LINKS[code]
+
+    owner = await BACKPLANE.owner(code)
+    if owner is None and code == DEFAULT_ROOM:
+        owner = await BACKPLANE.claim(code)
+    if owner is None:
+        return None, None
+    if owner == WORKER_ID:
+        room = ROOMS.rooms.get(code)
+        if room is None and code == DEFAULT_ROOM:
+            room = ROOMS.create(code)
+        return room, None
+    if code not in LINKS:
+        LINKS[code] = RoomLink(code, owner)
+    return None, LINKS[code]
+
+
+# ---------------------- Sessions ----------------------
+# Oturumlar bu worker'da yaşar: yeniden bağlanan istemci aynı worker'a düşmeli (sticky routing)
+SESSIONS: Dict[str, Session] = {}  # token -> session
+
+
+def open_session(pid: str, out: Outbox) -> Session:
+    session = Session(pid, out, SESSION_REPLAY)
+    SESSIONS[session.token] = session
+    CONNS[pid] = session
+    return session
+
+
+def find_session(token) -> Optional[Session]:
+    """A resumable session for `token`, or None (unknown, expired or its room is gone)."""
+    session = SESSIONS.get(token) if isinstance(token, str) else None
+    if session is None:
+        return None
+    if (session.room is not None and session.room.closed) or (session.link is not None and session.link.closed):
+        end_session(session)
+        return None
+    if session.expiry is not None:
+        session.expiry.cancel()
+        session.expiry = None
+    return session
+
+
+def park_session(session: Session):
+    """Socket dropped: keep the player (frames go to the replay buffer) until the grace period ends."""
+    session.expiry = CLOCK.schedule(SESSION_GRACE_SEC, lambda: expire_session(session))
+
+
+def expire_session(session: Session):
+    if session.connected:
+        return
+    end_session(session)
+    if session.link is not None:
+        session.link.leave(session.pid)
+    elif _leave(session.room, session.pid, session):
+        session.room.spawn(player_left(session.room, session.pid))
+
+
+def end_session(session: Session):
+    SESSIONS.pop(session.token, None)
+    if session.expiry is not None:
+        session.expiry.cancel()
+        session.expiry = None
+    if CONNS.get(session.pid) is session:
+        del CONNS[session.pid]
+
+
+# ---------------------- Game journal ----------------------
+GAMELOG: Optional[GameLog] = None   # opened in lifespan
+
+
+def journal(room: QuizState, kind: str, **fields):
+    if GAMELOG is not None and room.journaled:
+        GAMELOG.append(kind, room.code, **fields)
+
+
+def journal_questions(room: QuizState):
+    """Whole compiled banks are journaled by cache key, samples by value."""
+    questions = room.questions
+    if isinstance(questions, QuestionBank):
+        if questions.path is not None and questions.key is not None:
+            return {"bank": questions.key}
+        return list(questions)
+    return questions
+
+
+def begin_journal(room: QuizState):
+    """Game started: log the questions and the roster, then every transition."""
+    if GAMELOG is None:
+        return
+    room.journaled = True
+    table = room.players
+    players = {pid: [name, out.token if isinstance(out, Session) else None]
+               for pid, name, out in zip(table.pids, table.names, table.outs)}
+    journal(room, "game", questions=journal_questions(room), q_duration=room.q_duration_sec, game=room.game,
+            game_id=room.game_id, players=players)
+
+
+def end_journal(room: QuizState):
+    journal(room, "end")
+    room.journaled = False
+
+
+def room_snapshot(room: QuizState) -> dict:
+    """The room in gamelog.replay's format (fresh lists; the writer thread serialises it)."""
+    table = room.players
+    players = {}
+    for slot, (pid, name, out) in enumerate(zip(table.pids, table.names, table.outs)):
+        players[pid] = [name, out.token if isinstance(out, Session) else None, int(table.scores[slot]),
+                        int(table.streaks[slot]), int.from_bytes(table.answered[slot].tobytes(), "little")]
+    if room.round_active:
+        phase, at = "question", time.time() - (time.monotonic_ns() - room.q_started_ns) / 1e9
+    elif room.current_q_index >= 0:
+        phase, at = "reveal", room.revealed_at
+    else:
+        phase, at = "lobby", 0.0
+    return {"questions": journal_questions(room), "q_duration": room.q_duration_sec, "game": room.game,
+            "game_id": room.game_id, "index": room.current_q_index, "phase": phase, "at": at,
+            "players": players}
+
+
+def game_snapshot() -> dict:
+    return {code: room_snapshot(room) for code, room in ROOMS.rooms.items() if room.journaled}
+
+
+async def run_snapshots():
+    """Compact the journal every GAMELOG_SNAPSHOT_SEC while anything was logged."""
+    while True:
+        await asyncio.sleep(GAMELOG_SNAPSHOT_SEC)
+        if GAMELOG is not None and GAMELOG.pending:
+            GAMELOG.snapshot(game_snapshot())
+
+
+def restore_session(pid: str, token: Optional[str], name: str, room: QuizState) -> Optional[Session]:
+    """Parked session for a journaled player; `resume` with the old token picks it up."""
+    if not token or token in SESSIONS:
+        return None
+    session = Session(pid, None, SESSION_REPLAY)
+    session.token, session.name, session.room = token, name, room
+    session.bind(room.replay)
+    SESSIONS[token] = session
+    CONNS[pid] = session
+    park_session(session)
+    return session
+
+
+async def restore_games():
+    """Rebuild the games that were in progress when the last process stopped."""
+    if GAMELOG is None:
+        return
+    restored = GAMELOG.take_restored()
+    now = time.time()
+    for code, state in restored.items():
+        if code in ROOMS.rooms:
             continue
-        q_text = str(r[idx["question"]] or "").strip()
-        options = [
-            str(r[idx["option1"]] or "").strip(),
-            str(r[idx["option2"]] or "").strip(),
-            str(r[idx["option3"]] or "").strip(),
-            str(r[idx["option4"]] or "").strip(),
-        ]
-        c_raw = r[idx["correct_index"]]
-        correct = int(c_raw) if c_raw is not None else 0
-        correct = max(0, min(3, correct))
-        if not q_text or any(o == "" for o in options):
+        try:
+            room = await ROOMS.open(code)
+        except ValueError as e:
+            logger.warning("game %s not restored: %s", code, e)
             continue
-        out.append({"question": q_text, "options": options, "correct": correct})
+        questions = state["questions"]
+        if isinstance(questions, dict):
+            questions = BANKS.get(questions["bank"])
+            if questions is None:
+                logger.warning("game %s not restored: question bank is gone", code)
+                ROOMS.close(code)
+                continue
+        room.questions = questions
+        room.q_duration_sec = state["q_duration"]
+        room.game, room.game_id = state["game"], state["game_id"]
+        room.results = AnswerLog(room.game)
+        table = room.players
+        table.ensure_questions(len(room.questions))
+        width = table.answered.shape[1]
+        for pid, (name, token, score, streak, answered) in state["players"].items():
+            session = restore_session(pid, token, name, room)
+            if session is None:
+                continue  # başka worker'daki oyuncu: oturumu burada değil
+            room.add_player(pid, name, session)
+            slot = table.slot(pid)
+            table.scores[slot], table.streaks[slot] = score, streak
+            table.answered[slot] = np.frombuffer(answered.to_bytes(width, "little"), dtype=np.uint8)
+            room.ranking.update(pid, score)
+
+        index, elapsed = state["index"], max(0.0, now - state["at"])
+        room.current_q_index = index
+        if state["phase"] == "question":
+            room.stats[index] = QuestionStats(index, len(room.questions[index]["options"]))
+            room.round_active = True
+            room.q_started_ns = time.monotonic_ns() - int(elapsed * 1e9)
+            remaining = room.q_duration_sec - elapsed
+            room.accepting = remaining > 0
+            room.set_timer(max(0.0, remaining), lambda room=room: end_current_question(room))
+        elif state["phase"] == "reveal":
+            room.revealed_at = state["at"]
+            if index + 1 < len(room.questions):
+                room.staged_index = index + 1
+            room.set_timer(max(0.0, REVEAL_PAUSE_SEC - elapsed), lambda room=room: advance_question(room))
+        room.journaled = True
+        logger.info("restored game %s: question %d, %d players", code, index, len(table))
+    if restored:
+        GAMELOG.snapshot(game_snapshot())
 
-    if not out:
-        raise ValueError("Excel'den geçerli soru bulunamadı.")
-    return out
+
+# ---------------------- Helpers ----------------------
+BANKS = BankCache("quiz-demo", max_entries=BANK_CACHE_SIZE, directory=BANK_CACHE_DIR or None,
+                  version=PARSER_VERSION)
+RESULTS: Optional[ResultsStore] = None   # opened in lifespan
 
 
-def load_questions_from_excel(path: str) -> List[dict]:
-    # Dosya yolundan oku
-    wb = load_workbook(filename=path, read_only=True, data_only=True)
-    ws = wb.active
-    rows = list(ws.iter_rows(values_only=True))
-    return _parse_rows(rows)
+class UploadTooLarge(ValueError):
+    pass
 
 
-def load_questions_from_bytes(data: bytes) -> List[dict]:
-    # Upload edilen byte verisinden oku
-    wb = load_workbook(filename=BytesIO(data), read_only=True, data_only=True)
-    ws = wb.active
-    rows = list(ws.iter_rows(values_only=True))
-    return _parse_rows(rows)
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
 
-async def broadcast(payload: dict):
-    """Send to all players and admins. Always JSON-encoded."""
-    text = json.dumps(payload)
-    dead_players: List[str] = []
-    for pid, p in list(STATE.players.items()):
+async def spool_upload(file: UploadFile, limit: int = MAX_UPLOAD_BYTES) -> Tuple[str, str]:
+    """Copy an upload to a temp file chunk by chunk. Returns (path, sha256)."""
+    h = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(f"Dosya çok büyük (en fazla {limit // (1024 * 1024)} MB).")
+                h.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, h.hexdigest()
+
+
+def load_questions_from_excel(path: str, errors: Optional[RowErrors] = None) -> QuestionBank:
+    # Senkron yol (betikler/testler); sunucu BankLoader üzerinden havuzda ayrıştırır
+    return BANKS.get_or_load(_hash_file(path), lambda: parse_workbook(path, errors))
+
+
+class BankLoader:
+    """Parses workbooks in a process pool so openpyxl never runs on the event loop.
+
+    Cache hits skip the pool. Workers report rows seen on a multiprocessing
+    queue, polled every `progress_sec` while the future is pending. A worker
+    streams validated rows into a compiled bank file next to the cache and
+    returns only its name; the parent moves it into place and maps it.
+    """
+
+    def __init__(self, cache: BankCache, workers: int = PARSE_WORKERS,
+                 progress_sec: float = LOAD_PROGRESS_SEC, progress_rows: int = LOAD_PROGRESS_ROWS):
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.progress_sec = progress_sec
+        self.progress_rows = progress_rows
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue = None
+        self._seq = 0
+        self._rows: Dict[int, int] = {}
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: çalışan event loop / thread'lerle fork güvenli değil
+            ctx = multiprocessing.get_context("spawn")
+            self._queue = ctx.Queue()
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=ctx, initializer=init_worker, initargs=(self._queue,))
+        return self._pool
+
+    def _drain(self):
+        while True:
+            try:
+                job, rows = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._rows[job] = rows
+
+    async def load(self, path: str, key: Optional[str] = None,
+                   on_progress: Optional[Callable[[int], Awaitable[None]]] = None) -> Tuple[QuestionBank, dict]:
+        """(compiled bank, row error report). Raises BankParseError for unusable sheets."""
+        if key is None:
+            key = await asyncio.to_thread(_hash_file, path)
+        bank = self.cache.get(key)
+        if bank is not None:
+            self.cache.hits += 1
+            return bank, {"skipped": 0, "errors": []}
+        self.cache.misses += 1
+        self._seq += 1
+        job = self._seq
+        fut = asyncio.get_running_loop().run_in_executor(
+            self._ensure_pool(), parse_job, job, path, self.progress_rows, self.cache.directory)
+        reported = 0
         try:
-            await p.ws.send_text(text)
-        except Exception:
-            dead_players.append(pid)
+            while True:
+                done, _ = await asyncio.wait({fut}, timeout=self.progress_sec)
+                self._drain()
+                if done:
+                    break
+                rows = self._rows.get(job, 0)
+                if on_progress is not None and rows > reported:
+                    reported = rows
+                    await on_progress(rows)
+            compiled, report = fut.result()
+        except BrokenProcessPool:
+            self._pool = None  # bir sonraki yükleme havuzu yeniden kurar
+            raise
+        finally:
+            self._rows.pop(job, None)
+        bank = await asyncio.to_thread(self.cache.adopt, key, compiled)
+        self.cache.remember(key, bank)
+        return bank, report
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+LOADER = BankLoader(BANKS)
+
+
+async def install_bank(room: "QuizState", path: str, key: Optional[str] = None) -> Tuple[QuestionBank, dict]:
+    """Parse and compile off-loop, then swap the room's bank in a single assignment."""
+    room.bank_seq += 1
+    seq = room.bank_seq
+
+    async def progress(rows: int):
+        await broadcast(room, {"type": "questions_loading", "rows": rows})
+
+    await progress(0)
+    bank, report = await LOADER.load(path, key, progress)
+    if room.closed or seq != room.bank_seq:
+        raise ValueError("Daha yeni bir soru yüklemesi başladı; bu yükleme yok sayıldı.")
+    room.bank = room.questions = bank
+    await broadcast(room, bank_loaded_frame(bank))
+    return bank, report
+
+
+def bank_loaded_frame(bank: Sequence[dict]) -> dict:
+    frame = {"type": "questions_loaded", "count": len(bank)}
+    if isinstance(bank, QuestionBank):
+        frame.update(tags=bank.tags, difficulties=bank.difficulties())
+    return frame
+
+
+async def load_bank_for(room: "QuizState", path: str, out: "Sender"):
+    # ws `load_questions`: arka planda çalışır, mesaj döngüsünü bekletmez
+    try:
+        _, report = await install_bank(room, path)
+        if report["skipped"]:
+            send_to(out, {"type": "load_report", **report})
+    except Exception as e:
+        send_to(out, {"type": "error", "message": str(e)})
+
+
+async def broadcast(room: QuizState, payload: dict, coalesce: bool = True):
+    """Queue to the room's players and admins. Encoded once; never waits on a socket.
+
+    `coalesce=False` for frames that must not replace one another in a slow
+    client's queue (sequence-numbered deltas).
+    """
+    started = time.perf_counter()
+    # oda sırası (rseq) bir kez eklenir; kare odanın halkasında tek kopya
+    text, blob = room.replay.stamp(json.dumps(payload), wire.encode(payload))
+    kind = payload.get("type") if coalesce else None
+    remote = room.remote
+    table = room.players
+    if blob is None:
+        dead_players = [
+            pid for pid, out in zip(table.pids, table.outs)
+            if pid not in remote and not out.send(text, kind)
+        ]
+    else:
+        dead_players = [
+            pid for pid, out in zip(table.pids, table.outs)
+            if pid not in remote and not out.send(blob if out.binary else text, kind)
+        ]
     for pid in dead_players:
-        STATE.players.pop(pid, None)
+        room.remove_player(pid)
+        room.lobby.left(pid)
+    if dead_players:
+        room.scores_ticker.mark_dirty()
 
-    dead_admins: List[WebSocket] = []
-    for a in list(STATE.admins):
-        try:
-            await a.send_text(text)
-        except Exception:
-            dead_admins.append(a)
+    dead_admins = [a for a in room.admins if not isinstance(a, RemoteOutbox)
+                   and not a.send(blob if blob is not None and a.binary else text, kind)]
     for a in dead_admins:
-        STATE.admins.discard(a)
+        room.admins.discard(a)
+
+    # Diğer worker'lar kendi soketlerine dağıtır (tek mesaj)
+    if remote:
+        BACKPLANE.publish(room_channel(room.code), {"text": text, "kind": kind, "rseq": room.replay.seq})
+    BROADCAST_BYTES.observe(len(text))  # json.dumps ASCII üretir: karakter = bayt
+    BROADCAST_SECONDS.observe(time.perf_counter() - started)
+
+
+def send_to(out: "Sender", payload: dict):
+    blob = wire.encode(payload) if out.binary else None
+    out.send(blob if blob is not None else json.dumps(payload), payload.get("type"))
+
 
+async def broadcast_scores(room: QuizState, topn: int = 5):
+    """Send the mini-leaderboard right away (quiz start / reset)."""
+    top = room.top_scores(topn)
+    room.scores_ticker.last_sent = top
+    await broadcast(room, {"type": "scores", "top5": top})
 
-async def broadcast_scores(topn: int = 5):
-    leaderboard: List[Tuple[str, int]] = sorted(
-        ((p.name, p.score) for p in STATE.players.values()),
-        key=lambda x: x[1],
-        reverse=True,
-    )
-    await broadcast({"type": "scores", "top5": list(leaderboard)[:topn]})
+
+class Ticker:
+    """Throttled flush loop shared by the room's live frames.
+
+    `_wake()` is cheap; while `pending()` holds, `flush()` runs at most once
+    per interval. Subclasses only decide what is pending and what to send.
+    """
+
+    def __init__(self, room: "QuizState", interval: float):
+        self.room = room
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def pending(self) -> bool:
+        raise NotImplementedError
+
+    async def flush(self):
+        raise NotImplementedError
+
+    def _wake(self):
+        if self._task is None or self._task.done():
+            self._task = self.room.spawn(self._run())
+
+    async def _run(self):
+        # İlk değişiklik hemen gider, sonrakiler tick sonunda toplu gönderilir
+        while self.pending():
+            await self.flush()
+            await asyncio.sleep(self.interval)
+
+
+class DirtyTicker(Ticker):
+    """A Ticker whose frame is rebuilt from room state: one dirty flag is all it tracks."""
+
+    def __init__(self, room: "QuizState", interval: float):
+        super().__init__(room, interval)
+        self.dirty = False
+
+    def mark_dirty(self):
+        self.dirty = True
+        self._wake()
+
+    def pending(self) -> bool:
+        if not self.dirty:
+            return False
+        self.dirty = False
+        return True
+
+
+class ScoreTicker(DirtyTicker):
+    """Coalesces live `scores` frames; skips a tick when the top-N has not changed."""
+
+    def __init__(self, room: "QuizState", interval: float, topn: int = 5):
+        super().__init__(room, interval)
+        self.topn = topn
+        self.last_sent: Optional[List[Tuple[str, int]]] = None
+
+    async def flush(self):
+        top = self.room.top_scores(self.topn)
+        if top != self.last_sent:
+            self.last_sent = top
+            await broadcast(self.room, {"type": "scores", "top5": top})
+
+
+class StatsTicker(DirtyTicker):
+    """Throttled `answer_stats` for admins (current question only)."""
+
+    async def flush(self):
+        stats = self.room.stats.get(self.room.current_q_index)
+        if stats is not None and self.room.admins:
+            text = json.dumps(stats.frame())
+            for admin in list(self.room.admins):
+                admin.send(text, "answer_stats")
+
+
+class LobbyTicker(Ticker):
+    """Lobby changes as sequence-numbered deltas instead of full player lists.
+
+    Changes are collected per pid (last one wins) and flushed at most once
+    per interval as one `player_left {pids}` and one `player_joined
+    {players: [[pid, name]]}` frame, each with its own `seq`. Deltas carry
+    final state, so replaying one over a newer snapshot is harmless; a client
+    that sees a gap asks for `lobby_sync`.
+    """
+
+    def __init__(self, room: "QuizState", interval: float):
+        super().__init__(room, interval)
+        self.seq = 0
+        self.changes: Dict[str, Optional[str]] = {}   # pid -> name, None = left
+
+    def joined(self, pid: str, name: str):
+        self._mark(pid, name)
+
+    def left(self, pid: str):
+        self._mark(pid, None)
+
+    def _mark(self, pid: str, name: Optional[str]):
+        self.changes.pop(pid, None)
+        self.changes[pid] = name
+        self._wake()
+
+    def pending(self) -> bool:
+        return bool(self.changes)
+
+    async def flush(self):
+        changes, self.changes = self.changes, {}
+        left = [pid for pid, name in changes.items() if name is None]
+        joined = [[pid, name] for pid, name in changes.items() if name is not None]
+        # sıra: önce ayrılanlar (aynı tick'te çıkıp geri gelen de doğru sonuçlansın)
+        if left:
+            self.seq += 1
+            await broadcast(self.room, {"type": "player_left", "seq": self.seq, "pids": left}, coalesce=False)
+        if joined:
+            self.seq += 1
+            await broadcast(self.room, {"type": "player_joined", "seq": self.seq, "players": joined}, coalesce=False)
 
 
 def score_for_elapsed(elapsed: float) -> int:
@@ -153,60 +995,212 @@ def score_for_elapsed(elapsed: float) -> int:
     return 0
 
 
-async def start_question(index: int):
-    STATE.current_q_index = index
-    STATE.accepting = True
-    STATE.round_active = True
-    STATE.q_started_at = utc_now()
-
-    q = STATE.questions[index]
-    expires_at = (STATE.q_started_at.timestamp() + STATE.q_duration_sec)
-
-    await broadcast({
-        "type": "question",
+# score_for_elapsed eşikleri, dizi halinde (aynı sınırlar: x <= eşik)
+SCORE_THRESHOLDS = np.array([3.0, 5.0, 10.0])
+SCORE_POINTS = np.array([5, 3, 2, 0])
+
+
+def score_for_elapsed_batch(elapsed: np.ndarray) -> np.ndarray:
+    """Vectorized score_for_elapsed over an array of elapsed seconds."""
+    return SCORE_POINTS[np.searchsorted(SCORE_THRESHOLDS, elapsed, side="left")]
+
+
+class AnswerBatch:
+    """Buffers the current question's answers and scores them per tick.
+
+    Duplicates are rejected before buffering (answered bitset), so a flush
+    only does array arithmetic on the player table plus one ack per answer.
+    """
+
+    def __init__(self, room: "QuizState", interval: float, max_size: int):
+        self.room = room
+        self.interval = interval
+        self.max_size = max(1, max_size)
+        self.q_index = -1
+        self.pids: List[str] = []
+        self.outs: List["Sender"] = []
+        self.choices: List[int] = []
+        self.elapsed: List[float] = []
+        self.received: List[int] = []   # monotonic ns, for ack latency
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.pids)
+
+    def add(self, pid: str, out: "Sender", q_index: int, choice: int, elapsed: float):
+        if self.pids and q_index != self.q_index:
+            self.flush()
+        self.q_index = q_index
+        self.pids.append(pid)
+        self.outs.append(out)
+        self.choices.append(choice)
+        self.elapsed.append(elapsed)
+        self.received.append(time.monotonic_ns())
+        ANSWERS.inc()
+        if len(self.pids) >= self.max_size:
+            self.flush()
+        elif self._task is None or self._task.done():
+            self._task = self.room.spawn(self._tick())
+
+    async def _tick(self):
+        await asyncio.sleep(self.interval)
+        self.flush()
+
+    def clear(self):
+        self.pids, self.outs, self.choices, self.elapsed, self.received = [], [], [], [], []
+
+    def flush(self):
+        if not self.pids:
+            return
+        room = self.room
+        pids, outs = self.pids, self.outs
+        choices = np.array(self.choices, dtype=np.int64)
+        elapsed = np.array(self.elapsed, dtype=np.float64)
+        received = np.array(self.received, dtype=np.int64)
+        self.clear()
+
+        q = room.questions[self.q_index]
+        correct = (choices == q["correct"]) & (elapsed <= room.q_duration_sec)
+        points = np.where(correct, score_for_elapsed_batch(elapsed), 0)
+
+        # Oyuncu tablosuna toplu uygula (ayrılanlar: slot -1)
+        table = room.players
+        slots = table.slots(pids)
+        live = slots >= 0
+        slots, correct, points = slots[live], correct[live], points[live]
+        np.add.at(table.scores, slots, points)
+        table.streaks[slots] = np.where(correct, table.streaks[slots] + 1, 0)
+
+        live_pids = [pid for pid, keep in zip(pids, live.tolist()) if keep]
+        live_outs = [out for out, keep in zip(outs, live.tolist()) if keep]
+        choices, elapsed = choices[live], elapsed[live]
+        stats = room.stats.get(self.q_index)
+        if stats is not None:
+            stats.add(choices, correct, elapsed)
+            room.stats_ticker.mark_dirty()
+        live_names = [table.names[s] for s in slots.tolist()]
+        room.results.append(self.q_index, live_pids, live_names, choices, correct, points, elapsed)
+        journal(room, "scored", q=self.q_index, pids=live_pids, points=points.tolist(), correct=correct.tolist())
+        if RESULTS is not None and room.game_id:
+            RESULTS.answers(room.game_id, self.q_index, live_pids, live_names, choices, correct, points, elapsed)
+        new_scores = table.scores[slots].tolist()
+        for pid, score, ok in zip(live_pids, new_scores, correct.tolist()):
+            if ok:
+                room.ranking.update(pid, score)
+
+        # feedback only to that player (UI anında yazı göstermiyor), toplu
+        streaks = table.streaks[slots].tolist()
+        for pid, out, ok, score, streak in zip(live_pids, live_outs, correct.tolist(), new_scores, streaks):
+            send_to(out, {
+                "type": "answer_ack",
+                "correct": ok,
+                "score": score,
+                "streak": streak,
+                "rank": room.ranking.rank_of(pid),
+                "index": self.q_index,
+            })
+        ACK_SECONDS.observe_many((time.monotonic_ns() - received) / 1e9)
+
+        # canlı mini-leaderboard (tick ile birleştirilir)
+        room.scores_ticker.mark_dirty()
+
+
+def question_deadline(room: QuizState) -> float:
+    """Epoch seconds UTC; the client converts it with its clock offset."""
+    elapsed = (time.monotonic_ns() - room.q_started_ns) / 1e9
+    return time.time() + room.q_duration_sec - elapsed
+
+
+def staged_frame(room: QuizState, index: int) -> dict:
+    """Question text without a deadline; clients hold it until `go`."""
+    q = room.questions[index]
+    return {
+        "type": "prestage",
         "index": index,
         "question": q["question"],
         "options": q["options"],
-        "expires_at": expires_at,  # epoch seconds UTC
-        "q_total": len(STATE.questions),
-    })
+        "q_total": len(room.questions),
+    }
+
+
+def question_frame(room: QuizState) -> dict:
+    return dict(staged_frame(room, room.current_q_index), type="question", expires_at=question_deadline(room))
+
+
+def current_question_for(room: QuizState, pid: str) -> Optional[dict]:
+    """Running question for one (re)connecting client, with its answered flag."""
+    if not room.round_active:
+        return None
+    frame = question_frame(room)
+    slot = room.players.slot(pid)
+    frame["answered"] = slot is not None and room.players.has_answered(slot, room.current_q_index)
+    return frame
 
-    # Schedule to end the question after duration
-    asyncio.create_task(end_question_after_delay(STATE.q_duration_sec))
 
+async def start_question(room: QuizState, index: int):
+    room.current_q_index = index
+    room.accepting = True
+    room.round_active = True
+    room.q_started_ns = time.monotonic_ns()
+    journal(room, "question", index=index, at=time.time())
+    room.stats[index] = QuestionStats(index, len(room.questions[index]["options"]))
+    room.stats_ticker.mark_dirty()  # admin panelinde sıfırdan başlasın
 
-async def end_question_after_delay(delay: int):
-    await asyncio.sleep(delay)
-    await end_current_question()
+    if room.staged_index == index:
+        # metin reveal beklemesinde gitti: başlangıç sadece index + deadline
+        await broadcast(room, {"type": "go", "index": index, "expires_at": question_deadline(room)})
+    else:
+        await broadcast(room, question_frame(room))
+    room.staged_index = -1
+
+    # End the question after duration (replaces any earlier timer of this room)
+    room.set_timer(room.q_duration_sec, lambda: end_current_question(room))
 
 
-async def end_current_question():
-    if not STATE.round_active:
+async def end_current_question(room: QuizState):
+    if not room.round_active:
         return
-    STATE.accepting = False
-    STATE.round_active = False
+    room.cancel_timer()  # `next` ile erken bitti: eski süre dolumu tetiklenmesin
+    room.accepting = False
+    room.round_active = False
+    room.answers.flush()  # süre içinde gelen ama henüz puanlanmamış cevaplar
+    room.revealed_at = time.time()
+    journal(room, "reveal", index=room.current_q_index, at=room.revealed_at)
 
     # Reveal correct answer to everyone
-    q = STATE.questions[STATE.current_q_index]
-    await broadcast({
+    q = room.questions[room.current_q_index]
+    await broadcast(room, {
         "type": "reveal",
-        "index": STATE.current_q_index,
+        "index": room.current_q_index,
         "correct": q["correct"],
     })
 
+    # Sıradaki soru bekleme sırasında gider (bant genişliği başlangıç anına yığılmasın)
+    nxt = room.current_q_index + 1
+    if nxt < len(room.questions):
+        room.staged_index = nxt
+        await broadcast(room, staged_frame(room, nxt))
+
     # Short pause before next question
-    await asyncio.sleep(2)
+    room.set_timer(REVEAL_PAUSE_SEC, lambda: advance_question(room))
 
+
+async def advance_question(room: QuizState):
     # Next or leaderboard
-    if STATE.current_q_index + 1 < len(STATE.questions):
-        await start_question(STATE.current_q_index + 1)
+    if room.closed:
+        return
+    if room.current_q_index + 1 < len(room.questions):
+        await start_question(room, room.current_q_index + 1)
     else:
-        leaderboard = sorted(
-            [(p.name, p.score) for p in STATE.players.values()],
-            key=lambda x: x[1], reverse=True
-        )
+        ranked = room.ranking.ranking()
+        leaderboard = [(room.players.name(pid), score) for pid, score in ranked]
         top3 = leaderboard[:3]
-        await broadcast({
+        if RESULTS is not None and room.game_id:
+            RESULTS.game_finished(room.game_id, [(pid, name, score) for (pid, _), (name, score)
+                                                 in zip(ranked, leaderboard)])
+            room.game_id = ""
+        end_journal(room)
+        await broadcast(room, {
             "type": "leaderboard",
             "top3": top3,
             "all": leaderboard,
@@ -229,127 +1223,532 @@ async def health():
     return JSONResponse({"ok": True})
 
 
+@METRICS.collector
+def _room_metrics():
+    rooms = list(ROOMS.rooms.values())
+    yield from gauge("quiz_room_players", "Players in a room owned by this worker.",
+                     (({"room": r.code}, len(r.players)) for r in rooms))
+    yield from gauge("quiz_room_admins", "Admins in a room owned by this worker.",
+                     (({"room": r.code}, len(r.admins)) for r in rooms))
+    yield from gauge("quiz_connections", "Open WebSocket connections on this worker.",
+                     [({"worker": WORKER_ID}, len(_open_outboxes()))])
+    yield from gauge("quiz_sessions", "Player sessions on this worker.",
+                     [({"state": "attached"}, sum(s.connected for s in SESSIONS.values())),
+                      ({"state": "detached"}, sum(not s.connected for s in SESSIONS.values()))])
+
+
+def _open_outboxes() -> List[Outbox]:
+    outs = []
+    for conn in CONNS.values():
+        out = conn.out if isinstance(conn, Session) else conn
+        if out is not None:
+            outs.append(out)
+    return outs
+
+
+@METRICS.collector
+def _queue_metrics():
+    outs = _open_outboxes()
+    depth = Histogram("quiz_send_queue_depth", "Send-queue depth per connection at scrape time.",
+                      (0, 1, 2, 4, 8, 16, 32, 64, 128, 256))
+    depth.observe_many(np.fromiter((len(o.queue) for o in outs), dtype=np.float64, count=len(outs)))
+    yield from depth.render()
+    yield from counter("quiz_send_dropped_frames_total", "Frames dropped or coalesced by slow-consumer policy.",
+                       [(None, Outbox.dropped_total)])
+    yield from counter("quiz_bank_cache_lookups_total", "Question bank cache lookups.",
+                       [({"result": "hit"}, BANKS.hits), ({"result": "miss"}, BANKS.misses)])
+
+
+@app.get("/api/metrics")
+async def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+# ---------------------- Rooms API ----------------------
+@app.get("/api/rooms")
+async def list_rooms():
+    rooms = [
+        {"code": r.code, "players": len(r.players), "q_count": len(r.questions), "active": r.round_active}
+        for r in ROOMS.rooms.values()
+    ]
+    # Diğer worker'ların odaları (yalnızca kod)
+    for code, owner in (await BACKPLANE.rooms()).items():
+        if owner != WORKER_ID:
+            rooms.append({"code": code, "worker": owner})
+    return {"ok": True, "rooms": rooms}
+
+
+@app.post("/api/rooms")
+async def create_room():
+    try:
+        room = await ROOMS.open()
+    except ValueError as e:
+        return JSONResponse(status_code=429, content={"ok": False, "error": str(e)})
+    return {"ok": True, "code": room.code}
+
+
+async def close_room(room: QuizState):
+    end_journal(room)
+    await broadcast(room, {"type": "room_closed", "room": room.code})
+    ROOMS.close(room.code)
+
+
+@app.delete("/api/rooms/{code}")
+async def delete_room(code: str):
+    room, link = await resolve_room(code)
+    if room is not None:
+        await close_room(room)
+    elif link is not None:
+        link.forward({"kind": "close"})
+    else:
+        return JSONResponse(status_code=404, content={"ok": False, "error": "Oda bulunamadı."})
+    return {"ok": True}
+
+
 # ---------------------- Upload API ----------------------
 @app.post("/api/upload")
-async def upload_excel(file: UploadFile = File(...)):
+async def upload_excel(room: str = DEFAULT_ROOM, file: UploadFile = File(...)):
+    target, link = await resolve_room(room)
+    if target is None and link is None:
+        return JSONResponse(status_code=404, content={"ok": False, "error": "Oda bulunamadı."})
     try:
-        data = await file.read()
-        STATE.questions = load_questions_from_bytes(data)
-        await broadcast({"type": "questions_loaded", "count": len(STATE.questions)})
-        return {"ok": True, "count": len(STATE.questions)}
+        path, key = await spool_upload(file)
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"ok": False, "error": str(e)})
+    try:
+        if target is not None:
+            questions, report = await install_bank(target, path, key)
+        else:
+            async def progress(rows: int):
+                link.forward({"kind": "loading", "rows": rows})
+
+            questions, report = await LOADER.load(path, key, progress)
+            if questions.path is not None:
+                # derlenmiş dosya ortak dizinde: sahibi aynı sayfaları eşler
+                link.forward({"kind": "bank", "key": questions.key})
+            else:
+                link.forward({"kind": "questions", "questions": list(questions)})
+        return {"ok": True, "count": len(questions), **report}
+    except BankParseError as e:
+        return JSONResponse(status_code=400, content={"ok": False, "error": str(e), **e.report})
     except Exception as e:
         return JSONResponse(status_code=400, content={"ok": False, "error": str(e)})
+    finally:
+        os.unlink(path)
+
+
+# ---------------------- Export API ----------------------
+@app.get("/api/export")
+async def export_answers(room: str = DEFAULT_ROOM):
+    """Per-answer CSV of the room's latest game, streamed one scored batch at a time."""
+    target, link = await resolve_room(room)
+    if target is None:
+        if link is not None:
+            return JSONResponse(status_code=409, content={"ok": False, "error": f"Oda başka bir sunucuda: {link.owner}"})
+        return JSONResponse(status_code=404, content={"ok": False, "error": "Oda bulunamadı."})
+    log = target.results
+    filename = f"{target.code}-oyun{log.game}.csv"
+    return StreamingResponse(log.iter_csv(), media_type="text/csv",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+# ---------------------- Results API ----------------------
+async def _results_page(query: str, *args, limit: int, offset: int):
+    """Run a store query off the loop; `next_offset` is None on the last page."""
+    if RESULTS is None:
+        return JSONResponse(status_code=503, content={"ok": False, "error": "Sonuç kaydı kapalı."})
+    limit = max(1, min(limit, RESULTS_PAGE_MAX))
+    offset = max(0, offset)
+    items = await asyncio.to_thread(getattr(RESULTS, query), *args, limit + 1, offset)
+    more = len(items) > limit
+    return {"ok": True, "items": items[:limit], "offset": offset,
+            "next_offset": offset + limit if more else None}
+
+
+@app.get("/api/results/games")
+async def results_games(limit: int = 50, offset: int = 0):
+    """Most recent games first."""
+    return await _results_page("recent_games", limit=limit, offset=offset)
+
+
+@app.get("/api/results/players/{name}")
+async def results_player(name: str, limit: int = 50, offset: int = 0):
+    """Score and rank of every finished game the player (by name) took part in."""
+    return await _results_page("player_history", name, limit=limit, offset=offset)
+
+
+@app.get("/api/results/questions")
+async def results_questions(limit: int = 50, offset: int = 0):
+    """Answer count and accuracy per question text, across all games."""
+    return await _results_page("question_accuracy", limit=limit, offset=offset)
+
+
+# ---------------------- Messages ----------------------
+def _leave(room: Optional[QuizState], pid: str, out: "Sender") -> bool:
+    """Detach a connection from its room. True if a player left the lobby."""
+    if room is None or room.closed:
+        return False
+    room.admins.discard(out)
+    room.remote.pop(pid, None)
+    if pid in room.players:
+        room.remove_player(pid)
+        return True
+    return False
+
+
+def send_current_question(room: QuizState, pid: str, out: "Sender"):
+    frame = current_question_for(room, pid)
+    if frame is not None:
+        send_to(out, frame)
+    elif room.staged_index >= 0:
+        send_to(out, staged_frame(room, room.staged_index))
+
+
+def game_questions(room: QuizState, msg: dict) -> Sequence[dict]:
+    """Questions for a new game; `count` / `tags` / `difficulty` sample the loaded bank."""
+    count = max(0, int(msg.get("count") or 0))
+    tags = msg.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    tags = [str(t).strip().lower() for t in tags if str(t).strip()]
+    difficulty = max(0, int(msg.get("difficulty") or 0))
+    if room.bank is None:
+        return room.questions  # başka yoldan gelen liste (röle / kurtarma): filtre yok
+    if not (count or tags or difficulty):
+        return room.bank
+    return room.bank.sample(count or len(room.bank), tags, difficulty)
+
+
+async def player_left(room: QuizState, pid: str):
+    # notify lobby & mini scores update
+    room.lobby.left(pid)
+    room.scores_ticker.mark_dirty()
+
+
+async def handle_message(room: QuizState, pid: str, out: "Sender", msg: dict):
+    """Apply one client message to a room this worker owns."""
+    mtype = msg.get("type")
+
+    # ---- Join as player ----
+    if mtype == "join":
+        if MAX_PLAYERS_PER_ROOM and pid not in room.players and len(room.players) >= MAX_PLAYERS_PER_ROOM:
+            THROTTLED.inc("room_full")
+            send_to(out, {"type": "error", "message": "Oda dolu."})
+            return
+        name = (msg.get("name") or f"Player-{pid[-4:]}").strip()[:24]
+        room.add_player(pid, name, out)
+        # Notify admins/players about lobby change (delta), newcomer gets the full list
+        room.lobby.joined(pid, name)
+        # session: yeniden bağlanınca `resume` ile gönderilecek anahtar (ws handler ekler)
+        send_to(out, {"type": "joined", "name": name, "room": room.code, "session": msg.get("session"),
+                      "wire": msg.get("wire", "json")})
+        send_to(out, room.lobby_snapshot())
+        # skor panelini güncelle (yeni gelen hemen görsün, diğerleri tick ile)
+        send_to(out, {"type": "scores", "top5": room.top_scores(room.scores_ticker.topn)})
+        room.scores_ticker.mark_dirty()
+        if room.staged_index >= 0:
+            # reveal beklemesinde katıldı: birazdan gelecek `go` için soru elinde olsun
+            send_to(out, staged_frame(room, room.staged_index))
+
+    # ---- Join as admin ----
+    elif mtype == "admin":
+        room.admins.add(out)
+        send_to(out, {
+            "type": "admin_ack",
+            "room": room.code,
+            "players": room.player_names(),
+            "pids": list(room.players.pids),
+            "seq": room.lobby.seq,
+            "q_count": len(room.questions),
+            "wire": msg.get("wire", "json"),
+        })
+
+    # ---- Lobby resync (client saw a gap in seq) ----
+    elif mtype == "lobby_sync":
+        send_to(out, room.lobby_snapshot())
+
+    # ---- Resumed session whose replay buffer fell short: current state ----
+    elif mtype == "resync":
+        if pid not in room.players:
+            send_to(out, {"type": "resume_failed"})
+            return
+        send_to(out, {"type": "state", "name": room.players.name(pid), "room": room.code,
+                      "score": room.players.score(pid), "streak": room.players.streak(pid)})
+        send_to(out, room.lobby_snapshot())
+        send_to(out, {"type": "scores", "top5": room.top_scores(room.scores_ticker.topn)})
+        send_current_question(room, pid, out)
+
+    # ---- Client got `go` without the staged question (dropped / joined late) ----
+    elif mtype == "question_sync":
+        send_current_question(room, pid, out)
+
+    # ---- Load questions from Excel path (opsiyonel) ----
+    elif mtype == "load_questions":
+        path = msg.get("path", "questions.xlsx")
+        room.spawn(load_bank_for(room, path, out))
+
+    # ---- Start quiz (admin) ----
+    elif mtype == "start_quiz":
+        try:
+            questions = game_questions(room, msg)
+        except (TypeError, ValueError):
+            send_to(out, {"type": "error", "message": "Geçersiz soru filtresi."})
+            return
+        if not questions:
+            message = "Filtreye uyan soru yok." if room.bank is not None else "Önce Excel'den soruları yükleyin."
+            send_to(out, {"type": "error", "message": message})
+        else:
+            room.questions = questions
+            room.soft_reset()
+            room.new_game()
+            begin_journal(room)
+            await broadcast_scores(room)  # mini-leaderboard ilk gönderim
+            await start_question(room, 0)
+
+    # ---- Player answer ----
+    elif mtype == "answer":
+        if not room.accepting or room.current_q_index < 0:
+            return
+        slot = room.players.slot(pid)
+        if slot is None:
+            return
+
+        # Only first answer per question
+        if room.players.has_answered(slot, room.current_q_index):
+            return
+
+        try:
+            chosen = int(msg.get("choice", -1))
+        except (TypeError, ValueError):
+            chosen = -1
+
+        # Soru oyuncuya tek yön gecikmeyle ulaştı, cevap tek yönle döndü: RTT kadar düş
+        credit = min(float(msg.get("rtt_ms") or 0.0), MAX_LATENCY_CREDIT_MS) / 1000.0
+        elapsed = max(0.0, (time.monotonic_ns() - room.q_started_ns) / 1e9 - credit) if room.q_started_ns else 999
+
+        room.players.mark_answered(slot, room.current_q_index)
+        # puanlama + answer_ack bir sonraki batch flush'ında
+        room.answers.add(pid, out, room.current_q_index, chosen, elapsed)
+
+    # ---- Force end / next (admin) ----
+    elif mtype == "next":
+        await end_current_question(room)
+
+    # ---- Reset lobby (admin) ----
+    elif mtype == "reset":
+        room.soft_reset()
+        end_journal(room)
+        await broadcast(room, {"type": "reset_done"})
+        await broadcast_scores(room)
+
+
+async def process_remote(room: QuizState):
+    """Drain events relayed from other workers, in arrival order."""
+    while room.inbox and not room.closed:
+        event = room.inbox.popleft()
+        kind = event.get("kind")
+        pid = event.get("pid", "")
+        try:
+            if kind == "msg":
+                out = room.remote.get(pid)
+                if out is None:
+                    out = room.remote[pid] = RemoteOutbox(event["worker"], pid)
+                await handle_message(room, pid, out, event["msg"])
+            elif kind == "leave":
+                if _leave(room, pid, room.remote.get(pid)):
+                    await player_left(room, pid)
+            elif kind == "loading":
+                await broadcast(room, {"type": "questions_loading", "rows": event["rows"]})
+            elif kind == "questions":
+                room.bank_seq += 1
+                room.bank, room.questions = None, event["questions"]
+                await broadcast(room, bank_loaded_frame(room.questions))
+            elif kind == "bank":
+                bank = BANKS.get(event["key"])
+                if bank is None:
+                    raise ValueError(f"question bank {event['key']} not found")
+                room.bank_seq += 1
+                room.bank = room.questions = bank
+                await broadcast(room, bank_loaded_frame(bank))
+            elif kind == "close":
+                await close_room(room)
+        except Exception as e:
+            logger.exception("remote event failed: %s", e)
 
 
 # ---------------------- WebSocket ----------------------
+THROTTLE_TEXT = json.dumps({"type": "error", "message": "Çok hızlı mesaj gönderiyorsunuz."})
+
+
+def message_class(mtype) -> Optional[str]:
+    """Rate-limit bucket for a message type (None: only the per-frame limit applies)."""
+    if mtype in ADMIN_COMMANDS:
+        return "admin"
+    if mtype in SNAPSHOT_REQUESTS:
+        return "snapshot"
+    if mtype in ("join", "answer", "sync", "resume"):
+        return mtype
+    return None
+
+
+def throttle(out: Outbox, pid: str, limiter: RateLimiter, cls: str):
+    THROTTLED.inc(cls)
+    if limiter.throttled == 1:
+        logger.warning("throttling %s (%s)", pid, cls)
+    out.send(THROTTLE_TEXT, "error")  # coalesce: kuyrukta tek uyarı
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
-    pid = hex(id(ws))
+    pid = f"{WORKER_ID}-{id(ws):x}"
+    out = Outbox(ws, maxsize=SEND_QUEUE_MAX, policy=SLOW_CONSUMER_POLICY)
+    CONNS[pid] = out
+    HEARTBEATS.watch(out, asyncio.current_task())
+    sync = ClockSync()
+    send_to(out, sync.start_round())
+    room: Optional[QuizState] = None  # bu worker'da tutulan oda
+    link: Optional[RoomLink] = None   # başka worker'daki oda
+    session: Optional[Session] = None  # oyuncu olarak katılınca açılır, yeniden bağlanınca devralınır
+    limiter = RateLimiter(RATE_LIMITS)
+    close_code = 1006
     try:
         while True:
-            raw = await ws.receive_text()
-            try:
-                msg = json.loads(raw)
-            except json.JSONDecodeError:
-                # Client sent non-JSON — ignore gracefully
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            raw = message.get("text")
+            if raw is None:
+                raw = message.get("bytes") or b""
+            HEARTBEATS.touch(out)
+            # JSON çözmeden önce: boyut ve toplam hız. Sınır bayt: metinde karakter başına 4 bayta
+            # kadar UTF-8 olabilir, kısa kareler kodlanmadan geçer
+            if len(raw) > MAX_FRAME_BYTES or (isinstance(raw, str) and len(raw) * 4 > MAX_FRAME_BYTES
+                                              and len(raw.encode("utf-8")) > MAX_FRAME_BYTES):
+                THROTTLED.inc("frame_size")
+                close_code = 1009
+                out.close(1009)  # message too big
+                break
+            if not limiter.allow("frame"):
+                throttle(out, pid, limiter, "frame")
                 continue
-
-            mtype = msg.get("type")
-
-            # ---- Join as player ----
-            if mtype == "join":
-                name = (msg.get("name") or f"Player-{pid[-4:]}").strip()[:24]
-                STATE.players[pid] = Player(name=name, ws=ws)
-                # Notify admins/players about lobby change
-                await broadcast({"type": "lobby", "players": [p.name for p in STATE.players.values()]})
-                await ws.send_text(json.dumps({"type": "joined", "name": name}))
-                # skor panelini güncelle
-                await broadcast_scores()
-
-            # ---- Join as admin ----
-            elif mtype == "admin":
-                STATE.admins.add(ws)
-                await ws.send_text(json.dumps({
-                    "type": "admin_ack",
-                    "players": [p.name for p in STATE.players.values()],
-                    "q_count": len(STATE.questions),
-                }))
-
-            # ---- Load questions from Excel path (opsiyonel) ----
-            elif mtype == "load_questions":
-                path = msg.get("path", "questions.xlsx")
+            if isinstance(raw, bytes):
+                msg = wire.decode(raw)  # ikili: sadece answer / pong
+                if msg is None:
+                    continue
+            else:
                 try:
-                    STATE.questions = load_questions_from_excel(path)
-                    await broadcast({"type": "questions_loaded", "count": len(STATE.questions)})
-                except Exception as e:
-                    await ws.send_text(json.dumps({"type": "error", "message": str(e)}))
-
-            # ---- Start quiz (admin) ----
-            elif mtype == "start_quiz":
-                if not STATE.questions:
-                    await ws.send_text(json.dumps({"type": "error", "message": "Önce Excel'den soruları yükleyin."}))
-                else:
-                    STATE.soft_reset()
-                    await broadcast_scores()  # mini-leaderboard ilk gönderim
-                    await start_question(0)
-
-            # ---- Player answer ----
-            elif mtype == "answer":
-                if not STATE.accepting or STATE.current_q_index < 0:
+                    msg = json.loads(raw)
+                except json.JSONDecodeError:
+                    # Client sent non-JSON — ignore gracefully
                     continue
-                player = STATE.players.get(pid)
-                if not player:
+                if not isinstance(msg, dict):
                     continue
 
-                # Only first answer per question
-                if player.answered_for_q.get(STATE.current_q_index):
+            mtype = msg.get("type")
+            cls = message_class(mtype)
+            if cls is not None and not limiter.allow(cls):
+                throttle(out, pid, limiter, cls)
+                continue
+            if mtype in ("join", "admin", "resume"):
+                # kablo biçimi pazarlığı: bir kez ikiliye geçen bağlantı öyle kalır
+                if BINARY_WIRE and msg.get("wire") == wire.WIRE_BIN:
+                    out.binary = True
+                msg["wire"] = wire.WIRE_BIN if out.binary else "json"
+            # ---- Clock sync (bağlantıya özel, odaya gitmez) ----
+            if mtype == "pong":
+                nxt, clock = sync.pong(msg)
+                if clock is not None:
+                    CLIENT_RTT.observe(sync.rtt_ns / 1e9)
+                if nxt is not None:
+                    send_to(out, nxt)
+                if clock is not None:
+                    send_to(out, clock)
+                continue
+            if mtype == "sync":
+                send_to(out, sync.start_round())
+                continue
+            if mtype == "answer":
+                msg["rtt_ms"] = sync.rtt_ms  # istemcinin gönderdiği değer yok sayılır
+
+            # ---- Resume: same player, new socket; only the missed frames are sent ----
+            if mtype == "resume":
+                resumed = find_session(msg.get("session")) if session is None else None
+                if resumed is None:
+                    send_to(out, {"type": "resume_failed"})
+                    continue
+                CONNS.pop(pid, None)
+                session, pid = resumed, resumed.pid
+                room, link = session.room, session.link
+                CONNS[pid] = session
+                session.binary = out.binary
+                code = (room or link).code if (room or link) is not None else None
+                send_to(out, {"type": "resumed", "room": code, "wire": msg["wire"]})
+                if session.attach(out, msg.get("last_seq"), msg.get("last_rseq", 0)) is None:
+                    # tampon yetmedi: oda sahibinden güncel durumu iste
+                    msg = {"type": "resync"}
+                else:
                     continue
 
-                try:
-                    chosen = int(msg.get("choice", -1))
-                except (TypeError, ValueError):
-                    chosen = -1
-
-                q = STATE.questions[STATE.current_q_index]
-                elapsed = (utc_now() - STATE.q_started_at).total_seconds() if STATE.q_started_at else 999
+            if room is not None and room.closed:
+                room = None
+            if link is not None and link.closed:
+                link = None
 
-                was_correct = (chosen == q["correct"] and elapsed <= STATE.q_duration_sec)
-                if was_correct:
-                    player.score += score_for_elapsed(elapsed)
-                    player.streak += 1
-                else:
-                    player.streak = 0
-
-                player.answered_for_q[STATE.current_q_index] = True
-
-                # feedback only to that player (UI anında yazı göstermiyor)
-                await ws.send_text(json.dumps({
-                    "type": "answer_ack",
-                    "correct": was_correct,
-                    "score": player.score,
-                    "streak": player.streak,
-                }))
-
-                # canlı mini-leaderboard
-                await broadcast_scores()
-
-            # ---- Force end / next (admin) ----
-            elif mtype == "next":
-                await end_current_question()
-
-            # ---- Reset lobby (admin) ----
-            elif mtype == "reset":
-                STATE.soft_reset()
-                await broadcast({"type": "reset_done"})
-                await broadcast_scores()
-
-    except WebSocketDisconnect:
-        # remove from players or admins
-        STATE.players.pop(pid, None)
-        STATE.admins.discard(ws)
-        # notify lobby & mini scores update
-        await broadcast({"type": "lobby", "players": [p.name for p in STATE.players.values()]})
-        await broadcast_scores()
+            sender: Sender = out
+            if mtype == "join":
+                if session is None:
+                    session = open_session(pid, out)
+                session.binary = out.binary
+                msg["session"] = session.token
+            if session is not None and mtype != "admin":
+                sender = session
+
+            # ---- Join as player / admin (oda seçimi) ----
+            if mtype in ("join", "admin"):
+                target, target_link = await resolve_room(msg.get("room"))
+                if target is None and target_link is None:
+                    send_to(out, {"type": "error", "message": "Oda bulunamadı."})
+                    continue
+                if link is not None and link is not target_link:
+                    link.leave(pid)
+                if target is not room and _leave(room, pid, out):
+                    await player_left(room, pid)
+                room, link = target, target_link
+                if link is not None:
+                    link.members[pid] = sender
+                if session is not None:
+                    session.room, session.link = room, link
+                    session.bind((room or link).replay)
+
+            if link is not None:
+                link.forward({"kind": "msg", "pid": pid, "msg": msg})
+            elif room is not None:
+                await handle_message(room, pid, sender, msg)
+
+    except WebSocketDisconnect as e:
+        close_code = e.code
+    except asyncio.CancelledError:
+        if not HEARTBEATS.was_reaped(out):
+            raise
+        asyncio.current_task().uncancel()  # reap_idle: yarı açık bağlantı, kopma gibi temizle
     except Exception as e:
         logger.exception("websocket error: %s", e)
+    finally:
+        HEARTBEATS.forget(out)
+        out.close()
+        if session is not None and session.connected and session.out is not out:
+            pass  # oturumu başka bir bağlantı devraldı
+        elif session is not None and close_code != 1000:
+            # kopma (ağ, sayfa yenileme): oyuncu süre dolana kadar odada kalır
+            session.detach(out)
+            park_session(session)
+        else:
+            # istemci bilerek kapattı (1000) ya da hiç oyuncu olmadı
+            if session is not None:
+                end_session(session)
+            CONNS.pop(pid, None)
+            if link is not None and not link.closed:
+                link.leave(pid)
+            elif _leave(room, pid, out):
+                await player_left(room, pid)
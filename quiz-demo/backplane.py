@@ -0,0 +1,293 @@
+# backplane.py
+"""Room event backplane: pub/sub plus room ownership.
+
+`LocalBackplane` keeps everything inside one process (single uvicorn worker).
+`UnixBackplane` talks to a small broker over a Unix socket so several workers
+can share rooms:
+
+    python backplane.py /tmp/quiz-backplane.sock
+    BACKPLANE=unix:/tmp/quiz-backplane.sock uvicorn app:app --workers 4
+
+Every room has exactly one owner worker (first `claim` wins). Only the owner
+keeps game state and scores answers; other workers just relay.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("quiz")
+
+Handler = Callable[[dict], None]
+
+
+class Backplane:
+    """Interface. `publish` / `subscribe` never wait; ownership queries do."""
+
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def publish(self, channel: str, data: dict):
+        raise NotImplementedError
+
+    def subscribe(self, channel: str, handler: Handler):
+        raise NotImplementedError
+
+    def unsubscribe(self, channel: str, handler: Optional[Handler] = None):
+        raise NotImplementedError
+
+    async def claim(self, room: str) -> str:
+        """Become the room's owner if it has none. Returns the owner id."""
+        raise NotImplementedError
+
+    async def owner(self, room: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def release(self, room: str):
+        raise NotImplementedError
+
+    async def rooms(self) -> Dict[str, str]:
+        """room code -> owner worker id, across all workers."""
+        raise NotImplementedError
+
+
+class _Subscriptions:
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+
+    def add(self, channel: str, handler: Handler) -> bool:
+        """True if this is the channel's first handler."""
+        handlers = self.handlers.setdefault(channel, [])
+        handlers.append(handler)
+        return len(handlers) == 1
+
+    def remove(self, channel: str, handler: Optional[Handler]) -> bool:
+        """True if the channel has no handlers left."""
+        handlers = self.handlers.get(channel)
+        if handlers is None:
+            return False
+        if handler is None:
+            handlers.clear()
+        elif handler in handlers:
+            handlers.remove(handler)
+        if handlers:
+            return False
+        del self.handlers[channel]
+        return True
+
+    def dispatch(self, channel: str, data: dict):
+        for handler in list(self.handlers.get(channel, ())):
+            try:
+                handler(data)
+            except Exception:
+                logger.exception("backplane handler failed on %s", channel)
+
+
+class LocalBackplane(Backplane):
+    """In-process backplane: one worker owns every room."""
+
+    def __init__(self, worker_id: str):
+        super().__init__(worker_id)
+        self._subs = _Subscriptions()
+        self._owners: Dict[str, str] = {}
+
+    def publish(self, channel: str, data: dict):
+        self._subs.dispatch(channel, data)
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._subs.add(channel, handler)
+
+    def unsubscribe(self, channel: str, handler: Optional[Handler] = None):
+        self._subs.remove(channel, handler)
+
+    async def claim(self, room: str) -> str:
+        return self._owners.setdefault(room, self.worker_id)
+
+    async def owner(self, room: str) -> Optional[str]:
+        return self._owners.get(room)
+
+    def release(self, room: str):
+        self._owners.pop(room, None)
+
+    async def rooms(self) -> Dict[str, str]:
+        return dict(self._owners)
+
+
+class UnixBackplane(Backplane):
+    """Client of the Unix-socket broker below. One JSON object per line."""
+
+    def __init__(self, worker_id: str, path: str):
+        super().__init__(worker_id)
+        self.path = path
+        self._subs = _Subscriptions()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._seq = 0
+
+    async def start(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=2 ** 24)
+        self._send({"op": "hello", "worker": self.worker_id})
+        # start() öncesi yapılan abonelikleri broker'a bildir
+        for channel in self._subs.handlers:
+            self._send({"op": "sub", "ch": channel})
+        self._task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+    def _send(self, obj: dict):
+        if self._writer is None:
+            return
+        self._writer.write(json.dumps(obj).encode() + b"\n")
+
+    def publish(self, channel: str, data: dict):
+        self._send({"op": "pub", "ch": channel, "data": data})
+
+    def subscribe(self, channel: str, handler: Handler):
+        if self._subs.add(channel, handler):
+            self._send({"op": "sub", "ch": channel})
+
+    def unsubscribe(self, channel: str, handler: Optional[Handler] = None):
+        if self._subs.remove(channel, handler):
+            self._send({"op": "unsub", "ch": channel})
+
+    async def _request(self, obj: dict) -> dict:
+        if self._writer is None:
+            raise RuntimeError("backplane not started")
+        self._seq += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[self._seq] = fut
+        self._send(dict(obj, id=self._seq))
+        return await fut
+
+    async def claim(self, room: str) -> str:
+        return (await self._request({"op": "claim", "room": room}))["owner"]
+
+    async def owner(self, room: str) -> Optional[str]:
+        return (await self._request({"op": "owner", "room": room}))["owner"]
+
+    def release(self, room: str):
+        self._send({"op": "release", "room": room})
+
+    async def rooms(self) -> Dict[str, str]:
+        return (await self._request({"op": "rooms"}))["rooms"]
+
+    async def _read_loop(self):
+        assert self._reader is not None
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                logger.error("backplane connection lost: %s", self.path)
+                break
+            msg = json.loads(line)
+            op = msg.get("op")
+            if op == "pub":
+                self._subs.dispatch(msg["ch"], msg["data"])
+            elif op == "reply":
+                fut = self._pending.pop(msg["id"], None)
+                if fut is not None and not fut.done():
+                    fut.set_result(msg)
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("backplane connection lost"))
+        self._pending.clear()
+
+
+def make_backplane(url: str, worker_id: str) -> Backplane:
+    """`local` or `unix:/path/to.sock`."""
+    if not url or url == "local":
+        return LocalBackplane(worker_id)
+    if url.startswith("unix:"):
+        return UnixBackplane(worker_id, url[len("unix:"):])
+    raise ValueError(f"Unknown BACKPLANE: {url!r}")
+
+
+# ---------------------- Broker ----------------------
+class Broker:
+    """Fans published lines out to subscribers and tracks room owners.
+
+    When an owner disconnects its rooms are dropped and subscribers of the
+    room channel get `{"owner_lost": true}`.
+    """
+
+    def __init__(self):
+        self.subs: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self.owners: Dict[str, Tuple[str, asyncio.StreamWriter]] = {}
+
+    def _fanout(self, channel: str, line: bytes):
+        for w in self.subs.get(channel, ()):
+            w.write(line)
+
+    def _reply(self, writer: asyncio.StreamWriter, msg: dict, **fields):
+        writer.write(json.dumps(dict(fields, op="reply", id=msg["id"])).encode() + b"\n")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = ""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                op = msg.get("op")
+                if op == "pub":
+                    # satırı yeniden kodlamadan aynen ilet
+                    self._fanout(msg["ch"], line)
+                elif op == "sub":
+                    self.subs.setdefault(msg["ch"], set()).add(writer)
+                elif op == "unsub":
+                    self.subs.get(msg["ch"], set()).discard(writer)
+                elif op == "claim":
+                    owner, _ = self.owners.setdefault(msg["room"], (worker, writer))
+                    self._reply(writer, msg, owner=owner)
+                elif op == "owner":
+                    entry = self.owners.get(msg["room"])
+                    self._reply(writer, msg, owner=entry[0] if entry else None)
+                elif op == "release":
+                    entry = self.owners.get(msg["room"])
+                    if entry and entry[1] is writer:
+                        del self.owners[msg["room"]]
+                elif op == "rooms":
+                    self._reply(writer, msg, rooms={r: o for r, (o, _) in self.owners.items()})
+                elif op == "hello":
+                    worker = msg["worker"]
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for subscribers in self.subs.values():
+                subscribers.discard(writer)
+            lost = [room for room, (_, w) in self.owners.items() if w is writer]
+            for room in lost:
+                del self.owners[room]
+                note = {"op": "pub", "ch": f"room:{room}", "data": {"owner_lost": True}}
+                self._fanout(f"room:{room}", json.dumps(note).encode() + b"\n")
+            writer.close()
+
+
+async def serve(path: str):
+    if os.path.exists(path):
+        os.unlink(path)
+    broker = Broker()
+    server = await asyncio.start_unix_server(broker.handle, path=path, limit=2 ** 24)
+    logger.info("backplane broker listening on %s", path)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(sys.argv[1] if len(sys.argv) > 1 else "/tmp/quiz-backplane.sock"))
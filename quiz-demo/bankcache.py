@@ -0,0 +1,136 @@
+# bankcache.py
+# Same API as kahoot/bankcache.py (each app deploys on its own); only the disk format differs,
+# plus `adopt` for banks compiled by a parse worker.
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from qbank import QuestionBank, compile_bank
+
+logger = logging.getLogger("quiz")
+
+
+class BankCache:
+    """Compiled question banks keyed by the SHA-256 of the workbook bytes.
+
+    Hits are served from an in-memory LRU of open banks; misses fall back to
+    the compiled file on disk (see qbank) before parsing the workbook again.
+    With a directory the banks are memory-mapped, so rooms and workers share
+    one copy in the page cache; without one they are compiled in memory.
+    Banks are read-only.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 32, directory: Optional[str] = None,
+                 version: int = 1):
+        self.namespace = namespace
+        self.version = version   # parser version: new parse rules never see old disk copies
+        self.max_entries = max(1, max_entries)
+        self.directory = directory
+        self._mem: "OrderedDict[str, QuestionBank]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key_for(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _path(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{self.namespace}-v{self.version}-{key}.qbank")
+
+    def _remember(self, key: str, bank: QuestionBank):
+        bank.key = key
+        self._mem[key] = bank
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)  # açık odalar kendi referanslarını tutar
+
+    def recall(self, key: str) -> Optional[QuestionBank]:
+        """In-memory lookup only; cheap enough for the event loop."""
+        bank = self._mem.get(key)
+        if bank is not None:
+            self._mem.move_to_end(key)
+        return bank
+
+    def read(self, key: str) -> Optional[QuestionBank]:
+        """Disk copy only. Touches only files, so it is safe in a thread."""
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return QuestionBank.open(path)
+        except (OSError, ValueError) as e:
+            logger.warning("bank cache entry unreadable (%s): %s", path, e)
+            return None
+
+    def get(self, key: str) -> Optional[QuestionBank]:
+        bank = self.recall(key)
+        if bank is None:
+            bank = self.read(key)
+            if bank is not None:
+                self._remember(key, bank)
+        return bank
+
+    def put(self, key: str, questions: List[dict]) -> QuestionBank:
+        bank = self.compile(key, questions)
+        self._remember(key, bank)
+        return bank
+
+    def remember(self, key: str, bank: QuestionBank):
+        """In-memory half of `put`; pair it with `compile` off the event loop."""
+        self._remember(key, bank)
+
+    def compile(self, key: str, questions: List[dict]) -> QuestionBank:
+        """Disk half of `put`. Touches only files, so it is safe in a thread."""
+        data = compile_bank(questions)
+        path = self._path(key)
+        if not path:
+            return QuestionBank(data)
+        try:
+            # atomik yaz: yarım dosya asla okunmasın
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            return QuestionBank.open(path)
+        except (OSError, ValueError) as e:
+            logger.warning("bank cache write failed (%s): %s", path, e)
+            return QuestionBank(data)
+
+    def adopt(self, key: str, compiled: str) -> QuestionBank:
+        """Disk half of `put` for a file from qbank.compile_bank_to(self.directory).
+
+        Moves it into place (or, without a directory, reads it and removes it).
+        Touches only files, so it is safe in a thread.
+        """
+        path = self._path(key)
+        if path:
+            try:
+                os.replace(compiled, path)
+            except OSError as e:
+                logger.warning("bank cache write failed (%s): %s", path, e)
+            else:
+                return QuestionBank.open(path)
+        try:
+            with open(compiled, "rb") as f:
+                return QuestionBank(f.read())
+        finally:
+            os.unlink(compiled)
+
+    def get_or_load(self, key: str, load: Callable[[], List[dict]]) -> QuestionBank:
+        """Cached bank for `key`, else `load()` it and remember the result."""
+        bank = self.get(key)
+        if bank is not None:
+            self.hits += 1
+            return bank
+        self.misses += 1
+        return self.put(key, load())
+
+    def get_or_parse(self, data: bytes, parse: Callable[[bytes], List[dict]]) -> QuestionBank:
+        return self.get_or_load(self.key_for(data), lambda: parse(data))
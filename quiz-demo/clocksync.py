@@ -0,0 +1,74 @@
+# clocksync.py
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+def wall_ms() -> float:
+    return time.time() * 1000.0
+
+
+class ClockSync:
+    """Per-connection RTT and clock offset from ping/pong samples.
+
+    The server sends `ping {id, ts}` (ts = server wall clock, ms) and the
+    client echoes `pong {id, ct}` with its own wall clock. RTT is measured on
+    the server's monotonic clock; offset (client - server) assumes the
+    reply took half the RTT. As in NTP, the sample with the smallest RTT in
+    the recent window wins: delays only ever inflate RTT.
+    """
+
+    def __init__(self, samples: int = 5, window: int = 8):
+        self.samples = samples
+        self._seq = 0
+        self._pending: Dict[int, Tuple[int, float]] = {}   # id -> (sent monotonic ns, sent wall ms)
+        self._window: Deque[Tuple[int, float]] = deque(maxlen=window)  # (rtt ns, offset ms)
+        self.rtt_ns: Optional[int] = None
+        self.offset_ms: float = 0.0
+        self.burst = 0   # pings still to send in the current sync round
+
+    def ping(self) -> dict:
+        self._seq += 1
+        ts = wall_ms()
+        self._pending[self._seq] = (time.monotonic_ns(), ts)
+        # cevaplanmayan eski ping'ler birikmesin
+        for stale in [k for k in self._pending if k < self._seq - 4]:
+            del self._pending[stale]
+        return {"type": "ping", "id": self._seq, "ts": ts}
+
+    def start_round(self) -> dict:
+        """First ping of a round; `pong` returns the next until `samples` are in."""
+        self.burst = self.samples - 1
+        return self.ping()
+
+    def pong(self, msg: dict) -> Tuple[Optional[dict], Optional[dict]]:
+        """Record a pong. Returns (next ping or None, `clock` frame or None)."""
+        ping_id = msg.get("id")
+        if not isinstance(ping_id, int) or isinstance(ping_id, bool):
+            return None, None   # bozuk pong (liste, dict, ...): yok say
+        sent = self._pending.pop(ping_id, None)
+        if sent is None:
+            return None, None
+        rtt = time.monotonic_ns() - sent[0]
+        try:
+            ct = float(msg.get("ct"))
+        except (TypeError, ValueError):
+            return None, None
+        if not math.isfinite(ct):
+            return None, None   # "inf"/"nan" float() ile geçer ama ofseti bozar
+        self._window.append((rtt, ct - (sent[1] + rtt / 2e6)))
+        self.rtt_ns, self.offset_ms = min(self._window)
+        nxt = None
+        if self.burst > 0:
+            self.burst -= 1
+            nxt = self.ping()
+        return nxt, {"type": "clock", "rtt_ms": round(self.rtt_ms, 1), "offset_ms": round(self.offset_ms, 1)}
+
+    @property
+    def rtt_ms(self) -> float:
+        return (self.rtt_ns or 0) / 1e6
+
+    @property
+    def one_way_ms(self) -> float:
+        return self.rtt_ms / 2
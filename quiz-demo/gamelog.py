@@ -0,0 +1,342 @@
+# gamelog.py
+"""Append-only journal of in-progress games, compacted by snapshots.
+
+Every state transition of a journaled room is one JSON line
+`{"lsn": n, "k": kind, "room": code, ...}`:
+
+  game      questions, q_duration, game, game_id, players {pid: [name, token]}
+  join      pid, name, token
+  leave     pid
+  question  index, at (epoch seconds the question started)
+  scored    q, pids, points, correct (one scored answer batch)
+  reveal    index, at
+  end       game finished, reset or room closed: forget the room
+
+`replay()` folds a snapshot plus the log tail into one plain dict per room:
+
+  {"questions", "q_duration", "game", "game_id", "index", "phase", "at",
+   "players": {pid: [name, token, score, streak, answered_bits]}}
+
+which is also the snapshot format (see app.room_snapshot).
+
+Each worker journals to its own directory `<root>/<worker>/`, locked for
+the worker's lifetime, so lsn and snapshot truncation never cross workers.
+A starting worker adopts the directories whose lock is free (their worker
+is gone): their rooms go into its own snapshot, then the directory is
+removed.
+"""
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no adoption, each worker only sees its own journal
+    fcntl = None
+
+logger = logging.getLogger("quiz")
+
+LOG_NAME = "events.log"
+SNAPSHOT_NAME = "snapshot.json"
+LOCK_NAME = "worker.lock"
+
+RoomState = Dict[str, Any]
+
+_STOP = object()
+
+
+def apply(rooms: Dict[str, RoomState], rec: dict):
+    """Apply one journal record to the replayed room states."""
+    kind, code = rec.get("k"), rec.get("room")
+    if kind == "game":
+        rooms[code] = {
+            "questions": rec["questions"], "q_duration": rec["q_duration"],
+            "game": rec["game"], "game_id": rec["game_id"],
+            "index": -1, "phase": "lobby", "at": 0.0,
+            "players": {pid: [name, token, 0, 0, 0] for pid, (name, token) in rec["players"].items()},
+        }
+        return
+    room = rooms.get(code)
+    if room is None:
+        return
+    if kind == "scored":
+        players, bit = room["players"], 1 << rec["q"]
+        for pid, points, ok in zip(rec["pids"], rec["points"], rec["correct"]):
+            p = players.get(pid)
+            if p is not None:
+                p[2] += points
+                p[3] = p[3] + 1 if ok else 0
+                p[4] |= bit
+    elif kind == "join":
+        room["players"][rec["pid"]] = [rec["name"], rec["token"], 0, 0, 0]
+    elif kind == "leave":
+        room["players"].pop(rec["pid"], None)
+    elif kind in ("question", "reveal"):
+        room["index"], room["phase"], room["at"] = rec["index"], kind, rec["at"]
+    elif kind == "end":
+        del rooms[code]
+
+
+def replay(snapshot: Dict[str, RoomState], records: List[dict]) -> Dict[str, RoomState]:
+    rooms = dict(snapshot)
+    for rec in records:
+        apply(rooms, rec)
+    return rooms
+
+
+class GameLog:
+    """Journal + snapshot files in `directory`, written by one background thread.
+
+    `append()` only numbers the record and queues it. The writer takes
+    everything queued while the previous fsync was running and commits it
+    with one write + fsync (group commit), so a burst of scored batches costs
+    one disk flush. `snapshot()` replaces the snapshot file atomically and
+    truncates the log; records at or below the snapshot's lsn are skipped on
+    load, so a crash between the two steps replays nothing twice.
+
+    The loop never waits for the disk: a crash loses at most the records of
+    the commit in flight.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self.lsn = 0
+        self.pending = 0        # records since the last snapshot
+        self.commits = 0
+        self.snapshots = 0      # snapshots written successfully
+        self.lost_tail = 0      # torn/corrupt bytes dropped at load
+        self.lock: Optional[int] = None   # worker.lock fd (open_log)
+        os.makedirs(directory, exist_ok=True)
+        self.restored = self._load()
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="gamelog-writer", daemon=True)
+        self._thread.start()
+
+    # ---- load / recovery ----
+    def _load(self) -> Dict[str, RoomState]:
+        snapshot: Dict[str, RoomState] = {}
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                data = json.loads(f.read())
+            snapshot, self.lsn = data["rooms"], data["lsn"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logger.error("game snapshot unreadable, replaying the log only: %s", e)
+
+        records, good = [], 0
+        try:
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break   # yarım kalmış son yazım
+                    if not line.endswith(b"\n"):
+                        break
+                    good += len(line)
+                    if rec["lsn"] > self.lsn:
+                        records.append(rec)
+            size = os.path.getsize(self.log_path)
+            if size > good:
+                # sonraki kayıtlar bozuk satırın arkasına eklenmesin
+                self.lost_tail = size - good
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(good)
+        except FileNotFoundError:
+            pass
+        if records:
+            self.lsn = records[-1]["lsn"]
+        self.pending = len(records)
+        return replay(snapshot, records)
+
+    def take_restored(self) -> Dict[str, RoomState]:
+        """Room states found at startup; handed out once."""
+        restored, self.restored = self.restored, {}
+        return restored
+
+    # ---- event loop side: enqueue only ----
+    def append(self, kind: str, room: str, **fields):
+        self.lsn += 1
+        self.pending += 1
+        fields.update(lsn=self.lsn, k=kind, room=room)
+        self._queue.put(fields)
+
+    def snapshot(self, rooms: Dict[str, RoomState]):
+        """`rooms` must reflect every record appended so far."""
+        self.pending = 0
+        self._queue.put(("snapshot", {"lsn": self.lsn, "rooms": rooms}))
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+        if self.lock is not None:
+            os.close(self.lock)   # kilit bırakıldı: sonraki worker bu günlüğü devralır
+            self.lock = None
+
+    def adopt(self, root: str) -> List[str]:
+        """Fold the journals of dead workers under `root` into this one.
+
+        Their rooms are added to `restored` (ours win on a code clash), a
+        snapshot makes them durable here, and only then are their
+        directories removed. Call at startup, before anything is appended.
+        """
+        orphans = []
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name)
+            if os.path.abspath(path) == os.path.abspath(self.directory):
+                continue
+            lock = _try_lock(path)
+            if lock is None:
+                continue   # canlı worker (ya da günlük dizini değil)
+            try:
+                found = GameLog(path)
+            except OSError as e:
+                logger.error("game log of %s not adopted: %s", path, e)
+                os.close(lock)
+                continue
+            found.close()
+            orphans.append((path, lock))
+            self.restored = {**found.take_restored(), **self.restored}
+        if not orphans:
+            return []
+        done = self.snapshots
+        self.snapshot(self.restored)
+        self.flush()
+        adopted = []
+        for path, lock in orphans:
+            if self.snapshots > done:
+                shutil.rmtree(path, ignore_errors=True)
+                adopted.append(path)
+            os.close(lock)
+        if adopted:
+            logger.info("adopted %d orphaned game logs (%d rooms)", len(adopted), len(self.restored))
+        return adopted
+
+    # ---- writer thread ----
+    def _writer(self):
+        f = open(self.log_path, "ab")
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                lines: List[bytes] = []
+                waiters: List[threading.Event] = []
+                stop = False
+                for item in batch:
+                    if isinstance(item, dict):
+                        lines.append(json.dumps(item, separators=(",", ":")).encode() + b"\n")
+                    elif isinstance(item, tuple) and self._write_snapshot(item[1], f):
+                        lines.clear()   # snapshot already covers them
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is _STOP:
+                        stop = True
+                if lines:
+                    try:
+                        f.write(b"".join(lines))
+                        f.flush()
+                        os.fsync(f.fileno())
+                        self.commits += 1
+                    except OSError as e:
+                        logger.error("game log write failed (%d records): %s", len(lines), e)
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    return
+        finally:
+            f.close()
+
+    def _write_snapshot(self, data: dict, log) -> bool:
+        tmp = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(json.dumps(data, separators=(",", ":")).encode())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            _fsync_dir(self.directory)
+            log.truncate(0)
+            os.fsync(log.fileno())
+            self.snapshots += 1
+            return True
+        except OSError as e:
+            logger.error("game snapshot failed, keeping the full log: %s", e)
+            return False
+
+
+def _fsync_dir(directory: str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _hold_lock(directory: str) -> Optional[int]:
+    """Lock `directory` for this process. The lock file appears already locked,
+    so another worker can never see it free while we are starting up."""
+    if fcntl is None:
+        return None
+    tmp = os.path.join(directory, LOCK_NAME + ".tmp")
+    fd = os.open(tmp, os.O_CREAT | os.O_RDWR, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    os.replace(tmp, os.path.join(directory, LOCK_NAME))
+    return fd
+
+
+def _try_lock(directory: str) -> Optional[int]:
+    """fd holding the lock of a dead worker's directory; None if it is alive (or not a journal)."""
+    if fcntl is None:
+        return None
+    try:
+        fd = os.open(os.path.join(directory, LOCK_NAME), os.O_RDWR)
+    except OSError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def open_log(root: Optional[str], worker: str) -> Optional[GameLog]:
+    """This worker's journal in `root/<worker>/`, with dead workers' journals adopted.
+
+    None when disabled (empty root) or it can't be used.
+    """
+    if not root:
+        return None
+    directory = os.path.join(root, worker)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        lock = _hold_lock(directory)
+        log = GameLog(directory)
+        log.lock = lock
+        log.adopt(root)
+        return log
+    except OSError as e:
+        logger.error("game log disabled (%s): %s", directory, e)
+        return None
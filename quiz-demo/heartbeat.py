@@ -0,0 +1,70 @@
+# heartbeat.py
+import asyncio
+import time
+from typing import Any, Callable, Dict, Hashable, List, Set, Tuple
+
+
+class Heartbeats:
+    """When each socket was last heard from; one sweep finds the quiet and the dead.
+
+    `touch()` is a dict store per received frame. `sweep()` walks all sockets
+    once: quiet for `interval` => worth a ping, quiet for `timeout` => stale.
+    Stale sockets are reaped together: their handler tasks are cancelled in
+    one pass (a half-open socket never wakes its `receive()` on its own).
+    """
+
+    def __init__(self, interval: float = 15.0, timeout: float = 45.0, clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.timeout = timeout
+        self.clock = clock
+        self.seen: Dict[Hashable, float] = {}
+        self.tasks: Dict[Hashable, Any] = {}   # key -> handler task
+        self.reaped: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+    def watch(self, key: Hashable, task: Any = None):
+        self.seen[key] = self.clock()
+        if task is not None:
+            self.tasks[key] = task
+
+    def touch(self, key: Hashable):
+        if key in self.seen:
+            self.seen[key] = self.clock()
+
+    def forget(self, key: Hashable):
+        self.seen.pop(key, None)
+        self.tasks.pop(key, None)
+        self.reaped.discard(key)
+
+    def was_reaped(self, key: Hashable) -> bool:
+        return key in self.reaped
+
+    def sweep(self) -> Tuple[List[Hashable], List[Hashable]]:
+        """Returns (quiet, stale) keys; stale ones are no longer watched."""
+        now = self.clock()
+        quiet, stale = [], []
+        for key, seen in self.seen.items():
+            idle = now - seen
+            if idle >= self.timeout:
+                stale.append(key)
+            elif idle >= self.interval:
+                quiet.append(key)
+        for key in stale:
+            del self.seen[key]
+        return quiet, stale
+
+    def reap(self, stale: List[Hashable]):
+        """Cancel the handler tasks of `stale`; each runs its own cleanup on the way out."""
+        for key in stale:
+            task = self.tasks.pop(key, None)
+            if task is not None and not task.done():
+                self.reaped.add(key)
+                task.cancel()
+
+
+async def run_sweeper(beats: Heartbeats, on_sweep: Callable[[], None]):
+    while True:
+        await asyncio.sleep(beats.interval / 2)
+        on_sweep()
@@ -0,0 +1,161 @@
+# ingest.py
+"""Workbook -> question list, or straight into a compiled bank file.
+
+Kept apart from app.py so parse-pool workers can import it without pulling in
+the web app. Rows are validated one at a time; a pool worker streams them
+into the bank file, so neither the sheet nor the question list is ever held
+in memory as a whole.
+"""
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from openpyxl import load_workbook
+
+from qbank import compile_bank_to
+
+REQUIRED = ["question", "option1", "option2", "option3", "option4", "correct_index"]
+# İsteğe bağlı: "tags" (virgülle ayrılmış), "difficulty" (0-255 tam sayı; boş = 0)
+OPTIONAL = ["tags", "difficulty"]
+# Ayrıştırma kuralları ya da qbank biçimi değişince artır: disk önbelleğindeki eski bankalar okunmaz
+PARSER_VERSION = 2
+
+
+class RowErrors:
+    """Per-row validation problems: keeps the first `limit`, counts the rest."""
+
+    def __init__(self, limit: int = 50):
+        self.limit = limit
+        self.count = 0
+        self.items: List[dict] = []
+
+    def add(self, row: int, message: str):
+        self.count += 1
+        if len(self.items) < self.limit:
+            self.items.append({"row": row, "error": message})
+
+    def report(self) -> dict:
+        return {"skipped": self.count, "errors": self.items}
+
+
+class BankParseError(ValueError):
+    """The workbook yielded no usable bank; `report` has the row errors."""
+
+    def __init__(self, message: str, report: Optional[dict] = None):
+        super().__init__(message)
+        self.report = report or {"skipped": 0, "errors": []}
+
+    def __reduce__(self):
+        # havuzdan dönerken rapor kaybolmasın
+        return (self.__class__, (str(self), self.report))
+
+
+def _cell(r: tuple, i: int) -> str:
+    v = r[i] if i < len(r) else None
+    return str(v if v is not None else "").strip()
+
+
+def _iter_questions(rows: Iterator[tuple], idx: Dict[str, int], errors: RowErrors,
+                    progress: Optional[Callable[[int], None]], every: int) -> Iterator[dict]:
+    # satır satır doğrula; tablo hiçbir zaman bütünüyle belleğe alınmaz
+    for n, r in enumerate(rows, start=2):
+        if progress is not None and n % every == 0:
+            progress(n - 1)
+        if not r or all(v is None for v in r):
+            continue
+        q_text = _cell(r, idx["question"])
+        options = [_cell(r, idx[c]) for c in ("option1", "option2", "option3", "option4")]
+        c_raw = r[idx["correct_index"]] if idx["correct_index"] < len(r) else None
+        try:
+            correct = int(c_raw) if c_raw is not None else 0
+        except (TypeError, ValueError):
+            errors.add(n, f"correct_index sayı değil: {c_raw!r}")
+            continue
+        if not q_text:
+            errors.add(n, "Soru metni boş.")
+            continue
+        if any(o == "" for o in options):
+            errors.add(n, "Boş seçenek var.")
+            continue
+        q = {"question": q_text, "options": options, "correct": max(0, min(3, correct))}
+        if "tags" in idx:
+            q["tags"] = [t.strip().lower() for t in _cell(r, idx["tags"]).replace(";", ",").split(",") if t.strip()]
+        if "difficulty" in idx:
+            d_raw = _cell(r, idx["difficulty"])
+            try:
+                q["difficulty"] = max(0, min(255, int(float(d_raw)))) if d_raw else 0
+            except ValueError:
+                errors.add(n, f"difficulty sayı değil: {d_raw!r}")
+                continue
+        yield q
+
+
+def iter_rows(rows: Iterable[tuple], errors: Optional[RowErrors] = None,
+              progress: Optional[Callable[[int], None]] = None, every: int = 5000) -> Iterator[dict]:
+    """Validate header + rows, yielding questions. `progress(rows_seen)` is called every `every` rows.
+
+    Raises ValueError for a bad header, or at the end when no row was usable.
+    """
+    it = iter(rows)
+    header = next(it, None)
+    if header is None:
+        raise ValueError("Excel boş görünüyor.")
+    headers = [str(h or "").strip().lower() for h in header]
+    missing = [c for c in REQUIRED if c not in headers]
+    if missing:
+        raise ValueError(f"Excel başlıkları eksik. Gerekli: {REQUIRED}")
+    idx = {h: headers.index(h) for h in REQUIRED + OPTIONAL if h in headers}
+
+    errors = errors if errors is not None else RowErrors()
+    found = 0
+    for q in _iter_questions(it, idx, errors, progress, max(1, every)):
+        found += 1
+        yield q
+    if not found:
+        raise ValueError("Excel'den geçerli soru bulunamadı.")
+
+
+def parse_rows(rows: Iterable[tuple], errors: Optional[RowErrors] = None,
+               progress: Optional[Callable[[int], None]] = None, every: int = 5000) -> List[dict]:
+    return list(iter_rows(rows, errors, progress, every))
+
+
+def iter_workbook(source: Union[str, BinaryIO], errors: Optional[RowErrors] = None,
+                  progress: Optional[Callable[[int], None]] = None, every: int = 5000) -> Iterator[dict]:
+    # read_only: openpyxl sayfa XML'ini akış halinde okur
+    wb = load_workbook(filename=source, read_only=True, data_only=True)
+    try:
+        yield from iter_rows(wb.active.iter_rows(values_only=True), errors, progress, every)
+    finally:
+        wb.close()
+
+
+def parse_workbook(source: Union[str, BinaryIO], errors: Optional[RowErrors] = None,
+                   progress: Optional[Callable[[int], None]] = None, every: int = 5000) -> List[dict]:
+    return list(iter_workbook(source, errors, progress, every))
+
+
+# ---------------------- Parse pool worker ----------------------
+_progress_queue = None
+
+
+def init_worker(queue):
+    """Pool initializer: progress goes back to the parent through `queue`."""
+    global _progress_queue
+    _progress_queue = queue
+
+
+def parse_job(job: int, path: str, every: int, directory: Optional[str] = None) -> Tuple[str, dict]:
+    """Runs in a pool process. Returns (compiled bank file in `directory`, row error report).
+
+    Only the file name crosses back to the parent; the questions never do.
+    """
+    errors = RowErrors()
+
+    def progress(rows: int):
+        if _progress_queue is not None:
+            _progress_queue.put((job, rows))
+
+    try:
+        bank_path = compile_bank_to(iter_workbook(path, errors, progress, every), directory)
+    except ValueError as e:
+        raise BankParseError(str(e), errors.report())
+    return bank_path, errors.report()
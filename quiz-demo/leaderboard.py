@@ -0,0 +1,130 @@
+# leaderboard.py
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Tuple
+
+
+class _Fenwick:
+    """Prefix counts over integer scores (grows as scores grow)."""
+
+    def __init__(self, size: int = 64):
+        self.tree = [0] * (size + 1)
+
+    def _grow(self, score: int):
+        size = len(self.tree) - 1
+        while size <= score:
+            size *= 2
+        # Fenwick ağacını yeni boyutta baştan kur (nadiren çalışır)
+        counts = [self.count_at(i) for i in range(len(self.tree) - 1)]
+        self.tree = [0] * (size + 1)
+        for i, c in enumerate(counts):
+            if c:
+                self.add(i, c)
+
+    def add(self, score: int, delta: int):
+        if score >= len(self.tree) - 1:
+            self._grow(score)
+        i = score + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, score: int) -> int:
+        """Number of entries with value <= score."""
+        i = min(score + 1, len(self.tree) - 1)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def count_at(self, score: int) -> int:
+        return self.prefix(score) - (self.prefix(score - 1) if score > 0 else 0)
+
+
+class Leaderboard:
+    """Incrementally maintained ranking of player ids by score.
+
+    Players are kept in score buckets (ties ordered by who reached the score
+    first) plus a Fenwick tree for rank lookups, so a score change is
+    O(log N) and top-K never sorts all players.
+    """
+
+    def __init__(self):
+        self.scores: Dict[str, int] = {}
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._desc: List[int] = []  # distinct scores, negated (ascending => highest first)
+        self._counts = _Fenwick()
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self.scores
+
+    def _insert(self, pid: str, score: int):
+        bucket = self._buckets.get(score)
+        if bucket is None:
+            bucket = self._buckets[score] = {}
+            insort(self._desc, -score)
+        bucket[pid] = None
+        self._counts.add(score, 1)
+
+    def _discard(self, pid: str, score: int):
+        bucket = self._buckets[score]
+        del bucket[pid]
+        if not bucket:
+            del self._buckets[score]
+            del self._desc[bisect_left(self._desc, -score)]
+        self._counts.add(score, -1)
+
+    def add(self, pid: str, score: int = 0):
+        if pid in self.scores:
+            self.remove(pid)
+        self.scores[pid] = score
+        self._insert(pid, score)
+
+    def remove(self, pid: str):
+        score = self.scores.pop(pid, None)
+        if score is not None:
+            self._discard(pid, score)
+
+    def update(self, pid: str, score: int):
+        old = self.scores.get(pid)
+        if old is None or old == score:
+            return
+        self._discard(pid, old)
+        self.scores[pid] = score
+        self._insert(pid, score)
+
+    def clear_scores(self):
+        """Put every player back at 0 (keeps the current order as tie order)."""
+        pids = list(self.iter_ranked())
+        self.scores = dict.fromkeys(pids, 0)
+        self._buckets = {0: dict.fromkeys(pids)} if pids else {}
+        self._desc = [0] if pids else []
+        self._counts = _Fenwick()
+        if pids:
+            self._counts.add(0, len(pids))
+
+    def iter_ranked(self) -> Iterator[str]:
+        for neg in self._desc:
+            yield from self._buckets[-neg]
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        out: List[Tuple[str, int]] = []
+        for neg in self._desc:
+            for pid in self._buckets[-neg]:
+                if len(out) >= n:
+                    return out
+                out.append((pid, -neg))
+        return out
+
+    def ranking(self) -> List[Tuple[str, int]]:
+        return [(pid, -neg) for neg in self._desc for pid in self._buckets[-neg]]
+
+    def rank_of(self, pid: str) -> int:
+        """1-based rank; tied players share a rank. 0 if unknown."""
+        score = self.scores.get(pid)
+        if score is None:
+            return 0
+        return len(self.scores) - self._counts.prefix(score) + 1
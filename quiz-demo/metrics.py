@@ -0,0 +1,161 @@
+# metrics.py
+"""Tiny Prometheus text-format metrics: counters, histograms and scrape-time
+collectors. Recording is a couple of integer adds (histograms add a bisect),
+cheap enough to leave on in production.
+"""
+import asyncio
+import bisect
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+Labels = Dict[str, str]
+
+
+def _labels(labels: Optional[Labels]) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, n: int = 1):
+        self.value += n
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        yield f"{self.name} {_num(self.value)}"
+
+
+class LabeledCounter:
+    """Counter family split by one label, e.g. `x_total{reason="..."}`."""
+
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: Dict[str, int] = {}
+
+    def inc(self, value: str, n: int = 1):
+        self.values[value] = self.values.get(value, 0) + n
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for value, n in sorted(self.values.items()):
+            yield f"{self.name}{_labels({self.label: value})} {n}"
+
+
+class Histogram:
+    """Fixed upper bounds; `le` buckets are made cumulative only when rendered."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)   # son kova: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_many(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        idx = np.searchsorted(self.bounds, values, side="left")
+        for i, c in enumerate(np.bincount(idx, minlength=len(self.counts)).tolist()):
+            self.counts[i] += c
+        self.sum += float(values.sum())
+        self.count += len(values)
+
+    def render(self, labels: Optional[Labels] = None) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        acc = 0
+        base = dict(labels or {})
+        for bound, c in zip(self.bounds, self.counts):
+            acc += c
+            yield f"{self.name}_bucket{_labels(dict(base, le=_num(bound)))} {acc}"
+        yield f"{self.name}_bucket{_labels(dict(base, le='+Inf'))} {self.count}"
+        yield f"{self.name}_sum{_labels(base)} {_num(self.sum)}"
+        yield f"{self.name}_count{_labels(base)} {self.count}"
+
+
+def _family(kind: str, name: str, help: str, samples: Iterable[Tuple[Optional[Labels], float]]) -> Iterable[str]:
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} {kind}"
+    for labels, value in samples:
+        yield f"{name}{_labels(labels)} {_num(value)}"
+
+
+def gauge(name: str, help: str, samples: Iterable[Tuple[Optional[Labels], float]]) -> Iterable[str]:
+    """Render a gauge family from (labels, value) pairs, e.g. inside a collector."""
+    return _family("gauge", name, help, samples)
+
+
+def counter(name: str, help: str, samples: Iterable[Tuple[Optional[Labels], float]]) -> Iterable[str]:
+    """Like `gauge`, for totals kept elsewhere that only ever grow (name them `*_total`)."""
+    return _family("counter", name, help, samples)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        m = Counter(name, help)
+        self.metrics.append(m)
+        return m
+
+    def labeled_counter(self, name: str, help: str, label: str) -> LabeledCounter:
+        m = LabeledCounter(name, help, label)
+        self.metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        m = Histogram(name, help, buckets)
+        self.metrics.append(m)
+        return m
+
+    def collector(self, fn: Callable[[], Iterable[str]]) -> Callable[[], Iterable[str]]:
+        """Register a scrape-time callback (usable as a decorator)."""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self.metrics:
+            lines.extend(m.render())
+        for fn in self.collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+
+async def probe_loop_lag(hist: Histogram, interval: float = 0.5):
+    """Sleep `interval` forever; how late each wakeup is = event-loop lag."""
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        hist.observe(max(0.0, time.monotonic() - start - interval))
@@ -0,0 +1,127 @@
+# players.py
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _nbytes(questions: int) -> int:
+    return max(1, (questions + 7) // 8)
+
+
+class PlayerTable:
+    """Struct-of-arrays player storage.
+
+    Players live in dense slots 0..n-1: scores and streaks are contiguous
+    arrays, answered questions are one bit per (player, question), and names /
+    senders sit in side lists at the same slot. Removing a player moves the
+    last slot into the hole so the live range stays dense.
+    """
+
+    def __init__(self, capacity: int = 64, questions: int = 64):
+        capacity = max(1, capacity)
+        self.n = 0
+        self.scores = np.zeros(capacity, dtype=np.int64)
+        self.streaks = np.zeros(capacity, dtype=np.int32)
+        self.answered = np.zeros((capacity, _nbytes(questions)), dtype=np.uint8)
+        self.pids: List[str] = []
+        self.names: List[str] = []
+        self.outs: List[Any] = []
+        self.slot_of: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self.slot_of
+
+    # ---- capacity ----
+    def _grow(self):
+        cap = len(self.scores) * 2
+        for attr in ("scores", "streaks"):
+            old = getattr(self, attr)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, attr, new)
+        answered = np.zeros((cap, self.answered.shape[1]), dtype=np.uint8)
+        answered[:self.n] = self.answered[:self.n]
+        self.answered = answered
+
+    def ensure_questions(self, questions: int):
+        """Make room for `questions` answered-bits per player."""
+        need = _nbytes(questions)
+        if need > self.answered.shape[1]:
+            need = max(need, 2 * self.answered.shape[1])
+            answered = np.zeros((len(self.scores), need), dtype=np.uint8)
+            answered[:, :self.answered.shape[1]] = self.answered
+            self.answered = answered
+
+    # ---- membership ----
+    def add(self, pid: str, name: str, out: Any) -> int:
+        if pid in self.slot_of:
+            self.remove(pid)
+        if self.n == len(self.scores):
+            self._grow()
+        slot = self.n
+        self.scores[slot] = 0
+        self.streaks[slot] = 0
+        self.answered[slot] = 0
+        self.pids.append(pid)
+        self.names.append(name)
+        self.outs.append(out)
+        self.slot_of[pid] = slot
+        self.n += 1
+        return slot
+
+    def remove(self, pid: str) -> bool:
+        slot = self.slot_of.pop(pid, None)
+        if slot is None:
+            return False
+        last = self.n - 1
+        if slot != last:
+            # son oyuncuyu boşluğa taşı, aralık yoğun kalsın
+            self.scores[slot] = self.scores[last]
+            self.streaks[slot] = self.streaks[last]
+            self.answered[slot] = self.answered[last]
+            self.pids[slot] = self.pids[last]
+            self.names[slot] = self.names[last]
+            self.outs[slot] = self.outs[last]
+            self.slot_of[self.pids[slot]] = slot
+        self.pids.pop()
+        self.names.pop()
+        self.outs.pop()
+        self.n = last
+        return True
+
+    def slot(self, pid: str) -> Optional[int]:
+        return self.slot_of.get(pid)
+
+    def slots(self, pids: List[str]) -> np.ndarray:
+        """Slots for pids; -1 for players that have left."""
+        get = self.slot_of.get
+        return np.fromiter((get(pid, -1) for pid in pids), dtype=np.int64, count=len(pids))
+
+    # ---- per-player fields ----
+    def name(self, pid: str) -> str:
+        return self.names[self.slot_of[pid]]
+
+    def score(self, pid: str) -> int:
+        return int(self.scores[self.slot_of[pid]])
+
+    def streak(self, pid: str) -> int:
+        return int(self.streaks[self.slot_of[pid]])
+
+    def has_answered(self, slot: int, q_index: int) -> bool:
+        if q_index >> 3 >= self.answered.shape[1]:
+            return False
+        return bool(self.answered[slot, q_index >> 3] & (1 << (q_index & 7)))
+
+    def mark_answered(self, slot: int, q_index: int):
+        self.ensure_questions(q_index + 1)
+        self.answered[slot, q_index >> 3] |= np.uint8(1 << (q_index & 7))
+
+    # ---- bulk ----
+    def reset(self):
+        """Zero every score, streak and answered bit (array fills, no per-player loop)."""
+        self.scores.fill(0)
+        self.streaks.fill(0)
+        self.answered.fill(0)
@@ -0,0 +1,251 @@
+# qbank.py
+"""Compiled question banks: one read-only file, memory-mapped.
+
+`compile_bank()` turns a parsed bank (ingest.parse_rows) into the layout
+below; `compile_bank_to()` writes the same file while the rows stream in:
+
+  header      "QBK1", u32 count, u32 meta_len, u32 postings,
+              u64 offsets of index, difficulty, tags, postings, blob
+  meta        JSON: tag names, posting ranges per tag / difficulty
+  index       u64[count + 1]  question i = blob[index[i]:index[i + 1]]
+  difficulty  u8[count]       0 = not set
+  tags        u64[count]      bit t = has tag t (first MAX_TAGS tags)
+  postings    u32[...]        question ids per tag, then per difficulty
+  blob        compact UTF-8 JSON of each question, back to back
+
+Arrays are 8-byte aligned, little-endian. A QuestionBank over an mmap only
+touches the pages it reads, and every room / worker that opens the same
+file shares those pages through the OS page cache.
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger("quiz")
+
+MAGIC = b"QBK1"
+HEADER = struct.Struct("<4sIII5Q")
+MAX_TAGS = 64
+
+
+def _pad(size: int) -> bytes:
+    return b"\0" * (-size % 8)
+
+
+class _Columns:
+    """Per-question columns, gathered while the records stream past."""
+
+    def __init__(self):
+        self.lengths = array("Q")
+        self.difficulty = array("B")
+        self.tag_bits = array("Q")
+        self.tag_ids: Dict[str, int] = {}
+
+    def add(self, q: dict) -> bytes:
+        """Index one question; returns its blob record."""
+        record = json.dumps(q, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.lengths.append(len(record))
+        self.difficulty.append(int(q.get("difficulty") or 0))
+        bits = 0
+        for tag in q.get("tags") or ():
+            t = self.tag_ids.get(tag)
+            if t is None and len(self.tag_ids) < MAX_TAGS:
+                t = self.tag_ids[tag] = len(self.tag_ids)
+            if t is not None:
+                bits |= 1 << t
+        self.tag_bits.append(bits)
+        return record
+
+    def head(self) -> bytes:
+        """Header, meta and column arrays: everything that precedes the blob."""
+        tag_ids = self.tag_ids
+        if len(tag_ids) == MAX_TAGS:
+            logger.warning("question bank: only the first %d tags are indexed", MAX_TAGS)
+
+        count = len(self.lengths)
+        index = np.zeros(count + 1, dtype="<u8")
+        np.cumsum(np.asarray(self.lengths, dtype="<u8"), out=index[1:])
+        diff_col = np.asarray(self.difficulty, dtype=np.uint8)
+        tag_col = np.asarray(self.tag_bits, dtype="<u8")
+
+        postings: List[np.ndarray] = []
+        ranges: Dict[str, Dict[str, Tuple[int, int]]] = {"tags": {}, "difficulty": {}}
+        start = 0
+        # maskeler teker teker: aynı anda tek bir bool dizi yaşar
+        groups = [("tags", name, lambda t=t: (tag_col & np.uint64(1 << t)) != 0) for name, t in tag_ids.items()]
+        groups += [("difficulty", str(d), lambda d=d: diff_col == d) for d in np.unique(diff_col).tolist() if d]
+        for kind, key, mask in groups:
+            ids = np.flatnonzero(mask()).astype("<u4")
+            postings.append(ids)
+            ranges[kind][key] = (start, start + len(ids))
+            start += len(ids)
+        posting_col = np.concatenate(postings) if postings else np.zeros(0, dtype="<u4")
+
+        meta = json.dumps({"tags": list(tag_ids), "postings": ranges}, ensure_ascii=False).encode("utf-8")
+        parts: List[bytes] = []
+        offset = HEADER.size + len(meta)
+        offset += len(_pad(offset))
+        offsets = []
+        for arr in (index, diff_col, tag_col, posting_col):
+            offsets.append(offset)
+            raw = arr.tobytes()
+            parts += [raw, _pad(len(raw))]
+            offset += len(raw) + len(_pad(len(raw)))
+        offsets.append(offset)
+        head = HEADER.pack(MAGIC, count, len(meta), len(posting_col), *offsets) + meta
+        return b"".join([head, _pad(len(head))] + parts)
+
+
+def compile_bank(questions: Iterable[dict]) -> bytes:
+    cols = _Columns()
+    records = [cols.add(q) for q in questions]
+    return cols.head() + b"".join(records)
+
+
+def compile_bank_to(questions: Iterable[dict], directory: Optional[str] = None) -> str:
+    """Compile straight into a new temp file in `directory`; returns its path.
+
+    Records go to a scratch file as `questions` yields them, so only the
+    fixed-width columns (17 bytes a question) stay in memory. The caller
+    moves the file into place; on error nothing is left behind.
+    """
+    cols = _Columns()
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out, tempfile.TemporaryFile(dir=directory) as blob:
+            for q in questions:
+                blob.write(cols.add(q))
+            out.write(cols.head())
+            blob.seek(0)
+            shutil.copyfileobj(blob, out, 1 << 20)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class QuestionBank(Sequence):
+    """Read-only view of a compiled bank; `bank[i]` decodes one question."""
+
+    def __init__(self, buf: Union[bytes, mmap.mmap], path: Optional[str] = None):
+        magic, count, meta_len, n_post, off_index, off_diff, off_tags, off_post, off_blob = \
+            HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a compiled question bank")
+        self.path = path
+        self.key: Optional[str] = None   # BankCache key, set by the cache
+        self.count = count
+        self._buf = buf
+        self._blob = off_blob
+        meta = json.loads(bytes(buf[HEADER.size:HEADER.size + meta_len]))
+        self.tags: List[str] = meta["tags"]
+        self._tag_bit = {name: t for t, name in enumerate(self.tags)}
+        self._ranges = meta["postings"]
+        # sıfır kopya: diziler doğrudan eşlenmiş sayfaları gösterir
+        self.index = np.frombuffer(buf, dtype="<u8", count=count + 1, offset=off_index)
+        self.difficulty = np.frombuffer(buf, dtype=np.uint8, count=count, offset=off_diff)
+        self.tag_bits = np.frombuffer(buf, dtype="<u8", count=count, offset=off_tags)
+        self.postings = np.frombuffer(buf, dtype="<u4", count=n_post, offset=off_post)
+
+    @classmethod
+    def open(cls, path: str) -> "QuestionBank":
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, path)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start, end = int(self.index[i]), int(self.index[i + 1])
+        return json.loads(self._buf[self._blob + start:self._blob + end])
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def difficulties(self) -> List[int]:
+        return sorted(int(d) for d in self._ranges["difficulty"])
+
+    # ---- filtered selection ----
+    def _posting(self, kind: str, key: str) -> Optional[np.ndarray]:
+        span = self._ranges[kind].get(key)
+        return None if span is None else self.postings[span[0]:span[1]]
+
+    def _filters(self, tags: Iterable[str], difficulty: Optional[int]):
+        """(candidate lists, tag mask); None if nothing can match."""
+        lists, mask = [], 0
+        for tag in tags:
+            ids = self._posting("tags", tag)
+            if ids is None:
+                return None
+            lists.append(ids)
+            mask |= 1 << self._tag_bit[tag]
+        if difficulty:
+            ids = self._posting("difficulty", str(difficulty))
+            if ids is None:
+                return None
+            lists.append(ids)
+        return lists, mask
+
+    def _matches(self, ids: np.ndarray, mask: int, difficulty: Optional[int]) -> np.ndarray:
+        ok = (self.tag_bits[ids] & np.uint64(mask)) == np.uint64(mask)
+        if difficulty:
+            ok &= self.difficulty[ids] == difficulty
+        return ok
+
+    def select(self, tags: Iterable[str] = (), difficulty: Optional[int] = None) -> np.ndarray:
+        """Ids of every matching question (scans the shortest posting list)."""
+        found = self._filters(tags, difficulty)
+        if found is None:
+            return np.zeros(0, dtype=np.int64)
+        lists, mask = found
+        if not lists:
+            return np.arange(self.count)
+        ids = min(lists, key=len).astype(np.int64)
+        return ids[self._matches(ids, mask, difficulty)]
+
+    def sample(self, n: int, tags: Iterable[str] = (), difficulty: Optional[int] = None,
+               rng: Optional[np.random.Generator] = None) -> List[dict]:
+        """Up to `n` distinct random matching questions, decoded.
+
+        A single filter (or none) draws straight from its posting list: O(n).
+        With several filters candidates come from the shortest list and are
+        checked against the columns; only a very selective combination falls
+        back to scanning that list.
+        """
+        rng = rng or np.random.default_rng()
+        tags = list(tags)
+        found = self._filters(tags, difficulty)
+        if found is None or n <= 0:
+            return []
+        lists, mask = found
+        if not lists:
+            ids = rng.choice(self.count, size=min(n, self.count), replace=False)
+        else:
+            cands = min(lists, key=len)
+            draw = rng.choice(len(cands), size=min(len(cands), n if len(lists) == 1 else 4 * n + 16),
+                              replace=False)
+            ids = cands[draw].astype(np.int64)
+            if len(lists) > 1:
+                ids = ids[self._matches(ids, mask, difficulty)]
+                if len(ids) < n and len(draw) < len(cands):
+                    ids = self.select(tags, difficulty)
+                    ids = ids[rng.permutation(len(ids))]
+            ids = ids[:n]
+        return [self[int(i)] for i in ids]
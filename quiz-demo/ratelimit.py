@@ -0,0 +1,46 @@
+# ratelimit.py
+import time
+from typing import Callable, Dict, Tuple
+
+Limits = Dict[str, Tuple[float, float]]   # class -> (tokens per second, burst)
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; each message spends one."""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def allow(self, now: float, cost: float = 1.0) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+
+class RateLimiter:
+    """One connection's buckets, one per message class (created on first use)."""
+
+    def __init__(self, limits: Limits, clock: Callable[[], float] = time.monotonic):
+        self.limits = limits
+        self.clock = clock
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.throttled = 0
+
+    def allow(self, cls: str) -> bool:
+        bucket = self.buckets.get(cls)
+        now = self.clock()
+        if bucket is None:
+            rate, burst = self.limits[cls]
+            bucket = self.buckets[cls] = TokenBucket(rate, burst, now)
+        if bucket.allow(now):
+            return True
+        self.throttled += 1
+        return False
@@ -0,0 +1,209 @@
+# results.py
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("quiz")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id     TEXT PRIMARY KEY,
+    room        TEXT NOT NULL,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    q_count     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    game_id TEXT NOT NULL,
+    q_index INTEGER NOT NULL,
+    text    TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (game_id, q_index)
+);
+CREATE TABLE IF NOT EXISTS answers (
+    game_id    TEXT NOT NULL,
+    q_index    INTEGER NOT NULL,
+    player_id  TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    choice     INTEGER NOT NULL,
+    correct    INTEGER NOT NULL,
+    points     INTEGER NOT NULL,
+    elapsed_ms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    game_id   TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    name      TEXT NOT NULL,
+    score     INTEGER NOT NULL,
+    rank      INTEGER NOT NULL,
+    PRIMARY KEY (game_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS games_started ON games (started_at DESC);
+CREATE INDEX IF NOT EXISTS questions_text ON questions (text);
+CREATE INDEX IF NOT EXISTS answers_question ON answers (game_id, q_index);
+CREATE INDEX IF NOT EXISTS results_name ON results (name, game_id);
+"""
+
+# Oyuncu kimliği bağlantıya bağlı (pid); oyunlar arası geçmiş isimle eşlenir
+PLAYER_HISTORY = """
+SELECT r.game_id, g.room, g.started_at, r.score, r.rank
+FROM results r JOIN games g ON g.game_id = r.game_id
+WHERE r.name = ? ORDER BY g.started_at DESC LIMIT ? OFFSET ?
+"""
+QUESTION_ACCURACY = """
+SELECT q.text, COUNT(a.rowid) AS answers, COALESCE(SUM(a.correct), 0) AS correct,
+       COUNT(DISTINCT q.game_id) AS games
+FROM questions q LEFT JOIN answers a ON a.game_id = q.game_id AND a.q_index = q.q_index
+GROUP BY q.text ORDER BY answers DESC, q.text LIMIT ? OFFSET ?
+"""
+RECENT_GAMES = """
+SELECT game_id, room, started_at, finished_at, q_count FROM games
+ORDER BY started_at DESC LIMIT ? OFFSET ?
+"""
+
+_STOP = object()
+
+
+class ResultsStore:
+    """Games, answers and final scores in SQLite, written by one background thread.
+
+    The event loop only enqueues (`queue.put`, never blocks); the writer waits
+    `tick` seconds after the first queued item and commits everything that
+    arrived meanwhile in one transaction. Reads open their own connection
+    (WAL: readers don't wait for the writer) and are meant for `to_thread`.
+    """
+
+    def __init__(self, path: str, tick: float = 0.5):
+        self.path = path
+        self.tick = tick
+        self.written = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._thread = threading.Thread(target=self._writer, name="results-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---- event loop side: enqueue only ----
+    def game_started(self, game_id: str, room: str, questions: Sequence[dict]):
+        """`questions` is read on the writer thread (a whole QuestionBank can be large),
+        so the caller must not mutate it afterwards; rooms only ever replace theirs."""
+        self._queue.put(("game", game_id, room, time.time(), questions))
+
+    def answers(self, game_id: str, q_index: int, pids: List[str], names: List[str], choices: np.ndarray,
+                correct: np.ndarray, points: np.ndarray, elapsed: np.ndarray):
+        """One scored batch; the arrays are converted to rows on the writer thread."""
+        self._queue.put(("answers", game_id, q_index, pids, names, choices, correct, points, elapsed))
+
+    def game_finished(self, game_id: str, ranking: List[Tuple[str, str, int]]):
+        """`ranking`: (player_id, name, score), best first; tied scores share a rank."""
+        self._queue.put(("finished", game_id, time.time(), ranking))
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is committed (tests / shutdown)."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+
+    # ---- writer thread ----
+    def _writer(self):
+        conn = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.tick
+                while batch[-1] is not _STOP and not isinstance(batch[-1], threading.Event):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                try:
+                    with conn:
+                        for item in batch:
+                            if isinstance(item, tuple):
+                                self._apply(conn, item)
+                except sqlite3.Error as e:
+                    logger.error("results write failed (%d items dropped): %s", len(batch), e)
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                if batch[-1] is _STOP:
+                    return
+        finally:
+            conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, item: tuple):
+        kind = item[0]
+        if kind == "answers":
+            _, game_id, q_index, pids, names, choices, correct, points, elapsed = item
+            conn.executemany(
+                "INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zip([game_id] * len(pids), [q_index] * len(pids), pids, names, choices.tolist(),
+                    correct.astype(np.int8).tolist(), points.tolist(),
+                    np.rint(elapsed * 1000).astype(np.int64).tolist()),
+            )
+            self.written += len(pids)
+        elif kind == "game":
+            _, game_id, room, started_at, questions = item
+            conn.execute("INSERT OR REPLACE INTO games VALUES (?, ?, ?, NULL, ?)",
+                         (game_id, room, started_at, len(questions)))
+            conn.executemany("INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?)",
+                             ((game_id, i, q["question"], q["correct"]) for i, q in enumerate(questions)))
+        elif kind == "finished":
+            _, game_id, finished_at, ranking = item
+            conn.execute("UPDATE games SET finished_at = ? WHERE game_id = ?", (finished_at, game_id))
+            rows, rank, prev = [], 0, None
+            for i, (pid, name, score) in enumerate(ranking):
+                if score != prev:
+                    rank, prev = i + 1, score
+                rows.append((game_id, pid, name, score, rank))
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+
+    # ---- queries (blocking; call via asyncio.to_thread) ----
+    def query(self, sql: str, params: Sequence[Any]) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def player_history(self, name: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        return self.query(PLAYER_HISTORY, (name, limit, offset))
+
+    def question_accuracy(self, limit: int, offset: int) -> List[Dict[str, Any]]:
+        return self.query(QUESTION_ACCURACY, (limit, offset))
+
+    def recent_games(self, limit: int, offset: int) -> List[Dict[str, Any]]:
+        return self.query(RECENT_GAMES, (limit, offset))
+
+
+def open_store(path: Optional[str], tick: float = 0.5) -> Optional[ResultsStore]:
+    """None when disabled (empty path) or the database can't be opened."""
+    if not path:
+        return None
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return ResultsStore(path, tick)
+    except (OSError, sqlite3.Error) as e:
+        logger.error("results store disabled (%s): %s", path, e)
+        return None
@@ -0,0 +1,141 @@
+# sessions.py
+import secrets
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple, Union
+
+import wire
+from fanout import Outbox
+
+Frame = Union[str, bytes]
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class ReplayRing:
+    """A room's broadcast sequence (`rseq`) and its last frames, shared by every session.
+
+    Broadcasts are numbered once per room, not per recipient, so replay
+    memory grows with the room's frame rate instead of players x frames.
+    The owning worker stamps frames; a RoomLink mirrors the owner's numbers
+    with `keep()` so its local sessions can resume too.
+    """
+
+    def __init__(self, size: int = 256):
+        self.seq = 0
+        self.frames: Deque[Tuple[int, str, Optional[bytes]]] = deque(maxlen=max(1, size))
+
+    def stamp(self, text: str, blob: Optional[bytes] = None) -> Tuple[str, Optional[bytes]]:
+        """Number one broadcast (both encodings) and keep it for replay."""
+        self.seq += 1
+        # kare zaten kodlanmış: yeniden encode etmeden rseq ekle
+        text = '{"rseq":%d,%s' % (self.seq, text[1:])
+        if blob is not None:
+            blob = wire.with_seq(blob, self.seq, room=True)
+        self.frames.append((self.seq, text, blob))
+        return text, blob
+
+    def keep(self, seq: int, text: str, blob: Optional[bytes] = None):
+        """Mirror a frame numbered by the owning worker."""
+        self.seq = seq
+        self.frames.append((seq, text, blob))
+
+    def since(self, seq: int) -> Optional[List[Tuple[int, str, Optional[bytes]]]]:
+        """Frames after `seq`, or None when the ring no longer reaches back that far."""
+        if seq > self.seq or (self.frames and self.frames[0][0] > seq + 1):
+            return None
+        return [f for f in self.frames if f[0] > seq]
+
+
+class Session:
+    """A player's identity across reconnects.
+
+    Stands in for the connection's Outbox (same `send(text, kind)`), so rooms
+    and links keep one sender per player no matter how often the socket
+    changes. Room broadcasts arrive already numbered (see ReplayRing) and
+    are passed through untouched. Direct frames (acks, state, results) get a
+    per-session `fseq` spliced in front of the encoded JSON and are kept in
+    a small buffer; while no socket is attached they only go to the buffer.
+    """
+
+    def __init__(self, pid: str, out: Optional[Outbox], replay: int = 16):
+        self.pid = pid
+        self.token = new_token()
+        self.out: Optional[Outbox] = out
+        self.seq = 0
+        # (fseq, ring.seq when sent, frame): the second orders it among room frames on replay
+        self.buffer: Deque[Tuple[int, int, Frame]] = deque(maxlen=max(1, replay))
+        self.ring: Optional[ReplayRing] = None
+        self.ring_base = 0         # ring.seq when this session joined the room
+        self.binary = False        # wire.WIRE_BIN negotiated (kept across sockets)
+        self.name = ""
+        self.room: Any = None      # QuizState on this worker, or None
+        self.link: Any = None      # RoomLink when the room lives on another worker
+        self.expiry: Any = None    # gameclock.Timer while disconnected
+
+    @property
+    def connected(self) -> bool:
+        return self.out is not None
+
+    def bind(self, ring: Optional[ReplayRing]):
+        """Follow a room's broadcasts; direct frames from the old room can't be ordered against it."""
+        if ring is self.ring:
+            return
+        self.ring = ring
+        self.ring_base = ring.seq if ring is not None else 0
+        self.buffer.clear()
+
+    def send(self, text: Frame, kind: Optional[str] = None) -> bool:
+        if wire.is_room_frame(text):
+            framed = text   # odanın halkasında zaten var
+        else:
+            self.seq += 1
+            if isinstance(text, bytes):
+                framed = wire.with_seq(text, self.seq)
+            else:
+                framed = '{"fseq":%d,%s' % (self.seq, text[1:])
+            self.buffer.append((self.seq, self.ring.seq if self.ring is not None else 0, framed))
+        out = self.out
+        if out is not None and not out.send(framed, kind):
+            self.out = None
+        return True  # kopuk oturum da odada kalır; süre dolunca çıkarılır
+
+    def attach(self, out: Outbox, last_seq: Optional[int], last_rseq: Optional[int] = 0) -> Optional[int]:
+        """Switch to a new socket and replay what came after `last_seq` / `last_rseq`.
+
+        Direct and room frames are merged back in the order they were sent.
+        Returns how many frames were replayed, or None when either buffer no
+        longer reaches back that far (caller must send fresh state instead).
+        """
+        if self.out is not None and self.out is not out:
+            self.out.close()
+        self.out = out
+        if not isinstance(last_seq, int) or last_seq > self.seq or not isinstance(last_rseq, int):
+            return None
+        if self.buffer and self.buffer[0][0] > last_seq + 1:
+            return None
+        direct = [(at, text) for seq, at, text in self.buffer if seq > last_seq]
+        shared = []
+        if self.ring is not None:
+            shared = self.ring.since(max(last_rseq, self.ring_base))
+            if shared is None:
+                return None
+        missed: List[Frame] = []
+        i = 0
+        for rseq, text, blob in shared:
+            while i < len(direct) and direct[i][0] < rseq:
+                missed.append(direct[i][1])
+                i += 1
+            missed.append(blob if blob is not None and self.binary else text)
+        missed.extend(text for _, text in direct[i:])
+        for text in missed:
+            out.send(text, None)
+        return len(missed)
+
+    def detach(self, out: Outbox) -> bool:
+        """Drop `out` if it is still the current socket. False if already replaced."""
+        if self.out is out:
+            self.out = None
+            return True
+        return self.out is None
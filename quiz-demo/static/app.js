@@ -1,24 +1,153 @@
 (() => {
   const isAdmin = window.location.pathname.includes("/admin");
   const byId = (id) => document.getElementById(id);
+  // Oda kodu URL'den gelir (?room=ABCDE); yoksa sunucu varsayılan odayı kullanır
+  const roomCode = (new URLSearchParams(location.search).get('room') || '').trim().toUpperCase();
 
   const wsProto = location.protocol === 'https:' ? 'wss:' : 'ws:';
   const wsUrl = `${wsProto}//${location.host}/ws`;
-  const ws = new WebSocket(wsUrl);
+
+  // Bağlantı koparsa yeniden bağlanılır; sayfa kodu dinleyicilerini onSocket ile kaydeder
+  let ws = null;
+  let retries = 0;
+  const socketListeners = [];  // [event, fn]
+  const onSocket = (event, fn) => {
+    socketListeners.push([event, fn]);
+    if (ws) ws.addEventListener(event, fn);
+  };
+  const sendJson = (payload) => {
+    if (ws && ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify(payload));
+  };
+
+  function connect() {
+    ws = new WebSocket(wsUrl);
+    ws.binaryType = 'arraybuffer';
+    socketListeners.forEach(([event, fn]) => ws.addEventListener(event, fn));
+    ws.addEventListener('open', () => { retries = 0; });
+    ws.addEventListener('error', (e) => console.error('WS error', e));
+    ws.addEventListener('close', () => {
+      const t = byId('feedback') || byId('loadInfo');
+      if (t) t.textContent = 'Bağlantı koptu, yeniden bağlanılıyor…';
+      // 0.5 sn'den başlayıp 10 sn'ye kadar ikiye katlanan bekleme (+ rastgele pay)
+      const delay = Math.min(10000, 500 * 2 ** retries++) * (0.75 + Math.random() / 2);
+      setTimeout(connect, delay);
+    });
+  }
+
+  // Saat senkronu: sunucu ping atar, biz kendi saatimizle pong döneriz.
+  // clockOffsetMs = bizim saat - sunucu saati (sunucunun ölçtüğü en düşük RTT örneğinden)
+  let clockOffsetMs = 0;
+  const serverNow = () => (Date.now() - clockOffsetMs) / 1000;
 
   function safeParse(data) { try { return JSON.parse(data); } catch { return null; } }
+
+  // İkili kablo biçimi (wire.py, "bin2"): sık gelen kareler sabit düzenli, gerisi JSON.
+  // Sunucu kareleri: u8 kod, u32 sıra, gövde; bizimkiler: u8 kod, gövde. Little-endian.
+  // Kodda 0x40 varsa sıra odanın yayın sırasıdır (rseq), yoksa oturumun (fseq).
+  const WIRE = 'bin2';
+  let binaryWire = false;  // sunucu joined / admin_ack / resumed ile onaylayınca
+  const utf8 = new TextDecoder();
+  function decodeBinary(buf) {
+    const v = new DataView(buf);
+    const code = v.getUint8(0), seq = v.getUint32(1, true);
+    const msg = !seq ? {} : code & 0x40 ? { rseq: seq } : { fseq: seq };
+    switch (code & ~0x40) {
+      case 0x01:
+        return { ...msg, type: 'answer_ack', correct: !!v.getUint8(5), score: v.getInt32(6, true),
+                 streak: v.getUint16(10, true), rank: v.getUint32(12, true), index: v.getUint32(16, true) };
+      case 0x02: {
+        const top5 = [];
+        let o = 6;
+        for (let i = 0; i < v.getUint8(5); i++) {
+          const len = v.getUint8(o);
+          const name = utf8.decode(new Uint8Array(buf, o + 1, len));
+          top5.push([name, v.getInt32(o + 1 + len, true)]);
+          o += 5 + len;
+        }
+        return { ...msg, type: 'scores', top5 };
+      }
+      case 0x03:
+        return { ...msg, type: 'go', index: v.getUint32(5, true), expires_at: v.getFloat64(9, true) };
+      case 0x04:
+        return { ...msg, type: 'ping', id: v.getUint32(5, true), ts: v.getFloat64(9, true) };
+    }
+    return null;
+  }
+  const encoders = {
+    answer: (m) => Uint8Array.of(0x81, m.choice),
+    pong: (m) => {
+      const v = new DataView(new ArrayBuffer(13));
+      v.setUint8(0, 0x82);
+      v.setUint32(1, m.id, true);
+      v.setFloat64(5, m.ct, true);
+      return v.buffer;
+    },
+  };
+  // Sık gönderilenler (answer, pong) anlaşma varsa ikili, gerisi JSON
+  const sendFrame = (payload) => {
+    const enc = binaryWire && encoders[payload.type];
+    if (!enc) return sendJson(payload);
+    if (ws && ws.readyState === WebSocket.OPEN) ws.send(enc(payload));
+  };
+  // Oturum (fseq) ve oda yayını (rseq) sıraları; yeniden bağlanınca bunlardan sonrası istenir
+  let lastSeq = null;
+  let lastRseq = 0;
+
   function handleMessage(event, handlers) {
-    const parsed = safeParse(event.data);
+    const parsed = event.data instanceof ArrayBuffer ? decodeBinary(event.data) : safeParse(event.data);
     if (!parsed || !parsed.type) return;
+    if (parsed.wire !== undefined) binaryWire = parsed.wire === WIRE;
+    if (typeof parsed.fseq === 'number') lastSeq = parsed.fseq;
+    if (typeof parsed.rseq === 'number') lastRseq = parsed.rseq;
+    if (parsed.type === 'ping') {
+      sendFrame({ type: 'pong', id: parsed.id, ct: Date.now() });
+      return;
+    }
+    if (parsed.type === 'clock') {
+      clockOffsetMs = parsed.offset_ms || 0;
+      return;
+    }
     const fn = handlers[parsed.type];
     if (typeof fn === 'function') fn(parsed);
   }
 
-  ws.addEventListener('error', (e) => console.error('WS error', e));
-  ws.addEventListener('close', () => {
-    const t = byId('feedback') || byId('loadInfo');
-    if (t) t.textContent = 'Bağlantı kapandı. Sayfayı yenileyin.';
-  });
+  // Lobi: tam liste yalnızca bağlanınca (ya da seq boşluğunda) gelir, sonrası
+  // player_joined / player_left delta'ları (tick başına toplu). Çizim kare başına en fazla bir kez.
+  function createLobby(render) {
+    let seq = null;
+    const members = new Map();  // pid -> name
+    let pending = false;
+    const draw = () => {
+      if (pending) return;
+      pending = true;
+      requestAnimationFrame(() => { pending = false; render([...members.values()]); });
+    };
+    return {
+      snapshot(data) {
+        members.clear();
+        const pids = data.pids || [];
+        (data.players || []).forEach((name, i) => members.set(pids[i] ?? i, name));
+        seq = data.seq ?? null;
+        draw();
+      },
+      delta(data) {
+        if (seq === null || data.seq <= seq) return;
+        if (data.seq !== seq + 1) {
+          // kare kaçırdık: tam listeyi iste, o gelene kadar delta'ları yok say
+          seq = null;
+          sendJson({ type: 'lobby_sync' });
+          return;
+        }
+        seq = data.seq;
+        if (data.type === 'player_joined') (data.players || []).forEach(([pid, name]) => members.set(pid, name));
+        else (data.pids || []).forEach((pid) => members.delete(pid));
+        draw();
+      },
+    };
+  }
+
+  // ağ koşulları değişir; yarım dakikada bir yeniden ölç
+  setInterval(() => sendJson({ type: 'sync' }), 30000);
 
   // ======== Player Page ========
   if (!isAdmin) {
@@ -50,13 +179,24 @@
     let lastChoice = null;
     let lastCorrect = false;
     let myStreak = 0;
+    let staged = null;  // prestage: sıradaki soru, `go` bekliyor
+
+    // Oturum anahtarı sekme kapanana kadar saklanır: yenileme/kopma sonrası aynı oyuncu olarak döneriz
+    const sessionKey = `quizSession:${roomCode}`;
+    let session = sessionStorage.getItem(sessionKey);
+
+    function showGame(name) {
+      if (name) me.textContent = `Hoş geldin, ${name}`;
+      joinSection.classList.add('hidden');
+      gameSection.classList.remove('hidden');
+      feedbackEl.textContent = '';
+    }
 
     function setTimer() {
       if (!currentExpire) return;
       clearInterval(countdownInterval);
       countdownInterval = setInterval(() => {
-        const now = Date.now() / 1000;
-        const left = Math.max(0, currentExpire - now);
+        const left = Math.max(0, currentExpire - serverNow());
         timerEl.textContent = String(Math.ceil(left));
         const prog = Math.min(100, Math.max(0, ((QUESTION_DURATION - left) / QUESTION_DURATION) * 100));
         timerRing.style.setProperty('--prog', prog);
@@ -77,7 +217,7 @@
         };
         btn.onclick = () => {
           lastChoice = idx;
-          ws.send(JSON.stringify({ type: 'answer', choice: idx }));
+          sendFrame({ type: 'answer', choice: idx });
           Array.from(optionsEl.querySelectorAll('button')).forEach(b => b.disabled = true);
         };
         optionsEl.appendChild(btn);
@@ -107,6 +247,7 @@
         return `<div class="avatar">${ini}</div>`;
       }).join('');
     }
+    const lobbyState = createLobby(renderAvatars);
 
     function showStreakBadge(streak) {
       if (!streakBadge) return;
@@ -120,45 +261,76 @@
       }
     }
 
+    function showQuestion(data) {
+      qProgress.textContent = `Soru ${data.index + 1} / ${data.q_total}`;
+      questionEl.textContent = data.question;
+      const ratio = ((data.index + 1) / data.q_total) * 100;
+      if (qbarFill) qbarFill.style.width = `${ratio}%`;
+
+      currentExpire = data.expires_at;
+      timerRing.style.setProperty('--prog', 0);
+      setTimer();
+
+      lastChoice = null;
+      lastCorrect = false;
+      feedbackEl.textContent = '';
+      streakBadge?.classList.add('hidden');
+      leaderboardEl.classList.add('hidden');
+
+      renderOptions(data.options);
+      if (data.answered) Array.from(optionsEl.children).forEach(b => b.disabled = true);
+    }
+
     joinBtn?.addEventListener('click', () => {
       const nm = nameInput.value.trim() || 'Misafir';
-      ws.send(JSON.stringify({ type: 'join', name: nm }));
+      sendJson({ type: 'join', name: nm, room: roomCode, wire: WIRE });
+    });
+
+    onSocket('open', () => {
+      binaryWire = false;  // yeni bağlantı: onay gelene kadar JSON
+      if (session) sendJson({ type: 'resume', session, last_seq: lastSeq, last_rseq: lastRseq, room: roomCode, wire: WIRE });
     });
 
-    ws.addEventListener('message', (event) => handleMessage(event, {
+    onSocket('message', (event) => handleMessage(event, {
       joined: (data) => {
-        me.textContent = `Hoş geldin, ${data.name}`;
-        joinSection.classList.add('hidden');
-        gameSection.classList.remove('hidden');
-        feedbackEl.textContent = '';
+        session = data.session;
+        if (session) sessionStorage.setItem(sessionKey, session);
+        showGame(data.name);
       },
 
-      lobby: (data) => {
-        renderAvatars(data.players || []);
+      // kaçırılan kareler (ya da güncel durum) arkasından gelir
+      resumed: () => showGame(),
+      resume_failed: () => {
+        session = null;
+        sessionStorage.removeItem(sessionKey);
+        gameSection.classList.add('hidden');
+        joinSection.classList.remove('hidden');
+        feedbackEl.textContent = '';
       },
+      state: (data) => {
+        me.textContent = `Hoş geldin, ${data.name}`;
+        myStreak = data.streak ?? myStreak;
+      },
+
+      lobby: (data) => lobbyState.snapshot(data),
+      player_joined: (data) => lobbyState.delta(data),
+      player_left: (data) => lobbyState.delta(data),
 
       scores: (data) => {
         renderMiniBoard(data.top5 || []);
       },
 
-      question: (data) => {
-        qProgress.textContent = `Soru ${data.index + 1} / ${data.q_total}`;
-        questionEl.textContent = data.question;
-        const ratio = ((data.index + 1) / data.q_total) * 100;
-        if (qbarFill) qbarFill.style.width = `${ratio}%`;
-
-        currentExpire = data.expires_at;
-        timerRing.style.setProperty('--prog', 0);
-        setTimer();
-
-        lastChoice = null;
-        lastCorrect = false;
-        feedbackEl.textContent = '';
-        streakBadge?.classList.add('hidden');
-        leaderboardEl.classList.add('hidden');
-
-        renderOptions(data.options);
+      // Sıradaki soru reveal beklemesinde gelir; `go` gelene kadar gösterilmez
+      prestage: (data) => { staged = data; },
+      go: (data) => {
+        if (!staged || staged.index !== data.index) {
+          sendJson({ type: 'question_sync' });  // ön-gönderim kaçtı: tam soruyu iste
+          return;
+        }
+        showQuestion({ ...staged, expires_at: data.expires_at });
+        staged = null;
       },
+      question: (data) => showQuestion(data),
 
       // Anında geri bildirim yazısı göstermiyoruz; sadece streak/sonuç state'i güncelleniyor
       answer_ack: (data) => {
@@ -187,7 +359,17 @@
         `;
       },
 
+      room_closed: () => {
+        feedbackEl.textContent = 'Oda kapatıldı.';
+        optionsEl.innerHTML = '';
+      },
+
+      error: (data) => {
+        feedbackEl.textContent = data.message || '';
+      },
+
       reset_done: () => {
+        staged = null;
         feedbackEl.textContent = '';
         optionsEl.innerHTML = '';
         questionEl.textContent = '';
@@ -215,16 +397,51 @@
     const excelFile = byId('excelFile');
     const uploadBtn = byId('uploadBtn');
 
-    ws.addEventListener('open', () => {
-      ws.send(JSON.stringify({ type: 'admin' }));
+    // Oyun için soru seçimi (boş: bankanın tamamı)
+    const gameCount = byId('gameCount');
+    const gameTags = byId('gameTags');
+    const gameDifficulty = byId('gameDifficulty');
+    const bankTags = byId('bankTags');
+
+    // Oda kontrolleri
+    const roomInfo = byId('roomInfo');
+    const newRoomBtn = byId('newRoomBtn');
+
+    // Canlı cevap dağılımı ve dışa aktarma
+    const answerStats = byId('answerStats');
+    const exportLink = byId('exportLink');
+    const LETTERS = 'ABCDEFGH';
+
+    onSocket('open', () => {
+      binaryWire = false;
+      sendJson({ type: 'admin', room: roomCode, wire: WIRE });
     });
 
+    newRoomBtn?.addEventListener('click', async () => {
+      try {
+        const res = await fetch('/api/rooms', { method: 'POST' });
+        const j = await res.json();
+        if (j.ok) location.search = `?room=${j.code}`;
+        else loadInfo.textContent = `Hata: ${j.error || 'Oda açılamadı'}`;
+      } catch (err) {
+        loadInfo.textContent = 'Ağ hatası: ' + err;
+      }
+    });
+
+    // Atlanan satırlar: "3 satır atlandı (satır 5: Boş seçenek var.)"
+    function skippedNote(report) {
+      if (!report || !report.skipped) return '';
+      const first = (report.errors || [])[0];
+      return ` ${report.skipped} satır atlandı` + (first ? ` (satır ${first.row}: ${first.error})` : '');
+    }
+
     function renderLobby(list) {
       lobby.innerHTML = list.map(n => `<li class="px-3 py-2 bg-gray-700 rounded-lg">${n}</li>`).join('');
     }
+    const lobbyState = createLobby(renderLobby);
 
     loadBtn.addEventListener('click', () => {
-      ws.send(JSON.stringify({ type: 'load_questions', path: excelPath.value.trim() || 'questions.xlsx' }));
+      sendJson({ type: 'load_questions', path: excelPath.value.trim() || 'questions.xlsx' });
     });
 
     // Lokal dosyadan upload
@@ -234,13 +451,13 @@
       const fd = new FormData();
       fd.append('file', f, 'questions.xlsx');
       try {
-        const res = await fetch('/api/upload', { method: 'POST', body: fd });
+        const res = await fetch(`/api/upload?room=${encodeURIComponent(roomCode)}`, { method: 'POST', body: fd });
         const j = await res.json();
         if (j.ok) {
           qCount.textContent = `Soru sayısı: ${j.count}`;
-          loadInfo.textContent = `Yüklendi (${j.count}).`;
+          loadInfo.textContent = `Yüklendi (${j.count}).` + skippedNote(j);
         } else {
-          loadInfo.textContent = `Hata: ${j.error || 'Yüklenemedi'}`;
+          loadInfo.textContent = `Hata: ${j.error || 'Yüklenemedi'}` + skippedNote(j);
         }
       } catch (err) {
         loadInfo.textContent = 'Ağ hatası: ' + err;
@@ -248,32 +465,56 @@
     });
 
     startBtn.addEventListener('click', () => {
-      ws.send(JSON.stringify({ type: 'start_quiz' }));
+      const msg = { type: 'start_quiz' };
+      if (gameCount?.value) msg.count = Number(gameCount.value);
+      if (gameTags?.value.trim()) msg.tags = gameTags.value;
+      if (gameDifficulty?.value) msg.difficulty = Number(gameDifficulty.value);
+      sendJson(msg);
     });
 
     nextBtn.addEventListener('click', () => {
-      ws.send(JSON.stringify({ type: 'next' }));
+      sendJson({ type: 'next' });
     });
 
     resetBtn.addEventListener('click', () => {
-      ws.send(JSON.stringify({ type: 'reset' }));
+      sendJson({ type: 'reset' });
     });
 
-    ws.addEventListener('message', (event) => handleMessage(event, {
+    onSocket('message', (event) => handleMessage(event, {
       admin_ack: (data) => {
-        renderLobby(data.players || []);
+        if (roomInfo) roomInfo.textContent = `Oda: ${data.room} — oyuncular ${location.origin}/?room=${data.room}`;
+        if (exportLink) exportLink.href = `/api/export?room=${encodeURIComponent(data.room)}`;
+        lobbyState.snapshot(data);
         qCount.textContent = `Soru sayısı: ${data.q_count || 0}`;
       },
-      lobby: (data) => {
-        renderLobby(data.players || []);
+      lobby: (data) => lobbyState.snapshot(data),
+      player_joined: (data) => lobbyState.delta(data),
+      player_left: (data) => lobbyState.delta(data),
+      answer_stats: (data) => {
+        if (!answerStats) return;
+        const dist = (data.choices || []).map((n, i) => `${LETTERS[i]}: ${n}`).join('  ');
+        answerStats.textContent = `Soru ${data.index + 1}: ${data.answered} cevap, ${data.correct} doğru — ${dist}`;
+      },
+      questions_loading: (data) => {
+        loadInfo.textContent = data.rows ? `Yükleniyor… ${data.rows} satır` : 'Yükleniyor…';
       },
       questions_loaded: (data) => {
         qCount.textContent = `Soru sayısı: ${data.count}`;
         loadInfo.textContent = `Yüklendi (${data.count}).`;
+        if (data.tags?.length) loadInfo.textContent += ` Etiketler: ${data.tags.join(', ')}`;
+        if (bankTags) bankTags.innerHTML = (data.tags || []).map(t => `<option value="${t}">`).join('');
+      },
+      load_report: (data) => {
+        loadInfo.textContent += skippedNote(data);
       },
       error: (data) => {
         loadInfo.textContent = `Hata: ${data.message}`;
       },
+      room_closed: () => {
+        loadInfo.textContent = 'Oda kapatıldı.';
+      },
     }));
   }
+
+  connect();
 })();
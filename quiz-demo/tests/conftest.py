@@ -0,0 +1,76 @@
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import pytest
+
+# app reads these at import and in lifespan: keep every store out of the real data directories
+_DATA = tempfile.mkdtemp(prefix="quiz-tests-")
+atexit.register(shutil.rmtree, _DATA, ignore_errors=True)
+os.environ["DATA_DIR"] = _DATA
+os.environ["RESULTS_DB"] = os.path.join(_DATA, "results.sqlite3")
+os.environ["GAMELOG_DIR"] = os.path.join(_DATA, "gamelog")
+os.environ["BANK_CACHE_DIR"] = os.path.join(_DATA, "banks")
+
+class FakeOut:
+    """Stands in for an Outbox / Session: keeps every frame decoded."""
+
+    binary = False
+
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+
+    def send(self, text, kind=None):
+        self.frames.append(json.loads(text))
+        return True
+
+    def close(self, code=1013):
+        self.closed = True
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _next_frame(ws, *types):
+    """Next JSON frame of one of `types`, skipping the rest."""
+    while True:
+        msg = ws.receive_json()
+        if msg["type"] in types:
+            return msg
+
+@pytest.fixture
+def make_out():
+    return FakeOut
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def next_frame():
+    return _next_frame
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """Fresh results db, game journal and bank cache per test, all under tmp_path."""
+    import app
+    from bankcache import BankCache
+    from gamelog import GameLog
+    from results import ResultsStore
+
+    results = ResultsStore(str(tmp_path / "results.sqlite3"), app.RESULTS_TICK_SEC)
+    gamelog = GameLog(str(tmp_path / "gamelog"))
+    banks = BankCache("quiz-demo", max_entries=app.BANK_CACHE_SIZE, directory=str(tmp_path / "banks"),
+                      version=app.PARSER_VERSION)
+    monkeypatch.setattr(app, "RESULTS", results)
+    monkeypatch.setattr(app, "GAMELOG", gamelog)
+    monkeypatch.setattr(app, "BANKS", banks)
+    monkeypatch.setattr(app.LOADER, "cache", banks)
+    yield
+    results.close()
+    gamelog.close()
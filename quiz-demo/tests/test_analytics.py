@@ -0,0 +1,62 @@
+import asyncio
+import csv
+import io
+import numpy as np
+from fastapi.testclient import TestClient
+import app
+from analytics import AnswerLog, QuestionStats
+
+def test_question_stats_count_batches():
+    stats = QuestionStats(2, options=4)
+    stats.add(np.array([0, 1, 1, 7]), np.array([False, True, True, False]), np.array([0.4, 2.5, 9.0, 12.0]))
+    stats.add(np.array([3]), np.array([False]), np.array([1.0]))
+    frame = stats.frame()
+    assert frame["choices"] == [1, 2, 0, 1] and frame["invalid"] == 1
+    assert frame["answered"] == 5 and frame["correct"] == 2
+    assert frame["elapsed"][0] == 2 and frame["elapsed"][2] == 1 and frame["elapsed"][-1] == 1
+    assert sum(frame["elapsed"]) == 5
+
+def test_answers_are_logged_and_pushed_to_admins(make_out):
+    async def run():
+        room = app.QuizState("STATS")
+        room.questions = [{"question": "1+1?", "options": ["1", "2", "3", "4"], "correct": 1}]
+        admin = make_out()
+        room.admins.add(admin)
+        room.new_game()
+        for pid, name in (("p1", "ayse"), ("p2", "burak")):
+            room.add_player(pid, name, make_out())
+        await app.start_question(room, 0)
+        room.answers.add("p1", make_out(), 0, 1, 1.2)
+        room.answers.add("p2", make_out(), 0, 3, 4.0)
+        room.answers.flush()
+        await asyncio.sleep(0.01)
+        room.close()
+        return room, [f for f in admin.frames if f["type"] == "answer_stats"]
+
+    room, stats = asyncio.run(run())
+    assert stats[-1]["answered"] == 2 and stats[-1]["correct"] == 1
+    assert stats[-1]["choices"] == [0, 1, 0, 1]
+    rows = list(csv.reader(io.StringIO("".join(room.results.iter_csv()))))
+    assert rows[0][:4] == ["game", "question", "player_id", "name"]
+    assert rows[1] == ["1", "0", "p1", "ayse", "1", "1", "5", "1200"]
+    assert rows[2][3:6] == ["burak", "3", "0"]
+
+def test_export_streams_latest_game_as_csv():
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        log = AnswerLog(3)
+        log.append(0, ["p1"], ["a,b"], np.array([2]), np.array([True]), np.array([5]), np.array([0.5]))
+        app.ROOMS.rooms[code].results = log
+        res = client.get(f"/api/export?room={code}")
+        assert res.status_code == 200 and res.headers["content-type"].startswith("text/csv")
+        rows = list(csv.reader(io.StringIO(res.text)))
+        assert rows[1] == ["3", "0", "p1", "a,b", "2", "1", "5", "500"]
+        assert client.get("/api/export?room=NOPE9").status_code == 404
+
+def test_export_defuses_formula_cells():
+    log = AnswerLog(1)
+    names = ["=HYPERLINK(\"x\")", "+1", "-2", "@SUM(A1)", "\tx", "\rx", "ayşe-1"]
+    log.append(0, [f"p{i}" for i in range(len(names))], names, np.zeros(len(names), dtype=np.int64),
+               np.zeros(len(names), dtype=bool), np.zeros(len(names), dtype=np.int64), np.zeros(len(names)))
+    rows = list(csv.reader(io.StringIO("".join(log.iter_csv()), newline="")))
+    assert [r[3] for r in rows[1:]] == ["'" + n for n in names[:-1]] + ["ayşe-1"]
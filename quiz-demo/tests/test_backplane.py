@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from backplane import Broker, LocalBackplane, UnixBackplane
+
+async def _settle():
+    for _ in range(20):
+        await asyncio.sleep(0.005)
+
+@pytest_asyncio.fixture
+async def broker_path(tmp_path):
+    path = str(tmp_path / "bp.sock")
+    server = await asyncio.start_unix_server(Broker().handle, path=path)
+    yield path
+    server.close()
+
+@pytest.mark.asyncio
+async def test_local_claim_and_publish():
+    bp = LocalBackplane("w1")
+    got = []
+    bp.subscribe("room:A", got.append)
+    bp.publish("room:A", {"text": "x"})
+    assert got == [{"text": "x"}]
+    assert await bp.claim("A") == "w1"
+    assert await bp.owner("A") == "w1"
+    bp.release("A")
+    assert await bp.owner("A") is None
+
+@pytest.mark.asyncio
+async def test_unix_pubsub_between_workers(broker_path):
+    a, b = UnixBackplane("a", broker_path), UnixBackplane("b", broker_path)
+    got = []
+    b.subscribe("room:X", got.append)
+    await a.start(); await b.start()
+    await _settle()
+    a.publish("room:X", {"text": "q"})
+    a.publish("room:Y", {"text": "other"})
+    await _settle()
+    assert got == [{"text": "q"}]
+    await a.close(); await b.close()
+
+@pytest.mark.asyncio
+async def test_only_one_owner_per_room(broker_path):
+    a, b = UnixBackplane("a", broker_path), UnixBackplane("b", broker_path)
+    await a.start(); await b.start()
+    owners = await asyncio.gather(a.claim("R"), b.claim("R"))
+    assert owners[0] == owners[1]
+    assert await b.rooms() == {"R": owners[0]}
+    await a.close(); await b.close()
+
+@pytest.mark.asyncio
+async def test_owner_loss_releases_room(broker_path):
+    a, b = UnixBackplane("a", broker_path), UnixBackplane("b", broker_path)
+    await a.start(); await b.start()
+    got = []
+    b.subscribe("room:R", got.append)
+    assert await a.claim("R") == "a"
+    await a.close()
+    await _settle()
+    assert got == [{"owner_lost": True}]
+    assert await b.owner("R") is None
+    await b.close()
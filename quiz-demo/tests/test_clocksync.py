@@ -0,0 +1,43 @@
+import time
+from clocksync import ClockSync
+
+def test_round_sends_samples_then_stops():
+    sync = ClockSync(samples=3)
+    ping = sync.start_round()
+    frames = []
+    while ping is not None:
+        ping, clock = sync.pong({"id": ping["id"], "ct": ping["ts"] + 250.0})
+        frames.append(clock)
+    assert len(frames) == 3
+    assert all(f["type"] == "clock" for f in frames)
+    # client clock 250 ms ahead, near-zero RTT
+    assert abs(sync.offset_ms - 250.0) < 5
+    assert sync.rtt_ms < 50
+
+def test_min_rtt_sample_wins_and_unknown_ids_ignored():
+    sync = ClockSync(samples=1)
+    slow = sync.ping()
+    fast = sync.ping()
+    time.sleep(0.02)
+    sync.pong({"id": slow["id"], "ct": slow["ts"]})
+    assert sync.rtt_ms >= 20
+    sync.pong({"id": fast["id"] + 100, "ct": 0})
+    again = sync.ping()
+    sync.pong({"id": again["id"], "ct": again["ts"]})
+    assert sync.rtt_ms < 20
+    assert sync.one_way_ms == sync.rtt_ms / 2
+
+def test_malformed_pong_ids_are_ignored():
+    sync = ClockSync(samples=1)
+    ping = sync.ping()
+    for bad in ([ping["id"]], {"x": 1}, "1", None, True, 1.0):
+        assert sync.pong({"id": bad, "ct": ping["ts"]}) == (None, None)
+    assert sync.rtt_ns is None
+    assert sync.pong({"id": ping["id"], "ct": ping["ts"]})[1]["type"] == "clock"
+
+def test_non_finite_client_time_is_ignored():
+    sync = ClockSync(samples=1)
+    for bad in ("inf", "-inf", "nan", float("inf"), float("nan"), "1e999"):
+        ping = sync.ping()
+        assert sync.pong({"id": ping["id"], "ct": bad}) == (None, None)
+    assert sync.rtt_ns is None and sync.offset_ms == 0.0
@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+from fanout import Outbox
+
+class _BlockedWS:
+    def __init__(self):
+        self.gate = asyncio.Event()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+
+    async def close(self, code=1000):
+        pass
+
+@pytest.mark.asyncio
+async def test_coalesce_only_at_capacity_and_keeps_order():
+    before = Outbox.dropped_total
+    out = Outbox(_BlockedWS(), maxsize=5, policy="coalesce")
+    await asyncio.sleep(0)
+    frames = [("question#1", "question"), ("reveal#1", "reveal"), ("prestage#2", "prestage"),
+              ("go#2", "go"), ("reveal#2", "reveal")]
+    for text, kind in frames:
+        out.send(text, kind)
+    assert [t for _, t in out.queue] == [t for t, _ in frames] and out.dropped == 0
+    out.send("scores#1", "scores")        # full, no earlier scores: oldest goes
+    out.send("reveal#3", "reveal")        # full: stale reveal#1 removed, new one at the tail
+    assert [t for _, t in out.queue] == ["prestage#2", "go#2", "reveal#2", "scores#1", "reveal#3"]
+    assert out.dropped == 2
+    out.close()
+    assert Outbox.dropped_total - before == 2   # kapanan bağlantının düşürdükleri sayaçta kalır
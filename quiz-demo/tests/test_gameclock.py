@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from gameclock import TimingWheel
+
+@pytest.mark.asyncio
+async def test_fires_after_delay_never_early():
+    loop = asyncio.get_running_loop()
+    wheel = TimingWheel(tick=0.01)
+    fired = []
+    start = loop.time()
+    wheel.schedule(0.05, lambda: fired.append(loop.time() - start))
+    await asyncio.sleep(0.12)
+    assert len(fired) == 1 and fired[0] >= 0.05
+    assert len(wheel) == 0
+
+@pytest.mark.asyncio
+async def test_cancel_and_reschedule():
+    wheel = TimingWheel(tick=0.01)
+    fired = []
+    a = wheel.schedule(0.03, lambda: fired.append("a"))
+    b = wheel.schedule(0.03, lambda: fired.append("b"))
+    a.cancel()
+    wheel.reschedule(b, 0.08)
+    await asyncio.sleep(0.05)
+    assert fired == [] and not a.pending and b.pending
+    await asyncio.sleep(0.08)
+    assert fired == ["b"]
+
+@pytest.mark.asyncio
+async def test_many_timers_one_task_and_wrap():
+    wheel = TimingWheel(tick=0.01, slots=8)
+    fired = []
+    for i in range(2000):
+        wheel.schedule(0.01 * (i % 20), lambda i=i: fired.append(i))
+    assert len(wheel) == 2000
+    tasks = [t for t in asyncio.all_tasks() if "TimingWheel._run" in repr(t)]
+    assert len(tasks) == 1
+    await asyncio.sleep(0.4)
+    assert sorted(fired) == list(range(2000))
+
+@pytest.mark.asyncio
+async def test_next_leaves_no_stray_timer(monkeypatch):
+    import app
+    monkeypatch.setattr(app, "CLOCK", TimingWheel(tick=0.01))
+    monkeypatch.setattr(app, "REVEAL_PAUSE_SEC", 0.02)
+    room = app.QuizState("T")
+    room.questions = [{"question": f"Q{i}", "options": ["a", "b", "c", "d"], "correct": 0} for i in range(2)]
+    room.q_duration_sec = 0.1
+    await app.start_question(room, 0)
+    await app.end_current_question(room)     # admin `next`
+    assert len(app.CLOCK) == 1               # only the reveal pause
+    await asyncio.sleep(0.06)
+    assert room.current_q_index == 1 and room.accepting
+    await asyncio.sleep(0.06)                # q0's old deadline would have fired here
+    assert room.accepting
+    room.close()
+    assert len(app.CLOCK) == 0
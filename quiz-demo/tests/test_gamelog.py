@@ -0,0 +1,109 @@
+import time
+from fastapi.testclient import TestClient
+import app
+from gamelog import GameLog, LOG_NAME, open_log
+
+QUESTIONS = [{"question": f"Q{i}", "options": ["a", "b", "c", "d"], "correct": 1} for i in range(3)]
+
+def _play(log, code="ROOM1", at=None):
+    log.append("game", code, questions=QUESTIONS, q_duration=10, game=1, game_id="g1",
+               players={"p1": ["ayse", "tok1"], "p2": ["burak", "tok2"]})
+    log.append("question", code, index=0, at=at or time.time())
+    log.append("scored", code, q=0, pids=["p1", "p2"], points=[9, 0], correct=[True, False])
+    log.append("reveal", code, index=0, at=time.time())
+    log.append("question", code, index=1, at=at or time.time())
+    log.append("scored", code, q=1, pids=["p1"], points=[7], correct=[True])
+    log.append("join", code, pid="p3", name="cem", token="tok3")
+
+def test_log_tail_replays_over_snapshot(tmp_path):
+    log = GameLog(str(tmp_path))
+    _play(log)
+    log.append("game", "GONE1", questions=QUESTIONS, q_duration=10, game=1, game_id="g2", players={})
+    log.append("end", "GONE1")
+    assert log.flush()
+    assert log.commits < log.lsn          # group commit: one fsync for many records
+    log.close()
+
+    rooms = GameLog(str(tmp_path)).take_restored()
+    assert list(rooms) == ["ROOM1"]
+    room = rooms["ROOM1"]
+    assert room["phase"] == "question" and room["index"] == 1
+    assert room["players"]["p1"] == ["ayse", "tok1", 16, 2, 0b11]
+    assert room["players"]["p2"][2:] == [0, 0, 0b01] and room["players"]["p3"][2:] == [0, 0, 0]
+
+    log = GameLog(str(tmp_path))
+    log.snapshot(log.take_restored())
+    log.append("scored", "ROOM1", q=1, pids=["p2"], points=[3], correct=[True])
+    log.flush()
+    log.close()
+    with open(tmp_path / LOG_NAME, "ab") as f:
+        f.write(b'{"lsn":99,"k":"lea')                 # torn last write
+    again = GameLog(str(tmp_path))
+    assert again.lost_tail > 0 and again.pending == 1
+    assert again.take_restored()["ROOM1"]["players"]["p2"][2:] == [3, 1, 0b11]
+    again.append("leave", "ROOM1", pid="p3")
+    again.flush()
+    again.close()
+    assert "p3" not in GameLog(str(tmp_path)).take_restored()["ROOM1"]["players"]
+
+def test_workers_keep_separate_journals_and_adopt_dead_ones(tmp_path):
+    root = tmp_path / "journal"
+    a, b = open_log(str(root), "wA"), open_log(str(root), "wB")
+    _play(a, code="ROOMA")
+    _play(b, code="ROOMB")
+    assert a.flush() and b.flush()
+    assert a.lsn == b.lsn                                  # her worker kendi sırası
+    peek = GameLog(str(root / "wB"))
+    b.snapshot(peek.take_restored())
+    peek.close()
+    assert b.flush() and b.snapshots == 1
+    peek = GameLog(str(root / "wA"))
+    assert list(peek.take_restored()) == ["ROOMA"]         # B'nin snapshot'ı A'nın günlüğüne dokunmadı
+    peek.close()
+
+    a.close()                                              # A öldü: kilidi serbest
+    c = open_log(str(root), "wC")
+    assert list(c.take_restored()) == ["ROOMA"]            # B hâlâ canlı: devralınmaz
+    assert sorted(p.name for p in root.iterdir()) == ["wB", "wC"]
+    c.close()
+    b.close()
+    d = open_log(str(root), "wD")
+    assert sorted(d.take_restored()) == ["ROOMA", "ROOMB"]
+    assert [p.name for p in root.iterdir()] == ["wD"]
+    d.close()
+
+def test_restart_restores_game_and_sessions(tmp_path, monkeypatch, next_frame):
+    log = GameLog(str(tmp_path))
+    _play(log, code="RSTR1", at=time.time() - 4)
+    log.flush()
+    log.close()
+    monkeypatch.setattr(app, "GAMELOG", GameLog(str(tmp_path)))
+    with TestClient(app.app) as client:
+        room = app.ROOMS.rooms["RSTR1"]
+        try:
+            assert room.current_q_index == 1 and room.accepting and room.journaled
+            assert 5 <= room.q_duration_sec - (time.monotonic_ns() - room.q_started_ns) / 1e9 <= 6.5
+            assert room.top_scores() == [("ayse", 16), ("burak", 0), ("cem", 0)]
+            assert room.players.has_answered(room.players.slot("p1"), 1)
+            with client.websocket_connect("/ws") as ws:
+                ws.send_json({"type": "resume", "session": "tok1", "last_seq": 40, "room": "RSTR1"})
+                assert next_frame(ws, "resumed")["room"] == "RSTR1"
+                state = next_frame(ws, "state")
+                assert state["score"] == 16 and state["streak"] == 2
+                question = next_frame(ws, "question")
+                assert question["index"] == 1 and question["answered"] is True
+        finally:
+            client.portal.call(app.close_room, room)
+    assert "RSTR1" not in GameLog(str(tmp_path)).take_restored()
+
+def test_journal_is_opened_by_the_app_not_the_import(tmp_path, monkeypatch):
+    root = tmp_path / "journal"
+    monkeypatch.setattr(app, "GAMELOG", None)
+    monkeypatch.setattr(app, "GAMELOG_DIR", str(root))
+    with TestClient(app.app):
+        assert app.GAMELOG is not None and app.GAMELOG.lock is not None
+        assert [p.name for p in root.iterdir()] == [app.WORKER_ID]
+    assert app.GAMELOG is None
+    successor = open_log(str(root), "next")                 # kilit bırakıldı: devralınır
+    assert [p.name for p in root.iterdir()] == ["next"]
+    successor.close()
@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+import app
+from heartbeat import Heartbeats
+
+class _Task:
+    def __init__(self):
+        self.cancelled = False
+
+    def done(self):
+        return False
+
+    def cancel(self):
+        self.cancelled = True
+
+def test_sweep_pings_quiet_sockets_and_reaps_dead_ones(clock):
+    beats = Heartbeats(interval=10, timeout=30, clock=clock)
+    tasks = {k: _Task() for k in "abc"}
+    for k, t in tasks.items():
+        beats.watch(k, t)
+    clock.now = 20
+    beats.touch("a")
+    assert beats.sweep() == (["b", "c"], [])
+    clock.now = 35
+    beats.touch("b")
+    quiet, stale = beats.sweep()
+    assert quiet == ["a"] and stale == ["c"]
+    beats.reap(stale)
+    assert tasks["c"].cancelled and not tasks["a"].cancelled
+    assert beats.was_reaped("c") and len(beats) == 2
+    beats.forget("c")
+    assert not beats.was_reaped("c")
+
+def test_reaped_players_leave_in_one_lobby_delta(monkeypatch, next_frame):
+    monkeypatch.setattr(app, "SESSION_GRACE_SEC", 0)
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        with client.websocket_connect("/ws") as admin:
+            admin.send_json({"type": "admin", "room": code})
+            next_frame(admin, "admin_ack")
+            with client.websocket_connect("/ws") as a, client.websocket_connect("/ws") as b:
+                a.send_json({"type": "join", "name": "ayse", "room": code})
+                next_frame(a, "lobby")
+                b.send_json({"type": "join", "name": "burak", "room": code})
+                pids = next_frame(b, "lobby")["pids"]
+
+                def go_silent():
+                    for pid in pids:
+                        out = app.CONNS[pid].out
+                        app.HEARTBEATS.seen[out] -= app.IDLE_TIMEOUT_SEC + 1
+
+                client.portal.call(go_silent)
+                client.portal.call(app.reap_idle)
+                left = next_frame(admin, "player_left")
+                assert sorted(left["pids"]) == sorted(pids)
+                assert len(app.ROOMS.rooms[code].players) == 0
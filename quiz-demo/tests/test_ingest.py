@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+from openpyxl import Workbook
+
+from app import BankLoader, UploadTooLarge, _hash_file, load_questions_from_excel, spool_upload
+from bankcache import BankCache
+from ingest import BankParseError, RowErrors, parse_rows
+
+HEADER = ("question", "option1", "option2", "option3", "option4", "correct_index")
+
+def _xlsx(rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for r in rows:
+        ws.append(r)
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+def test_rows_are_validated_one_by_one():
+    errors = RowErrors(limit=2)
+    rows = iter([
+        HEADER,
+        ("Q1", "a", "b", "c", "d", 1),
+        ("", "a", "b", "c", "d", 0),
+        (None, None, None, None, None, None),
+        ("Q2", "a", "", "c", "d", 0),
+        ("Q3", "a", "b", "c", "d", "x"),
+        ("Q4", "a", "b", "c", "d", 9),
+    ])
+    out = parse_rows(rows, errors)
+    assert [q["question"] for q in out] == ["Q1", "Q4"]
+    assert out[1]["correct"] == 3
+    assert errors.count == 3
+    assert errors.items == [{"row": 3, "error": "Soru metni boş."}, {"row": 5, "error": "Boş seçenek var."}]
+
+def test_missing_headers_and_empty_sheet():
+    with pytest.raises(ValueError):
+        parse_rows(iter([]))
+    with pytest.raises(ValueError):
+        parse_rows(iter([("question", "option1")]))
+
+def test_spool_hashes_and_caps(tmp_path):
+    data = _xlsx([HEADER, ("Q", "a", "b", "c", "d", 2)])
+    path, key = asyncio.run(spool_upload(UploadFile(BytesIO(data))))
+    try:
+        assert key == _hash_file(path)
+        assert load_questions_from_excel(path)[0]["correct"] == 2
+    finally:
+        os.unlink(path)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(UploadFile(BytesIO(data)), limit=len(data) - 1))
+
+@pytest.mark.asyncio
+async def test_loader_parses_off_loop(tmp_path):
+    path = tmp_path / "big.xlsx"
+    path.write_bytes(_xlsx([HEADER] + [(f"Q{i}", "a", "b", "c", "d", i % 4) for i in range(20_000)]))
+    loader = BankLoader(BankCache("t"), workers=1, progress_sec=0.01, progress_rows=1000)
+    seen, gaps = [], []
+
+    async def ticker():
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+
+    async def progress(rows):
+        seen.append(rows)
+
+    tick = asyncio.create_task(ticker())
+    try:
+        questions, report = await loader.load(str(path), on_progress=progress)
+    finally:
+        tick.cancel()
+        loader.close()
+    assert len(questions) == 20_000 and report["skipped"] == 0
+    assert seen and seen == sorted(seen)
+    assert max(gaps) < 0.2
+
+@pytest.mark.asyncio
+async def test_loader_error_keeps_row_report(tmp_path):
+    path = tmp_path / "bad.xlsx"
+    path.write_bytes(_xlsx([HEADER, ("", "a", "b", "c", "d", 0)]))
+    loader = BankLoader(BankCache("t"), workers=1)
+    try:
+        with pytest.raises(BankParseError) as e:
+            await loader.load(str(path))
+    finally:
+        loader.close()
+    assert e.value.report["errors"] == [{"row": 2, "error": "Soru metni boş."}]
+
+@pytest.mark.asyncio
+async def test_loader_worker_writes_the_cached_file(tmp_path):
+    path = tmp_path / "q.xlsx"
+    path.write_bytes(_xlsx([HEADER] + [(f"Q{i}", "a", "b", "c", "d", 1) for i in range(50)]))
+    cache = BankCache("t", directory=str(tmp_path / "banks"))
+    loader = BankLoader(cache, workers=1)
+    try:
+        bank, _ = await loader.load(str(path), key="k")
+    finally:
+        loader.close()
+    assert bank.path == cache._path("k") and len(bank) == 50 and bank[49]["question"] == "Q49"
+    assert os.listdir(tmp_path / "banks") == [os.path.basename(bank.path)]   # geçici dosya kalmaz
+
+def test_optional_tag_and_difficulty_columns():
+    errors = RowErrors()
+    rows = iter([
+        HEADER + ("Tags", "difficulty"),
+        ("Q1", "a", "b", "c", "d", 1, "Tarih; Spor ,", 2),
+        ("Q2", "a", "b", "c", "d", 0, None, None),
+        ("Q3", "a", "b", "c", "d", 0, "x", "zor"),
+    ])
+    out = parse_rows(rows, errors)
+    assert out[0]["tags"] == ["tarih", "spor"] and out[0]["difficulty"] == 2
+    assert out[1]["tags"] == [] and out[1]["difficulty"] == 0
+    assert errors.items == [{"row": 4, "error": "difficulty sayı değil: 'zor'"}]
+    assert "tags" not in parse_rows(iter([HEADER, ("Q", "a", "b", "c", "d", 0)]))[0]
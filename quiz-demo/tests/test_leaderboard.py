@@ -0,0 +1,71 @@
+import asyncio
+import random
+import app
+from leaderboard import Leaderboard
+
+def test_top_and_ranking_follow_updates():
+    lb = Leaderboard()
+    for pid in ["a", "b", "c"]:
+        lb.add(pid)
+    lb.update("b", 5)
+    lb.update("c", 3)
+    assert lb.top(2) == [("b", 5), ("c", 3)]
+    assert lb.ranking() == [("b", 5), ("c", 3), ("a", 0)]
+    assert lb.rank_of("a") == 3
+
+def test_ties_share_rank_and_keep_arrival_order():
+    lb = Leaderboard()
+    for pid in ["a", "b", "c"]:
+        lb.add(pid)
+    lb.update("c", 5)
+    lb.update("a", 5)
+    assert lb.top(3) == [("c", 5), ("a", 5), ("b", 0)]
+    assert lb.rank_of("a") == lb.rank_of("c") == 1
+    assert lb.rank_of("b") == 3
+
+def test_remove_and_clear_scores():
+    lb = Leaderboard()
+    lb.add("a", 7)
+    lb.add("b", 2)
+    lb.remove("a")
+    assert lb.ranking() == [("b", 2)]
+    assert lb.rank_of("a") == 0
+    lb.clear_scores()
+    assert lb.ranking() == [("b", 0)]
+
+def test_matches_full_sort():
+    rnd = random.Random(1)
+    lb = Leaderboard()
+    scores = {}
+    for i in range(500):
+        lb.add(str(i))
+        scores[str(i)] = 0
+    for _ in range(5000):
+        pid = str(rnd.randrange(500))
+        scores[pid] += rnd.choice([2, 3, 5, 150])
+        lb.update(pid, scores[pid])
+    expected = sorted(scores.values(), reverse=True)
+    assert [s for _, s in lb.ranking()] == expected
+    for pid, s in scores.items():
+        assert lb.rank_of(pid) == 1 + sum(1 for v in scores.values() if v > s)
+
+def test_score_ticker_sends_one_frame_per_interval(make_out):
+    async def run():
+        room = app.QuizState("TICK1")
+        watcher = make_out()
+        for pid, name in (("p1", "ayse"), ("p2", "burak")):
+            room.add_player(pid, name, watcher if pid == "p1" else make_out())
+        ticker = app.ScoreTicker(room, interval=0.05)
+        room.ranking.update("p1", 5)
+        ticker.mark_dirty()                  # ilk değişiklik hemen gider
+        await asyncio.sleep(0.01)
+        for score in (2, 7, 9):              # aynı aralıkta üç değişiklik
+            room.ranking.update("p2", score)
+            ticker.mark_dirty()
+        await asyncio.sleep(0.08)
+        scores = [f["top5"] for f in watcher.frames if f["type"] == "scores"]
+        assert scores == [[["ayse", 5], ["burak", 0]], [["burak", 9], ["ayse", 5]]]
+        await asyncio.sleep(0.15)            # değişiklik yok: yeni kare yok
+        assert len([f for f in watcher.frames if f["type"] == "scores"]) == 2
+        room.close()
+    asyncio.run(run())
@@ -0,0 +1,41 @@
+import asyncio
+from fastapi.testclient import TestClient
+import app
+
+def test_lobby_sends_deltas_and_snapshots_to_newcomers(next_frame):
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        with client.websocket_connect("/ws") as a:
+            a.send_json({"type": "join", "name": "ayse", "room": code})
+            first = next_frame(a, "lobby")
+            assert first["players"] == ["ayse"]
+            with client.websocket_connect("/ws") as b:
+                b.send_json({"type": "join", "name": "burak", "room": code})
+                snap = next_frame(b, "lobby")
+                assert snap["players"] == ["ayse", "burak"]
+                joined = next_frame(a, "player_joined")
+                if joined["players"][0][1] == "ayse":   # a'nın kendi katılımı
+                    joined = next_frame(a, "player_joined")
+                assert joined["players"] == [[snap["pids"][1], "burak"]]
+            left = next_frame(a, "player_left")
+            assert left["seq"] == joined["seq"] + 1 and left["pids"] == [snap["pids"][1]]
+            a.send_json({"type": "lobby_sync"})
+            again = next_frame(a, "lobby")
+            assert again["players"] == ["ayse"] and again["seq"] == left["seq"]
+
+def test_lobby_changes_in_one_tick_share_a_frame(make_out):
+    async def run():
+        room = app.QuizState("TICK")
+        watcher = make_out()
+        room.admins.add(watcher)
+        for i in range(3):
+            room.lobby.joined(f"p{i}", f"n{i}")
+        room.lobby.left("p1")
+        await asyncio.sleep(0.01)
+        room.close()
+        return watcher.frames
+
+    frames = asyncio.run(run())
+    assert [f["type"] for f in frames] == ["player_left", "player_joined"]
+    assert frames[0]["pids"] == ["p1"] and frames[0]["seq"] == 1
+    assert frames[1]["players"] == [["p0", "n0"], ["p2", "n2"]] and frames[1]["seq"] == 2
@@ -0,0 +1,43 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from metrics import Histogram, Registry
+
+def test_histogram_buckets_are_cumulative_and_le_inclusive():
+    h = Histogram("x_seconds", "x", (0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+    lines = list(h.render())
+    assert 'x_seconds_bucket{le="0.1"} 2' in lines
+    assert 'x_seconds_bucket{le="1.0"} 3' in lines
+    assert 'x_seconds_bucket{le="+Inf"} 4' in lines
+    assert "x_seconds_count 4" in lines
+
+def test_observe_many_matches_observe():
+    values = np.random.default_rng(1).exponential(0.01, 1000)
+    a, b = Histogram("a", "a"), Histogram("b", "b")
+    for v in values.tolist():
+        a.observe(v)
+    b.observe_many(values)
+    assert a.counts == b.counts and a.count == b.count
+
+def test_registry_renders_counters_and_collectors():
+    reg = Registry()
+    c = reg.counter("n_total", "n")
+    c.inc(3)
+    reg.collector(lambda: ["extra 1"])
+    text = reg.render()
+    assert "# TYPE n_total counter\nn_total 3\n" in text
+    assert text.endswith("extra 1\n")
+
+def test_metrics_endpoint():
+    import app
+    with TestClient(app.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "join", "name": "m"})
+            ws.receive_json()
+            body = client.get("/api/metrics").text
+    assert 'quiz_room_players{room="MAIN"} 1' in body
+    assert "quiz_broadcast_seconds_count" in body
+    assert 'quiz_send_queue_depth_bucket{le="+Inf"}' in body
+    assert "# TYPE quiz_send_dropped_frames_total counter\nquiz_send_dropped_frames_total " in body
+    assert '# TYPE quiz_bank_cache_lookups_total counter\nquiz_bank_cache_lookups_total{result="hit"}' in body
@@ -0,0 +1,34 @@
+from players import PlayerTable
+
+def test_add_remove_keeps_slots_dense():
+    t = PlayerTable(capacity=2)
+    for pid in ["a", "b", "c"]:
+        t.add(pid, pid.upper(), None)
+    t.scores[t.slot("c")] = 7
+    t.remove("a")
+    assert len(t) == 2
+    assert sorted(t.pids) == ["b", "c"]
+    assert t.slot("c") == 0 and t.score("c") == 7
+    assert t.name("b") == "B"
+    assert "a" not in t
+
+def test_answered_bitset_and_reset():
+    t = PlayerTable(questions=8)
+    s = t.add("a", "A", None)
+    t.mark_answered(s, 3)
+    t.mark_answered(s, 40)
+    assert t.has_answered(s, 3) and t.has_answered(s, 40)
+    assert not t.has_answered(s, 4)
+    assert not t.has_answered(s, 4000)
+    t.scores[s] = 9
+    t.streaks[s] = 2
+    t.reset()
+    assert t.score("a") == 0 and t.streak("a") == 0
+    assert not t.has_answered(s, 3)
+
+def test_rejoin_starts_fresh():
+    t = PlayerTable()
+    t.add("a", "A", None)
+    t.scores[t.slot("a")] = 5
+    t.add("a", "A2", None)
+    assert len(t) == 1 and t.score("a") == 0 and t.name("a") == "A2"
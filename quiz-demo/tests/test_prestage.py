@@ -0,0 +1,24 @@
+import asyncio
+import app
+
+def test_next_question_is_staged_during_reveal_and_started_with_go(make_out):
+    async def run():
+        room = app.QuizState("STAGE")
+        room.questions = [
+            {"question": "1+1?", "options": ["1", "2", "3", "4"], "correct": 1},
+            {"question": "2+2?", "options": ["2", "3", "4", "5"], "correct": 2},
+        ]
+        watcher = make_out()
+        room.admins.add(watcher)
+        await app.start_question(room, 0)
+        await app.end_current_question(room)
+        await app.advance_question(room)
+        await app.end_current_question(room)
+        room.close()
+        return watcher.frames
+
+    frames = asyncio.run(run())
+    assert [f["type"] for f in frames] == ["question", "reveal", "prestage", "go", "reveal"]
+    assert frames[2]["index"] == 1 and frames[2]["question"] == "2+2?" and "expires_at" not in frames[2]
+    assert set(frames[3]) == {"rseq", "type", "index", "expires_at"} and frames[3]["index"] == 1
+    assert [f["rseq"] for f in frames] == [1, 2, 3, 4, 5]   # odanın yayın sırası
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pytest
+import app
+from bankcache import BankCache
+from qbank import QuestionBank, compile_bank, compile_bank_to
+
+def _bank(n=1000):
+    return [{"question": f"Soru {i} ğü", "options": ["a", "b", "c", "d"], "correct": i % 4,
+             "tags": ["tarih"] if i % 2 else ["spor", "tarih"] if i % 5 == 0 else ["spor"],
+             "difficulty": 1 + i % 3} for i in range(n)]
+
+def test_compiled_bank_round_trips_and_indexes(tmp_path):
+    questions = _bank()
+    path = tmp_path / "b.qbank"
+    path.write_bytes(compile_bank(questions))
+    bank = QuestionBank.open(str(path))
+    assert len(bank) == 1000 and bank[0] == questions[0] and bank[-1] == questions[-1]
+    assert bank[10:12] == questions[10:12]
+    assert bank.tags == ["spor", "tarih"] and bank.difficulties() == [1, 2, 3]
+
+    tarih = bank.select(["tarih"])
+    assert tarih.tolist() == [i for i, q in enumerate(questions) if "tarih" in q["tags"]]
+    both = bank.select(["spor", "tarih"], difficulty=1)
+    assert both.tolist() == [i for i, q in enumerate(questions)
+                             if {"spor", "tarih"} <= set(q["tags"]) and q["difficulty"] == 1]
+    assert len(bank.select(["yok"])) == 0 and bank.sample(5, ["yok"]) == []
+
+def test_sampling_is_distinct_and_filtered():
+    bank = QuestionBank(compile_bank(_bank()))
+    rng = np.random.default_rng(7)
+    picked = bank.sample(20, rng=rng)
+    assert len({q["question"] for q in picked}) == 20
+    hard = bank.sample(30, difficulty=3, rng=rng)
+    assert len(hard) == 30 and all(q["difficulty"] == 3 for q in hard)
+    rare = bank.sample(500, ["spor", "tarih"], difficulty=2, rng=rng)   # seçici: liste taranır
+    assert len(rare) == len(bank.select(["spor", "tarih"], 2)) > 0
+    assert all({"spor", "tarih"} <= set(q["tags"]) and q["difficulty"] == 2 for q in rare)
+
+def test_cache_shares_one_compiled_file(tmp_path):
+    cache = BankCache("t", directory=str(tmp_path))
+    bank = cache.put("k1", _bank(10))
+    assert bank.path is not None and bank.key == "k1"
+    other = BankCache("t", directory=str(tmp_path)).get("k1")   # another worker
+    assert other.path == bank.path and other[3] == bank[3]
+    assert BankCache("t", directory=str(tmp_path), version=2).get("k1") is None   # parser changed
+    assert BankCache("t").put("k2", _bank(3)).path is None      # no directory: in memory
+
+def test_streamed_compile_matches_and_cleans_up(tmp_path):
+    questions = _bank(50)
+    out = tmp_path / "compiled"
+    out.mkdir()
+    path = compile_bank_to(iter(questions), str(out))
+    with open(path, "rb") as f:
+        assert f.read() == compile_bank(questions)
+
+    def broken():
+        yield questions[0]
+        raise ValueError("bozuk satır")
+
+    with pytest.raises(ValueError):
+        compile_bank_to(broken(), str(out))
+    assert os.listdir(out) == [os.path.basename(path)]
+
+def test_start_quiz_samples_the_loaded_bank():
+    room = app.QuizState("QBANK")
+    room.bank = room.questions = QuestionBank(compile_bank(_bank()))
+    assert app.game_questions(room, {}) is room.bank
+    picked = app.game_questions(room, {"count": 5, "tags": "Spor", "difficulty": "2"})
+    assert len(picked) == 5 and all("spor" in q["tags"] and q["difficulty"] == 2 for q in picked)
+    assert app.game_questions(room, {"tags": ["yok"]}) == []
@@ -0,0 +1,67 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+import app
+from ratelimit import RateLimiter
+
+def test_buckets_refill_per_class(clock):
+    limiter = RateLimiter({"join": (1.0, 2), "answer": (10.0, 1)}, clock=clock)
+    assert limiter.allow("join") and limiter.allow("join")
+    assert not limiter.allow("join")
+    assert limiter.allow("answer")        # ayrı kova
+    clock.now = 0.5
+    assert not limiter.allow("join")
+    clock.now = 1.0
+    assert limiter.allow("join")
+    assert limiter.throttled == 2
+
+def test_join_spam_is_throttled_and_counted(next_frame):
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        with client.websocket_connect("/ws") as ws:
+            for _ in range(6):
+                ws.send_json({"type": "join", "name": "spam", "room": code})
+            err = next_frame(ws, "error")
+            assert "hızlı" in err["message"]
+        text = client.get("/api/metrics").text
+        assert 'quiz_throttled_messages_total{reason="join"}' in text
+
+def test_oversized_frame_closes_connection():
+    with TestClient(app.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text('{"type":"join","name":"' + "x" * app.MAX_FRAME_BYTES + '"}')
+            with pytest.raises(WebSocketDisconnect) as exc:
+                while True:
+                    ws.receive_json()
+            assert exc.value.code == 1009
+
+def test_multibyte_text_is_measured_in_bytes():
+    with TestClient(app.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            name = "ş" * (app.MAX_FRAME_BYTES // 2)   # karakter olarak sınırın altında, bayt olarak üstünde
+            ws.send_text('{"type":"join","name":"' + name + '"}')
+            with pytest.raises(WebSocketDisconnect) as exc:
+                while True:
+                    ws.receive_json()
+            assert exc.value.code == 1009
+
+def test_snapshot_requests_have_their_own_tight_bucket(next_frame):
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "join", "name": "ayse", "room": code})
+            next_frame(ws, "lobby")
+            for _ in range(app.RATE_LIMITS["snapshot"][1] + 1):
+                ws.send_json({"type": "lobby_sync"})
+            assert "hızlı" in next_frame(ws, "error")["message"]
+        assert 'quiz_throttled_messages_total{reason="snapshot"}' in client.get("/api/metrics").text
+
+def test_room_join_cap(monkeypatch, next_frame):
+    monkeypatch.setattr(app, "MAX_PLAYERS_PER_ROOM", 1)
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        with client.websocket_connect("/ws") as a, client.websocket_connect("/ws") as b:
+            a.send_json({"type": "join", "name": "ayse", "room": code})
+            next_frame(a, "joined")
+            b.send_json({"type": "join", "name": "burak", "room": code})
+            assert next_frame(b, "error")["message"] == "Oda dolu."
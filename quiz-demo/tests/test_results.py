@@ -0,0 +1,61 @@
+import numpy as np
+from fastapi.testclient import TestClient
+import app
+from qbank import QuestionBank, compile_bank
+from results import ResultsStore
+
+def _questions():
+    return [{"question": "1+1?", "correct": 1}, {"question": "2+2?", "correct": 3}]
+
+def test_store_batches_games_answers_and_results(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), tick=0.05)
+    bank = QuestionBank(compile_bank(_questions()))
+    for game_id, questions in (("g1", _questions()), ("g2", bank)):   # g2: whole bank, read by the writer
+        store.game_started(game_id, "ROOM1", questions)
+        store.answers(game_id, 0, ["p1", "p2"], ["ayse", "burak"], np.array([1, 2]), np.array([True, False]),
+                      np.array([9, 0]), np.array([0.5, 1.25]))
+        store.answers(game_id, 1, ["p1"], ["ayse"], np.array([3]), np.array([True]), np.array([7]), np.array([2.0]))
+        store.game_finished(game_id, [("p1", "ayse", 16), ("p2", "burak", 0), ("p3", "cem", 0)])
+    assert store.flush()
+    assert store.written == 6
+
+    history = store.player_history("burak", 10, 0)
+    assert [(h["game_id"], h["score"], h["rank"]) for h in history] == [("g2", 0, 2), ("g1", 0, 2)]
+    assert store.player_history("cem", 10, 0)[0]["rank"] == 2     # tied with burak
+    assert len(store.player_history("ayse", 1, 1)) == 1
+
+    accuracy = {q["text"]: q for q in store.question_accuracy(10, 0)}
+    assert accuracy["1+1?"]["answers"] == 4 and accuracy["1+1?"]["correct"] == 2
+    assert accuracy["2+2?"]["games"] == 2
+    games = store.recent_games(10, 0)
+    assert [g["game_id"] for g in games] == ["g2", "g1"] and games[0]["finished_at"] is not None
+    elapsed = store.query("SELECT elapsed_ms FROM answers WHERE player_id = 'p2'", ())
+    assert {row["elapsed_ms"] for row in elapsed} == {1250}
+    store.close()
+
+def test_results_api_pages(tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / "api.sqlite3"), tick=0.01)
+    monkeypatch.setattr(app, "RESULTS", store)
+    for i in range(3):
+        store.game_started(f"g{i}", "ROOM1", _questions())
+        store.game_finished(f"g{i}", [("p1", "ayse", i)])
+    store.flush()
+    with TestClient(app.app) as client:
+        first = client.get("/api/results/players/ayse?limit=2").json()
+        assert [g["score"] for g in first["items"]] == [2, 1] and first["next_offset"] == 2
+        last = client.get(f"/api/results/players/ayse?limit=2&offset={first['next_offset']}").json()
+        assert [g["score"] for g in last["items"]] == [0] and last["next_offset"] is None
+        assert len(client.get("/api/results/games?limit=500").json()["items"]) == 3
+        assert client.get("/api/results/questions").json()["items"][0]["games"] == 3
+        monkeypatch.setattr(app, "RESULTS", None)
+        assert client.get("/api/results/games").status_code == 503
+    store.close()
+
+def test_store_is_opened_by_the_app_not_the_import(tmp_path, monkeypatch):
+    db = tmp_path / "life" / "results.sqlite3"
+    monkeypatch.setattr(app, "RESULTS", None)
+    monkeypatch.setattr(app, "RESULTS_DB", str(db))
+    with TestClient(app.app):
+        assert app.RESULTS is not None and db.parent.is_dir()
+        writer = app.RESULTS._thread
+    assert app.RESULTS is None and not writer.is_alive()
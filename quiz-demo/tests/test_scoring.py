@@ -0,0 +1,17 @@
+import numpy as np
+from app import score_for_elapsed, score_for_elapsed_batch
+
+def test_score_reference():
+    assert score_for_elapsed(0.0) == 5
+    assert score_for_elapsed(3.0) == 5
+    assert score_for_elapsed(3.01) == 3
+    assert score_for_elapsed(5.0) == 3
+    assert score_for_elapsed(10.0) == 2
+    assert score_for_elapsed(10.01) == 0
+
+def test_batch_matches_reference():
+    boundaries = [0.0, 2.99, 3.0, 3.0000001, 4.99, 5.0, 5.01, 9.99, 10.0, 10.01, 999.0]
+    rnd = np.random.default_rng(0).uniform(0, 12, 10_000).tolist()
+    elapsed = boundaries + rnd
+    batched = score_for_elapsed_batch(np.array(elapsed))
+    assert batched.tolist() == [score_for_elapsed(e) for e in elapsed]
@@ -0,0 +1,94 @@
+import json
+from fastapi.testclient import TestClient
+import app
+import wire
+from sessions import ReplayRing, Session
+
+def test_session_numbers_frames_and_replays_only_the_missed_ones(make_out):
+    first = make_out()
+    s = Session("p1", first, replay=3)
+    for i in range(3):
+        s.send(json.dumps({"type": "scores", "i": i}), "scores")
+    assert [f["fseq"] for f in first.frames] == [1, 2, 3]
+    assert first.frames[0] == {"fseq": 1, "type": "scores", "i": 0}
+
+    s.detach(first)
+    s.send(json.dumps({"type": "reveal"}))   # kopukken sadece tampona
+    assert len(first.frames) == 3
+
+    second = make_out()
+    assert s.attach(second, 2) == 2
+    assert [f["fseq"] for f in second.frames] == [3, 4]
+    # tampon (3 kare) 1. kareye kadar uzanmıyor
+    assert s.attach(make_out(), 0) is None
+    assert s.attach(make_out(), None) is None
+
+def test_room_frames_are_shared_and_merged_with_direct_ones_on_replay(make_out):
+    ring = ReplayRing(size=4)
+    first, other = make_out(), make_out()
+    s, t = Session("p1", first), Session("p2", other)
+    s.bind(ring)
+    t.bind(ring)
+
+    def broadcast(i):
+        text, _ = ring.stamp(json.dumps({"type": "scores", "i": i}))
+        s.send(text, "scores")
+        t.send(text, "scores")
+
+    broadcast(0)
+    s.send(json.dumps({"type": "answer_ack"}))
+    assert first.frames == [{"rseq": 1, "type": "scores", "i": 0}, {"fseq": 1, "type": "answer_ack"}]
+    assert not t.buffer and len(s.buffer) == 1          # yayınlar oturumda kopyalanmaz
+    s.detach(first)
+    broadcast(1)
+    s.send(json.dumps({"type": "state"}))
+    broadcast(2)
+
+    second = make_out()
+    assert s.attach(second, 1, 1) == 3
+    assert [(f["type"], f.get("rseq"), f.get("fseq")) for f in second.frames] == \
+        [("scores", 2, None), ("state", None, 2), ("scores", 3, None)]
+    for i in range(3, 6):
+        broadcast(i)
+    assert s.attach(make_out(), 2, 1) is None            # halka (4 kare) rseq 2'ye uzanmıyor
+    assert s.attach(make_out(), 2, "x") is None
+
+    blob = wire.encode({"type": "go", "index": 1, "expires_at": 2.0})
+    _, stamped = ring.stamp(json.dumps({"type": "go"}), blob)
+    assert stamped[0] == wire.GO | wire.ROOM_SEQ and wire.is_room_frame(stamped)
+    assert wire.encode({"type": "go", "index": 1, "expires_at": 2.0, "rseq": ring.seq}) == stamped
+
+def test_resume_restores_player_and_replays_missed_frames(next_frame):
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        with client.websocket_connect("/ws") as a:
+            a.send_json({"type": "join", "name": "ayse", "room": code})
+            token = next_frame(a, "joined")["session"]
+            last = next_frame(a, "lobby")["fseq"]
+            a.close(code=1001)   # sayfa yenileme gibi: oturum beklemeye alınır
+
+        with client.websocket_connect("/ws") as b:
+            b.send_json({"type": "join", "name": "burak", "room": code})
+            assert next_frame(b, "lobby")["players"] == ["ayse", "burak"]
+
+            with client.websocket_connect("/ws") as a2:
+                a2.send_json({"type": "resume", "session": token, "last_seq": last, "last_rseq": 0, "room": code})
+                assert next_frame(a2, "resumed")["room"] == code
+                joined = next_frame(a2, "player_joined")
+                assert joined["rseq"] >= 1 and "fseq" not in joined   # odanın halkasından
+                names = [name for _, name in joined["players"]]
+                if names == ["ayse"]:   # kendi katılımının delta'sı
+                    joined = next_frame(a2, "player_joined")
+                    names = [name for _, name in joined["players"]]
+                assert names == ["burak"]
+                a2.close(code=1001)
+            # last_seq yok (sayfa yeniden yüklendi): tekrar yerine güncel durum
+            with client.websocket_connect("/ws") as a3:
+                a3.send_json({"type": "resume", "session": token, "room": code})
+                state = next_frame(a3, "state")
+                assert state["name"] == "ayse" and state["room"] == code
+                assert next_frame(a3, "lobby")["players"] == ["ayse", "burak"]
+
+        with client.websocket_connect("/ws") as c:
+            c.send_json({"type": "resume", "session": "bogus"})
+            assert next_frame(c, "resume_failed")["type"] == "resume_failed"
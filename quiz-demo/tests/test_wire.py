@@ -0,0 +1,58 @@
+import json
+import struct
+from fastapi.testclient import TestClient
+import app
+import wire
+
+def _frame(ws):
+    msg = ws.receive()
+    if msg.get("bytes") is not None:
+        return msg["bytes"]
+    return json.loads(msg["text"])
+
+def test_hot_frames_round_trip_layouts():
+    ack = wire.encode({"type": "answer_ack", "correct": True, "score": 12, "streak": 2, "rank": 3, "index": 4})
+    assert len(ack) == 5 + 15 and ack[0] == wire.ANSWER_ACK
+    assert struct.unpack_from("<BiHII", ack, 5) == (1, 12, 2, 3, 4)
+
+    scores = wire.with_seq(wire.encode({"type": "scores", "top5": [["ayşe", 5], ["bob", 3]]}), 7)
+    assert struct.unpack_from("<BI", scores) == (wire.SCORES, 7)
+    assert scores[5] == 2 and scores[7:12] == "ayşe".encode()
+
+    assert wire.encode({"type": "lobby", "players": []}) is None
+    assert wire.from_json(json.dumps({"type": "go", "index": 1, "expires_at": 2.5})) == \
+        wire.encode({"type": "go", "index": 1, "expires_at": 2.5})
+
+    assert wire.decode(bytes((wire.ANSWER, 2))) == {"type": "answer", "choice": 2}
+    assert wire.decode(bytes((wire.PONG,)) + struct.pack("<Id", 4, 1.5)) == {"type": "pong", "id": 4, "ct": 1.5}
+    assert wire.decode(bytes((wire.PONG, 1))) is None
+
+def test_indexes_past_u16_still_encode():
+    ack = wire.encode({"type": "answer_ack", "correct": False, "score": 0, "streak": 0, "index": 70_000})
+    assert struct.unpack_from("<I", ack, 16) == (70_000,)
+    go = wire.encode({"type": "go", "index": 70_000, "expires_at": 2.5})
+    assert struct.unpack_from("<Id", go, 5) == (70_000, 2.5)
+
+def test_binary_wire_is_negotiated_at_join():
+    with TestClient(app.app) as client:
+        code = client.post("/api/rooms").json()["code"]
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "join", "name": "ayse", "room": code, "wire": "bin2"})
+            frame = _frame(ws)
+            while not (isinstance(frame, dict) and frame["type"] == "joined"):
+                frame = _frame(ws)
+            assert frame["wire"] == "bin2"
+
+            ws.send_json({"type": "sync"})
+            frame = _frame(ws)
+            seen = set()
+            while not (isinstance(frame, bytes) and frame[0] == wire.PING):
+                if isinstance(frame, bytes):
+                    seen.add(frame[0])
+                frame = _frame(ws)
+            assert wire.SCORES in seen   # newcomer's scores went out binary too
+            ping_id = struct.unpack_from("<I", frame, 5)[0]
+            ws.send_bytes(bytes((wire.PONG,)) + struct.pack("<Id", ping_id, 0.0))
+            while not (isinstance(frame, dict) and frame["type"] == "clock"):
+                frame = _frame(ws)
+            assert frame["rtt_ms"] >= 0
@@ -0,0 +1,102 @@
+# wire.py
+"""Compact binary frames for the hot message types; JSON stays the fallback.
+
+A client asks for it with `"wire": "bin2"` in join / admin / resume. Types
+without a layout below are still sent as JSON text. Little-endian; server
+frames start with `u8 code, u32 seq`, client frames with just `u8 code`.
+`seq` is the session's fseq for direct frames (0 = not sequenced), or the
+room's rseq when the code has ROOM_SEQ (0x40) set (broadcasts, see sessions):
+
+  server -> client
+    0x01 answer_ack  u8 correct, i32 score, u16 streak, u32 rank (0 = none), u32 index
+    0x02 scores      u8 n, n x (u8 len, utf-8 name, i32 score)
+    0x03 go          u32 index, f64 expires_at
+    0x04 ping        u32 id, f64 ts
+  client -> server
+    0x81 answer      u8 choice
+    0x82 pong        u32 id, f64 ct
+"""
+import json
+import struct
+from typing import Optional, Union
+
+WIRE_BIN = "bin2"   # bin1 had u16 indexes; old clients asking for it get JSON
+
+HEADER = struct.Struct("<BI")
+_ACK = struct.Struct("<BiHII")
+_SCORE = struct.Struct("<i")
+_GO = struct.Struct("<Id")
+_PING = struct.Struct("<Id")
+_ANSWER = struct.Struct("<B")
+
+ANSWER_ACK, SCORES, GO, PING = 0x01, 0x02, 0x03, 0x04
+ANSWER, PONG = 0x81, 0x82
+ROOM_SEQ = 0x40
+
+BINARY_TYPES = frozenset({"answer_ack", "scores", "go", "ping"})
+
+
+def _scores(top) -> bytes:
+    parts = [bytes((min(len(top), 255),))]
+    for name, score in top[:255]:
+        raw = str(name).encode("utf-8")[:255]
+        parts.append(bytes((len(raw),)) + raw + _SCORE.pack(int(score)))
+    return b"".join(parts)
+
+
+def _body(payload: dict):
+    t = payload.get("type")
+    if t == "answer_ack":
+        return ANSWER_ACK, _ACK.pack(bool(payload["correct"]), int(payload["score"]),
+                                     min(int(payload["streak"]), 0xFFFF), int(payload.get("rank") or 0),
+                                     int(payload.get("index") or 0))
+    if t == "scores":
+        return SCORES, _scores(payload["top5"])
+    if t == "go":
+        return GO, _GO.pack(int(payload["index"]), float(payload["expires_at"]))
+    if t == "ping":
+        return PING, _PING.pack(int(payload["id"]), float(payload["ts"]))
+    return None, None
+
+
+def encode(payload: dict) -> Optional[bytes]:
+    """Binary frame for `payload`, or None if its type has no layout."""
+    code, body = _body(payload)
+    if code is None:
+        return None
+    rseq = payload.get("rseq")
+    if rseq:
+        return HEADER.pack(code | ROOM_SEQ, int(rseq)) + body
+    return HEADER.pack(code, 0) + body
+
+
+def from_json(text: str) -> Optional[bytes]:
+    """Re-encode an already serialised frame (relayed / direct frames from another worker)."""
+    if not any('"%s"' % t in text for t in BINARY_TYPES):
+        return None
+    return encode(json.loads(text))
+
+
+def with_seq(frame: bytes, seq: int, room: bool = False) -> bytes:
+    code = frame[0] | ROOM_SEQ if room else frame[0]
+    return bytes((code,)) + struct.pack("<I", seq) + frame[5:]
+
+
+def is_room_frame(frame: Union[str, bytes]) -> bool:
+    """Already numbered by the room (shared by every recipient, see sessions.ReplayRing)."""
+    if isinstance(frame, bytes):
+        return bool(frame[0] & ROOM_SEQ)
+    return frame.startswith('{"rseq":')
+
+
+def decode(data: bytes) -> Optional[dict]:
+    """Client frame -> message dict; None if unknown or malformed."""
+    try:
+        if data[0] == ANSWER:
+            return {"type": "answer", "choice": _ANSWER.unpack_from(data, 1)[0]}
+        if data[0] == PONG:
+            ping_id, ct = _PING.unpack_from(data, 1)
+            return {"type": "pong", "id": ping_id, "ct": ct}
+    except (IndexError, struct.error):
+        pass
+    return None